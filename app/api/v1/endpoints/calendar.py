@@ -1,113 +1,286 @@
 """Calendar API endpoints."""
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Optional
 
-from app.models.schemas import EventsPayload, StatusResponse, ReceiveResponse
-from app.services.data_store import data_store
-from app.services.calendar_service import split_events_data
-from app.services.excel_service import generate_excel
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+
+from app.core.config import MAX_EXPORT_WEEKS
+from app.api.v1.ingest import iter_validated_batches
+from app.api.v1.responses import etag_matches, file_response, not_modified_response
+from app.models.schemas import (
+    CalendarEvent,
+    EventsPayload,
+    HighlightRulesPayload,
+    ReceiveResponse,
+    StatusResponse,
+    UpsertPayload,
+    UpsertResponse,
+)
+from app.services.calendar_index import CalendarIndex, get_calendar_index
+from app.services.data_store import data_store, get_data_version
+from app.services.calendar_service import (
+    clear_events,
+    replace_records,
+    sync_highlight_rules,
+    upsert_events,
+)
+from app.services.event_record import EventRecord
+from app.services.highlight_rules import get_highlight_engine, update_highlight_rules
+from app.services.excel_service import (
+    assemble_sheet_parts,
+    generate_excel,
+    render_week_sheet,
+    resolve_excel_engine,
+    week_mondays,
+    week_sheet_jobs,
+)
+from app.services.render_cache import RenderedFile, calendar_render_cache, make_etag
+from app.services.render_executor import run_render, run_render_many
+from app.services.state_store import state_store
 from app.services.word_service import generate_word, get_output_filename
-from app.services.template_service import get_template_path
-from app.utils.date_utils import group_items_by_date, choose_reference_monday
+from app.services.template_service import get_template_hash
 
 router = APIRouter(prefix="/api/calendar", tags=["calendar"])
 
+_EVENTS_ADAPTER = TypeAdapter(list[CalendarEvent])
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _events_from_body(body: bytes) -> list[CalendarEvent]:
+    return EventsPayload.model_validate_json(body).events
+
+
+# Чтение и запись состояния (SQLite, в режиме SHARED_STATE — с ожиданием блокировки
+# других воркеров) и пересчёт выделения выполняются в пуле потоков, вне event loop.
+def _sync_for_render(*names: str) -> None:
+    state_store.sync("calendar", *names)
+    sync_highlight_rules()
+
 
 @router.post("/receive", response_model=ReceiveResponse)
-async def receive_data(payload: EventsPayload):
-    """Приём единого массива событий. Автоматически разделяет по языку и типу."""
-    all_events = [ev.model_dump() for ev in payload.events]
-    
-    work_en, work_ru, holidays_en, holidays_ru = split_events_data(all_events)
-    
-    data_store["work_en"] = work_en
-    data_store["work_ru"] = work_ru
-    data_store["holidays_en"] = holidays_en
-    data_store["holidays_ru"] = holidays_ru
+async def receive_data(request: Request):
+    """Приём единого массива событий. Автоматически разделяет по языку и типу.
+
+    Тело: JSON `{"events": [...]}` или массив событий, либо NDJSON
+    (`application/x-ndjson`, событие на строку). Тело читается потоком,
+    события проверяются пачками и сразу превращаются в записи хранилища;
+    данные заменяются только после успешного чтения всего тела.
+    """
+    records: list[EventRecord] = []
+    async for batch in iter_validated_batches(
+        request, _EVENTS_ADAPTER, root_key="events", fallback=_events_from_body
+    ):
+        records.extend(EventRecord.from_model(ev) for ev in batch)
+
+    split = await run_in_threadpool(replace_records, records)
     
     return ReceiveResponse(
         status="ok",
-        total_received=len(all_events),
-        split={
-            "work_en": len(work_en),
-            "work_ru": len(work_ru),
-            "holidays_en": len(holidays_en),
-            "holidays_ru": len(holidays_ru),
-        }
+        total_received=len(records),
+        split=split,
+    )
+
+
+@router.post("/upsert", response_model=UpsertResponse)
+async def upsert_data(payload: UpsertPayload):
+    """Инкрементальное обновление: upsert событий и удаление по (source_id, Key)."""
+    counts = await run_in_threadpool(
+        upsert_events,
+        [ev.model_dump() for ev in payload.events],
+        delete=[(key.source_id, key.Key) for key in payload.delete],
+    )
+    return UpsertResponse(
+        status="ok",
+        **counts,
+        split={key: len(value) for key, value in data_store.items()},
     )
 
 
 @router.get("/status", response_model=StatusResponse)
 async def get_status():
     """Получить статус данных."""
+    await run_in_threadpool(state_store.sync, "calendar")
     return StatusResponse(
         status="ok",
         data={key: len(value) for key, value in data_store.items()}
     )
 
 
+@router.get("/cache")
+async def get_cache_stats():
+    """Статистика кэша сгенерированных файлов."""
+    await run_in_threadpool(state_store.sync, "calendar")
+    return {
+        "status": "ok",
+        "data_version": get_data_version(),
+        "cache": calendar_render_cache.stats(),
+        "state": state_store.stats(),
+    }
+
+
+async def _render_excel_range(index: CalendarIndex, mondays: list[date], engine: str) -> BytesIO:
+    """Книга за период: каждый лист недели целиком (ячейки, XML, сжатие) строится
+    в пуле параллельно, затем готовые части листов собираются в книгу на уровне zip."""
+    parts = await run_render_many(render_week_sheet, week_sheet_jobs(index, mondays, engine))
+    # Сборка только копирует сжатые части: выполняется здесь, без передачи листов в пул.
+    return await run_in_threadpool(assemble_sheet_parts, parts)
+
+
 @router.get("/generate")
-async def generate_calendar():
-    """Генерация Excel файла."""
+async def generate_calendar(
+    engine: Optional[str] = Query(
+        default=None,
+        description="Движок генерации: standard или streaming (по умолчанию из EXCEL_ENGINE)",
+    ),
+    date_from: Optional[date] = Query(
+        default=None,
+        alias="from",
+        description="Начало периода (YYYY-MM-DD): книга с листами RU/EN по каждой неделе периода",
+    ),
+    date_to: Optional[date] = Query(default=None, alias="to", description="Конец периода (YYYY-MM-DD)"),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Генерация Excel файла (одна неделя или период ?from=&to=)."""
     try:
-        buffer = generate_excel(
-            work_en=data_store["work_en"],
-            work_ru=data_store["work_ru"],
-            holidays_en=data_store["holidays_en"],
-            holidays_ru=data_store["holidays_ru"],
-        )
-        
-        combined_events_by_date = group_items_by_date(data_store["work_en"] + data_store["work_ru"])
-        combined_holidays_by_date = group_items_by_date(data_store["holidays_en"] + data_store["holidays_ru"])
-        
-        monday = choose_reference_monday(combined_events_by_date, combined_holidays_by_date)
-        filename = f"Calendar_{monday.day:02d}.{monday.month:02d}.{monday.year}.xlsx"
-        
-        return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        engine = resolve_excel_engine(engine)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    mondays: Optional[list[date]] = None
+    if date_from is not None or date_to is not None:
+        date_from = date_from or date_to
+        date_to = date_to or date_from
+        if date_from > date_to:
+            raise HTTPException(status_code=400, detail="'from' must not be later than 'to'.")
+        mondays = week_mondays(date_from, date_to)
+        if len(mondays) > MAX_EXPORT_WEEKS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Period is too long: {len(mondays)} weeks (max {MAX_EXPORT_WEEKS}).",
+            )
+
+    # Снимок данных: индекс не меняется, если во время генерации придёт новый /receive.
+    await run_in_threadpool(_sync_for_render)
+    # Версия читается до индекса: изменение данных в другом потоке между ними даёт
+    # ключ уже устаревшей версии, а не старые данные под ключом новой.
+    version = get_data_version()
+    index = get_calendar_index()
+    if mondays is None:
+        # Неделя зависит от текущей даты, если данных нет: она входит в ключ кэша.
+        monday = index.reference_monday()
+        key = ("xlsx", engine, version, index.highlight_rules, monday)
+    else:
+        key = ("xlsx-range", engine, version, index.highlight_rules, mondays[0], mondays[-1])
+    etag = make_etag(key)
+    if etag_matches(if_none_match, etag):
+        calendar_render_cache.record_not_modified()
+        return not_modified_response(etag)
+
+    rendered = calendar_render_cache.get(key)
+    if rendered is None:
+        try:
+            if mondays is None:
+                buffer = await run_render(
+                    generate_excel,
+                    index.for_week(monday),
+                    engine=engine,
+                    monday=monday,
+                )
+                filename = f"Calendar_{monday.day:02d}.{monday.month:02d}.{monday.year}.xlsx"
+            else:
+                buffer = await _render_excel_range(index, mondays, engine)
+                first, last = mondays[0], mondays[-1] + timedelta(days=4)
+                filename = (
+                    f"Calendar_{first.day:02d}.{first.month:02d}.{first.year}"
+                    f"-{last.day:02d}.{last.month:02d}.{last.year}.xlsx"
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating Excel: {str(e)}")
+
+        rendered = RenderedFile(
+            content=buffer.getvalue(),
+            media_type=XLSX_MIME,
+            filename=filename,
+            etag=etag,
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating Excel: {str(e)}")
+        calendar_render_cache.put(key, rendered)
+
+    return file_response(rendered)
 
 
 @router.get("/generate-word")
-async def generate_word_calendar():
+async def generate_word_calendar(if_none_match: Optional[str] = Header(default=None)):
     """Генерация Word документа из шаблона."""
+    # Снимок данных: индекс не меняется, если во время генерации придёт новый /receive.
+    await run_in_threadpool(_sync_for_render, "template")
     try:
+        template_hash = get_template_hash()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    version = get_data_version()
+    index = get_calendar_index()
+    monday = index.reference_monday()
+    key = ("docx", version, index.highlight_rules, template_hash, monday)
+    etag = make_etag(key)
+    if etag_matches(if_none_match, etag):
+        calendar_render_cache.record_not_modified()
+        return not_modified_response(etag)
+
+    rendered = calendar_render_cache.get(key)
+    if rendered is None:
         try:
-            template_path = get_template_path()
-        except FileNotFoundError as e:
-            raise HTTPException(status_code=404, detail=str(e))
-        
-        buffer = generate_word(
-            work_en=data_store["work_en"],
-            work_ru=data_store["work_ru"],
-            holidays_en=data_store["holidays_en"],
-            holidays_ru=data_store["holidays_ru"],
-            template_path=template_path,
-        )
-        
-        filename = get_output_filename(
-            events=(data_store["work_ru"] + data_store["work_en"]),
-            holidays=(data_store["holidays_ru"] + data_store["holidays_en"]),
-        )
-        
-        return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            buffer = await run_render(
+                generate_word,
+                index.for_week(monday),
+                template_sha256=template_hash,
+                monday=monday,
+            )
+            filename = get_output_filename(index, monday)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating Word: {str(e)}")
+
+        rendered = RenderedFile(
+            content=buffer.getvalue(),
+            media_type=DOCX_MIME,
+            filename=filename,
+            etag=etag,
         )
+        calendar_render_cache.put(key, rendered)
+
+    return file_response(rendered)
+
+
+@router.get("/highlight-rules")
+async def get_highlight_rules():
+    """Текущие правила выделения событий красным."""
+    await run_in_threadpool(sync_highlight_rules)
+    return {"status": "ok", **get_highlight_engine().describe()}
+
+
+@router.put("/highlight-rules")
+async def put_highlight_rules(payload: HighlightRulesPayload):
+    """Заменить правила выделения (применяются к уже загруженным событиям без повторного приёма)."""
+    try:
+        engine = await run_in_threadpool(update_highlight_rules, [rule.model_dump() for rule in payload.rules])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating Word: {str(e)}")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save highlight rules: {e}")
+    changed = await run_in_threadpool(sync_highlight_rules)
+    return {"status": "ok", "changed_events": changed, **engine.describe()}
 
 
 @router.post("/clear")
 async def clear_data():
     """Очистка данных."""
-    for key in data_store:
-        data_store[key] = []
+    await run_in_threadpool(clear_events)
+    calendar_render_cache.clear()
     return {"status": "ok", "message": "Data cleared"}
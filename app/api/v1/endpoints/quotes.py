@@ -2,44 +2,80 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from datetime import date, datetime, timezone
+from typing import Optional
 
+from fastapi import APIRouter, File, Header, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from pydantic import TypeAdapter
+
+from app.api.v1.ingest import iter_validated_batches
+from app.api.v1.responses import etag_matches, file_response, not_modified_response
 from app.models.schemas import (
+    QuoteHistoryPoint,
+    QuoteHistoryResponse,
     QuoteItem,
     QuotesPayload,
     QuotesReceiveResponse,
     QuotesStatusResponse,
 )
+from app.services.quotes_analytics import get_quote_analytics
 from app.services.quotes_doc_service import fill_template, get_quotes_filename, parse_quotes
-from app.services.quotes_store import quotes_store, set_quotes
+from app.services.quotes_store import get_quotes_snapshot, quote_history, quotes_store, set_quotes
 from app.services.quotes_template_service import (
     DOCX_MIME,
+    get_template_hash,
     get_template_info,
     get_template_path,
     update_template_bytes,
 )
+from app.services.render_cache import RenderedFile, make_etag, quotes_render_cache
+from app.services.render_executor import run_render
+from app.services.state_store import state_store
 
 router = APIRouter(prefix="/api/quotes", tags=["quotes"])
 
+_QUOTES_ADAPTER = TypeAdapter(list[QuoteItem])
+_QUOTES_BODY_ADAPTER = TypeAdapter(QuotesPayload | list[QuoteItem])
+
+
+def _quotes_from_body(body: bytes) -> list[QuoteItem]:
+    payload = _QUOTES_BODY_ADAPTER.validate_json(body)
+    return payload.quotes if isinstance(payload, QuotesPayload) else payload
+
+
+def _store_quotes(raw_quotes: list[dict], report_date: Optional[str], report_dt: Optional[date], quotes) -> None:
+    set_quotes(quotes=raw_quotes, report_date=report_date)
+    # Без даты отчёта котировки попадают в историю на дату приёма (UTC).
+    quote_history.record(report_dt or datetime.now(timezone.utc).date(), quotes)
 
-@router.post("/receive", response_model=QuotesReceiveResponse)
-async def receive_quotes(payload: QuotesPayload | list[QuoteItem]):
-    """Receive quotes JSON (either {quotes:[...]} or a raw list)."""
-    items = payload.quotes if isinstance(payload, QuotesPayload) else payload
-    raw_quotes = [q.model_dump() for q in items]
 
-    _quotes, report_dt = parse_quotes(raw_quotes)
+@router.post("/receive", response_model=QuotesReceiveResponse)
+async def receive_quotes(request: Request):
+    """Receive quotes JSON (either {quotes:[...]} or a raw list) or NDJSON (one quote per line).
+
+    The body is read as a stream and validated in batches.
+    """
+    raw_quotes: list[dict] = []
+    async for batch in iter_validated_batches(
+        request, _QUOTES_ADAPTER, root_key="quotes", fallback=_quotes_from_body
+    ):
+        raw_quotes.extend(q.model_dump() for q in batch)
+
+    quotes, report_dt = parse_quotes(raw_quotes)
     report_date_str = report_dt.isoformat() if report_dt is not None else None
 
-    set_quotes(quotes=raw_quotes, report_date=report_date_str)
+    # Запись в SQLite и файл истории (под блокировками) — в пуле потоков, вне event loop.
+    await run_in_threadpool(_store_quotes, raw_quotes, report_date_str, report_dt, quotes)
 
-    return QuotesReceiveResponse(status="ok", total_received=len(items))
+    return QuotesReceiveResponse(status="ok", total_received=len(raw_quotes))
 
 
 @router.get("/status", response_model=QuotesStatusResponse)
 async def quotes_status():
     """Get current quotes status."""
+    await run_in_threadpool(state_store.sync, "quotes")
     return QuotesStatusResponse(
         status="ok",
         total_quotes=len(quotes_store["quotes"]),
@@ -48,34 +84,88 @@ async def quotes_status():
     )
 
 
+@router.get("/history", response_model=QuoteHistoryResponse)
+async def quotes_history(
+    symbol: str = Query(..., description="Символ котировки (без учёта регистра)"),
+    date_from: Optional[date] = Query(default=None, alias="from", description="Начало периода (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(default=None, alias="to", description="Конец периода (YYYY-MM-DD)"),
+):
+    """Get the quote history of a symbol by report date."""
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be later than 'to'.")
+    # Чтение истории ждёт блокировок файла (запись, перестройка в другом воркере) — вне event loop.
+    points = await run_in_threadpool(quote_history.points, symbol, date_from, date_to)
+    if points is None:
+        raise HTTPException(status_code=404, detail=f"No history for symbol '{symbol}'.")
+    return QuoteHistoryResponse(
+        status="ok",
+        symbol=symbol.strip().lower(),
+        points=[QuoteHistoryPoint(**point._asdict()) for point in points],
+    )
+
+
+@router.get("/analytics")
+async def quotes_analytics(
+    window: int = Query(default=20, ge=2, description="Окно волатильности и min/max (наблюдений)"),
+    top: int = Query(default=5, ge=1, le=100, description="Сколько лидеров роста и падения вернуть"),
+):
+    """Get returns, volatility, min/max and top movers over the quotes history."""
+    # При промахе кэша читает всю историю под блокировкой файла и считает в NumPy — вне event loop.
+    analytics = await run_in_threadpool(get_quote_analytics, window=window, top=top)
+    return {"status": "ok", **analytics}
+
+
+@router.get("/cache")
+async def quotes_cache_stats():
+    """Get rendered quotes documents cache statistics."""
+    history = await run_in_threadpool(quote_history.stats)
+    return {"status": "ok", "cache": quotes_render_cache.stats(), "history": history}
+
+
 @router.get("/daily/word")
-async def daily_quotes_word():
+async def daily_quotes_word(if_none_match: Optional[str] = Header(default=None)):
     """Generate a Word document using the current quotes and the quotes template."""
-    if not quotes_store["quotes"]:
+    await run_in_threadpool(state_store.sync, "quotes", "quotes_template")
+    raw_quotes, payload_hash = get_quotes_snapshot()
+    if not raw_quotes:
         raise HTTPException(status_code=400, detail="No quotes received yet.")
 
     try:
-        template_path = get_template_path()
+        template_hash = get_template_hash()
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-    try:
-        quotes, report_dt = parse_quotes(quotes_store["quotes"])
-        buffer, updated_rows = fill_template(template_path=template_path, quotes=quotes)
-        filename = get_quotes_filename(report_dt)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating Word: {str(e)}")
-
-    return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}",
-            "X-Updated-Rows": str(updated_rows),
-        },
-    )
+    key = ("quotes-docx", payload_hash, template_hash)
+    etag = make_etag(key)
+    if etag_matches(if_none_match, etag):
+        quotes_render_cache.record_not_modified()
+        return not_modified_response(etag)
+
+    rendered = quotes_render_cache.get(key)
+    if rendered is None:
+        try:
+            quotes, report_dt = parse_quotes(raw_quotes)
+            buffer, updated_rows = await run_render(
+                fill_template,
+                quotes=quotes,
+                template_sha256=template_hash,
+            )
+            filename = get_quotes_filename(report_dt)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating Word: {str(e)}")
+
+        rendered = RenderedFile(
+            content=buffer.getvalue(),
+            media_type=DOCX_MIME,
+            filename=filename,
+            etag=etag,
+            headers={"X-Updated-Rows": str(updated_rows)},
+        )
+        quotes_render_cache.put(key, rendered)
+
+    return file_response(rendered)
 
 
 @router.get("/template")
@@ -107,7 +197,8 @@ async def upload_quotes_template(file: UploadFile = File(...)):
     """Upload and activate a new quotes Word template (.docx) without restarting the service."""
     data = await file.read()
     try:
-        info = update_template_bytes(
+        info = await run_in_threadpool(
+            update_template_bytes,
             data,
             filename=file.filename,
             content_type=file.content_type,
@@ -1,6 +1,7 @@
 """Word template management endpoints."""
 
 from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 
 from app.services.template_service import (
@@ -42,7 +43,8 @@ async def upload_template(file: UploadFile = File(...)):
     """Upload and activate a new Word template (.docx) without restarting the service."""
     data = await file.read()
     try:
-        info = update_template_bytes(
+        info = await run_in_threadpool(
+            update_template_bytes,
             data,
             filename=file.filename,
             content_type=file.content_type,
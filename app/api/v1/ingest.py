@@ -0,0 +1,289 @@
+"""Streaming ingestion of large JSON / NDJSON request bodies.
+
+``/receive`` endpoints read the request body as a stream instead of letting
+FastAPI parse it whole into a payload model. Items are decoded as they
+arrive and validated in batches with a ``TypeAdapter``, so at any time only
+one batch of Pydantic models exists. The body is cut off with ``413`` as soon
+as it exceeds the size limit.
+
+Supported bodies:
+
+* ``application/x-ndjson`` (also ``application/jsonl``): one item per line;
+* JSON: a top-level array, or an object whose first key is the item list
+  (``{"events": [...]}``). Other JSON shapes are read whole and validated by
+  the fallback model.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.config import INGEST_BATCH_SIZE, INGEST_MAX_BYTES
+
+T = TypeVar("T")
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Сколько символов начала тела достаточно, чтобы узнать форму JSON.
+_MAX_PREFIX = 256
+
+
+class UnsupportedShape(Exception):
+    """The JSON body is not an array or an object starting with the item list."""
+
+
+class JsonArrayStream:
+    """Incremental reader of array items from JSON text fed in chunks."""
+
+    def __init__(self, root_key: Optional[str] = None):
+        self.root_key = root_key
+        self._root_prefix = re.compile(r'\{[ \t\n\r]*"%s"[ \t\n\r]*:[ \t\n\r]*\[' % re.escape(root_key or ""))
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._offset = 0  # символов отброшено из начала буфера
+        self._state = "start"  # start -> items -> tail (объект) -> done
+        self._need_comma = False
+        self.in_object = False
+
+    @property
+    def started(self) -> bool:
+        """Форма тела уже определена (откат на полное чтение больше невозможен)."""
+        return self._state != "start"
+
+    def _error(self, msg: str, pos: int) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buf, pos)
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Добавить текст; вернуть элементы массива, разобранные целиком."""
+        self._offset += self._pos
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        buf = self._buf
+        items = []
+
+        while True:
+            pos = _WHITESPACE.match(buf, self._pos).end()
+            self._pos = pos
+            if pos == len(buf):
+                break
+            char = buf[pos]
+
+            if self._state == "start":
+                if char == "[":
+                    self._state, self._pos = "items", pos + 1
+                    continue
+                if char == "{" and self.root_key:
+                    match = self._root_prefix.match(buf, pos)
+                    if match:
+                        self._state, self._pos, self.in_object = "items", match.end(), True
+                        continue
+                    if not final and len(buf) - pos < _MAX_PREFIX:
+                        break
+                raise UnsupportedShape()
+
+            if self._state == "items":
+                if char == "]":
+                    self._state, self._pos = ("tail" if self.in_object else "done"), pos + 1
+                    continue
+                if self._need_comma:
+                    if char != ",":
+                        raise self._error("Expecting ',' delimiter", pos)
+                    self._need_comma, self._pos = False, pos + 1
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                # Число в конце буфера может продолжиться в следующем фрагменте.
+                if end == len(buf) and not final:
+                    break
+                items.append(item)
+                self._need_comma, self._pos = True, end
+                continue
+
+            if self._state == "tail":
+                # Остальные ключи объекта не нужны, но тело должно быть корректным JSON.
+                if not final:
+                    break
+                rest = buf[pos:].rstrip()
+                if rest.startswith(","):
+                    json.loads("{" + rest[1:])
+                elif rest != "}":
+                    raise self._error("Expecting ',' delimiter", pos)
+                self._state, self._pos = "done", len(buf)
+                continue
+
+            raise self._error("Extra data", pos)
+
+        if final and self._state != "done":
+            raise self._error("Unexpected end of JSON body", len(buf))
+        return items
+
+    def position(self, pos: int) -> int:
+        return self._offset + pos
+
+
+async def _limited_stream(request: Request, limit: int) -> AsyncIterator[bytes]:
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Payload too large (limit {limit} bytes).")
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(status_code=413, detail=f"Payload too large (limit {limit} bytes).")
+        if chunk:
+            yield chunk
+
+
+def _json_invalid(loc: tuple, message: str) -> RequestValidationError:
+    return RequestValidationError([{
+        "type": "json_invalid",
+        "loc": ("body", *loc),
+        "msg": "JSON decode error",
+        "input": {},
+        "ctx": {"error": message},
+    }])
+
+
+def _validation_error(e: ValidationError, loc: tuple, first_index: int = 0) -> RequestValidationError:
+    """Ошибки пачки с индексами элементов в теле запроса."""
+    errors = []
+    for error in e.errors(include_url=False):
+        error_loc = tuple(error["loc"])
+        if error_loc and isinstance(error_loc[0], int):
+            error_loc = (error_loc[0] + first_index, *error_loc[1:])
+        errors.append({**error, "loc": ("body", *loc, *error_loc)})
+    return RequestValidationError(errors)
+
+
+def _validate_batch(adapter: TypeAdapter[list[T]], batch: list, loc: tuple, first_index: int) -> list[T]:
+    try:
+        return adapter.validate_python(batch)
+    except ValidationError as e:
+        raise _validation_error(e, loc, first_index) from None
+
+
+async def _ndjson_batches(
+    stream: AsyncIterator[bytes],
+    adapter: TypeAdapter[list[T]],
+    batch_size: int,
+) -> AsyncIterator[list[T]]:
+    pending = b""
+    batch: list[bytes] = []
+    first_index = 0
+
+    def validate(lines: list[bytes], index: int) -> list[T]:
+        # Строки пачки проверяются одним вызовом validate_json (разбор JSON в pydantic-core).
+        try:
+            return adapter.validate_json(b"[" + b",".join(lines) + b"]")
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                for i, line in enumerate(lines):
+                    try:
+                        json.loads(line)
+                    except ValueError as line_error:
+                        raise _json_invalid((index + i,), str(line_error)) from None
+            raise _validation_error(e, (), index) from None
+
+    async for chunk in stream:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                batch.append(line)
+            if len(batch) >= batch_size:
+                yield validate(batch, first_index)
+                first_index += len(batch)
+                batch = []
+    if pending.strip():
+        batch.append(pending)
+    if batch:
+        yield validate(batch, first_index)
+
+
+async def _json_batches(
+    stream: AsyncIterator[bytes],
+    adapter: TypeAdapter[list[T]],
+    batch_size: int,
+    root_key: Optional[str],
+    fallback: Callable[[bytes], list[T]],
+) -> AsyncIterator[list[T]]:
+    reader = JsonArrayStream(root_key)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    head: list[bytes] = []  # начало тела, пока форма не определена
+    batch: list = []
+    first_index = 0
+
+    def loc() -> tuple:
+        return (root_key,) if reader.in_object else ()
+
+    chunks = stream.__aiter__()
+    final = False
+    while not final:
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            chunk, final = b"", True
+        if not reader.started:
+            head.append(chunk)
+        try:
+            items = reader.feed(text_decoder.decode(chunk, final), final)
+        except UnsupportedShape:
+            rest = [part async for part in chunks]
+            try:
+                yield fallback(b"".join(head + rest))
+            except ValidationError as e:
+                raise _validation_error(e, ()) from None
+            return
+        except json.JSONDecodeError as e:
+            raise _json_invalid((), f"{e.msg} (char {reader.position(e.pos)})") from None
+        except UnicodeDecodeError as e:
+            raise _json_invalid((), str(e)) from None
+        if reader.started:
+            head.clear()
+
+        batch.extend(items)
+        while len(batch) >= batch_size:
+            yield _validate_batch(adapter, batch[:batch_size], loc(), first_index)
+            first_index += batch_size
+            del batch[:batch_size]
+    if batch:
+        yield _validate_batch(adapter, batch, loc(), first_index)
+
+
+async def iter_validated_batches(
+    request: Request,
+    adapter: TypeAdapter[list[T]],
+    *,
+    root_key: Optional[str],
+    fallback: Callable[[bytes], list[T]],
+    batch_size: int = INGEST_BATCH_SIZE,
+    limit: int = INGEST_MAX_BYTES,
+) -> AsyncIterator[list[T]]:
+    """Элементы тела запроса, проверенные пачками по ``batch_size``.
+
+    ``fallback`` проверяет целиком тело JSON другой формы (например, объект,
+    где список идёт не первым ключом). Ошибки проверки — 422 в формате FastAPI,
+    превышение ``limit`` — 413.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    stream = _limited_stream(request, limit)
+    batch_size = max(1, batch_size)
+    if media_type in NDJSON_MEDIA_TYPES:
+        batches = _ndjson_batches(stream, adapter, batch_size)
+    else:
+        batches = _json_batches(stream, adapter, batch_size, root_key, fallback)
+    async for batch in batches:
+        yield batch
@@ -0,0 +1,37 @@
+"""Shared responses for rendered files (conditional GET support)."""
+from typing import Optional
+
+from fastapi import Response
+
+from app.services.render_cache import RenderedFile
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def not_modified_response(etag: str) -> Response:
+    """Ответ 304 без тела."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def file_response(item: RenderedFile) -> Response:
+    """Ответ с содержимым сгенерированного файла."""
+    headers = {
+        "Content-Disposition": f"attachment; filename={item.filename}",
+        "ETag": item.etag,
+        "Cache-Control": CACHE_CONTROL,
+        **item.headers,
+    }
+    return Response(content=item.content, media_type=item.media_type, headers=headers)
@@ -18,6 +18,47 @@ _default_quotes_template_path = (
 )
 QUOTES_TEMPLATE_PATH = Path(os.getenv("QUOTES_TEMPLATE_PATH", _default_quotes_template_path))
 
+# Кэш сгенерированных документов (LRU в памяти)
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "32"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+QUOTES_RENDER_CACHE_MAX_ENTRIES = int(os.getenv("QUOTES_RENDER_CACHE_MAX_ENTRIES", "8"))
+
+# Пул для генерации документов: "process" (несколько ядер) или "thread"
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "process").strip().lower()
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Движок генерации Excel: "standard" (книга в памяти) или "streaming" (write-only)
+EXCEL_ENGINES = ("standard", "streaming")
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "standard").strip().lower()
+
+# Максимальное число недель в одной выгрузке Excel за период (?from=&to=)
+MAX_EXPORT_WEEKS = int(os.getenv("MAX_EXPORT_WEEKS", "53"))
+
+# Сохранение данных календаря и котировок между перезапусками (SQLite в томе /data)
+_default_data_dir = str(BASE_DIR / "data") if os.name == "nt" else "/data"
+DATA_DIR = Path(os.getenv("DATA_DIR", _default_data_dir))
+STATE_DB_PATH = Path(os.getenv("STATE_DB_PATH", str(DATA_DIR / "state.sqlite3")))
+PERSIST_STATE = os.getenv("PERSIST_STATE", "1").strip().lower() not in ("0", "false", "no", "off")
+# Сколько инкрементальных записей журнала накапливать до сжатия в снимок
+STATE_COMPACT_EVERY = int(os.getenv("STATE_COMPACT_EVERY", "100"))
+# История котировок: кольцевой буфер на символ в файле, отображаемом в память (mmap)
+QUOTES_HISTORY_PATH = Path(os.getenv("QUOTES_HISTORY_PATH", str(DATA_DIR / "quotes_history.bin")))
+# Сколько дат отчёта хранится на символ и сколько символов помещается в файл
+QUOTES_HISTORY_CAPACITY = int(os.getenv("QUOTES_HISTORY_CAPACITY", "1024"))
+QUOTES_HISTORY_MAX_SYMBOLS = int(os.getenv("QUOTES_HISTORY_MAX_SYMBOLS", "256"))
+# Несколько воркеров uvicorn (--workers / WEB_CONCURRENCY): данные читаются и пишутся
+# через общий файл STATE_DB_PATH синхронно, чтобы все воркеры видели одно состояние.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+SHARED_STATE = os.getenv("SHARED_STATE", "1" if WEB_CONCURRENCY > 1 else "0").strip().lower() in ("1", "true", "yes", "on")
+
+# Правила выделения событий красным (JSON; если файла нет — правила по умолчанию).
+# Изменения файла подхватываются без перезапуска.
+HIGHLIGHT_RULES_PATH = Path(os.getenv("HIGHLIGHT_RULES_PATH", str(DATA_DIR / "highlight_rules.json")))
+
+# Приём данных (/receive): тело читается потоком и проверяется пачками
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(64 * 1024 * 1024)))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+
 # Настройки приложения
 APP_TITLE = "Calendar Generator API"
 APP_DESCRIPTION = "API для генерации экономического календаря"
@@ -1,15 +1,49 @@
 """Main application entry point."""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import APP_TITLE, APP_DESCRIPTION, APP_VERSION
 from app.api.v1.endpoints import calendar
 from app.api.v1.endpoints import template
 from app.api.v1.endpoints import quotes
+from app.services.calendar_service import restore_events
+from app.services.data_store import set_data_version
+from app.services.quotes_store import quote_history, restore_quotes
+from app.services.quotes_template_service import restore_template as restore_quotes_template
+from app.services.render_executor import shutdown_render_executor, start_render_executor
+from app.services.state_store import state_store
+from app.services.template_service import restore_template
+
+
+def restore_state() -> None:
+    """Загрузить сохранённые данные календаря и котировок и запустить их запись."""
+    state_store.register("calendar", restore_events, on_version=set_data_version)
+    state_store.register("quotes", restore_quotes)
+    state_store.register("template", restore_template)
+    state_store.register("quotes_template", restore_quotes_template)
+    if state_store.open():
+        state_store.restore()
+    quote_history.open()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Восстановление данных, запуск и остановка пула генерации документов."""
+    await run_in_threadpool(restore_state)
+    await run_in_threadpool(start_render_executor)
+    yield
+    await run_in_threadpool(shutdown_render_executor)
+    await run_in_threadpool(state_store.close)
+    await run_in_threadpool(quote_history.close)
+
 
 app = FastAPI(
     title=APP_TITLE,
     description=APP_DESCRIPTION,
-    version=APP_VERSION
+    version=APP_VERSION,
+    lifespan=lifespan,
 )
 
 app.include_router(calendar.router)
@@ -24,17 +58,24 @@ async def root():
         "status": "ok",
         "message": "Excel/Word Generator API",
         "endpoints": {
-            "POST /api/calendar/receive": "Приём данных от n8n (единый файл Events.json)",
+            "POST /api/calendar/receive": "Приём данных от n8n (единый файл Events.json, JSON или NDJSON)",
+            "POST /api/calendar/upsert": "Инкрементальное обновление/удаление событий по source_id и Key",
             "GET /api/calendar/generate": "Генерация Excel файла",
             "GET /api/calendar/generate-word": "Генерация Word файла из шаблона",
             "GET /api/calendar/status": "Статус данных",
+            "GET /api/calendar/cache": "Статистика кэша сгенерированных файлов",
+            "GET /api/calendar/highlight-rules": "Правила выделения событий красным",
+            "PUT /api/calendar/highlight-rules": "Замена правил выделения (без повторного приёма данных)",
             "POST /api/calendar/clear": "Очистка данных",
             "GET /api/template": "Информация о шаблоне календаря",
             "POST /api/template": "Загрузить новый шаблон календаря (.docx)",
             "GET /api/template/download": "Скачать текущий шаблон календаря (.docx)",
             "GET /api/quotes/status": "Статус котировок",
-            "POST /api/quotes/receive": "Приём котировок (JSON)",
+            "POST /api/quotes/receive": "Приём котировок (JSON или NDJSON)",
+            "GET /api/quotes/history": "История котировок символа (?symbol=&from=&to=)",
+            "GET /api/quotes/analytics": "Доходности, волатильность и лидеры по истории котировок (?window=&top=)",
             "GET /api/quotes/daily/word": "Сформировать Word-документ с котировками",
+            "GET /api/quotes/cache": "Статистика кэша документов котировок",
             "GET /api/quotes/template": "Информация о шаблоне котировок",
             "POST /api/quotes/template": "Загрузить новый шаблон котировок (.docx)",
             "GET /api/quotes/template/download": "Скачать текущий шаблон котировок (.docx)",
@@ -1,4 +1,5 @@
 """Pydantic schemas for API requests and responses."""
+from datetime import date
 from typing import Optional
 from pydantic import BaseModel, ConfigDict
 
@@ -19,6 +20,31 @@ class EventsPayload(BaseModel):
     events: list[CalendarEvent]
 
 
+class EventKey(BaseModel):
+    """Identity of a calendar event for deletion (Key omitted: every event of the source)."""
+    source_id: Optional[str] = None
+    Key: Optional[int | str] = None
+
+
+class UpsertPayload(BaseModel):
+    """Schema for incremental upsert/delete of calendar events."""
+    events: list[CalendarEvent] = []
+    delete: list[EventKey] = []
+
+
+class HighlightRuleItem(BaseModel):
+    """Rule for red highlighting: substring ("text") or regular expression ("regex")."""
+    lang: str
+    pattern: str
+    kind: str = "text"
+    countries: list[str] = []
+
+
+class HighlightRulesPayload(BaseModel):
+    """Schema for replacing highlight rules."""
+    rules: list[HighlightRuleItem]
+
+
 class StatusResponse(BaseModel):
     """Schema for status response."""
     status: str
@@ -32,6 +58,16 @@ class ReceiveResponse(BaseModel):
     split: dict[str, int]
 
 
+class UpsertResponse(BaseModel):
+    """Schema for upsert endpoint response."""
+    status: str
+    inserted: int
+    updated: int
+    unchanged: int
+    removed: int
+    split: dict[str, int]
+
+
 class QuoteItem(BaseModel):
     """Schema for a single quote item (fields are intentionally flexible)."""
     model_config = ConfigDict(extra="allow")
@@ -60,3 +96,18 @@ class QuotesStatusResponse(BaseModel):
     total_quotes: int
     report_date: Optional[str] = None
     last_received_utc: Optional[str] = None
+
+
+class QuoteHistoryPoint(BaseModel):
+    """Schema for one report date of a symbol's quote history."""
+    date: date
+    old_price: Optional[float] = None
+    new_price: Optional[float] = None
+    pct_change: Optional[float] = None
+
+
+class QuoteHistoryResponse(BaseModel):
+    """Schema for quotes history endpoint response."""
+    status: str
+    symbol: str
+    points: list[QuoteHistoryPoint]
@@ -0,0 +1,188 @@
+"""Date index of calendar data, built once per data change.
+
+Renderers (Excel, Word, file names) need the same view of the data: events
+of each day sorted by time, holidays of each day grouped by name and the
+reference week. The index is built when ``data_store`` changes and is never
+modified afterwards, so a render only reads it and can safely hold on to it
+(or receive a copy in a pool process) while new data arrives.
+
+Each ``data_store`` list is grouped separately and the result is reused
+while the list object is unchanged. Lists are replaced copy-on-write, so
+after an upsert only the days of added or removed events are regrouped.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from operator import attrgetter
+from typing import NamedTuple, Optional
+
+from app.services.data_store import DataStore, data_store
+from app.services.event_record import EventRecord
+from app.services.highlight_rules import get_highlight_engine
+from app.utils.date_utils import count_items_by_week, pick_reference_monday
+
+LANGUAGES = ("ru", "en")
+
+
+class HolidayGroup(NamedTuple):
+    """Праздник дня: название и коды стран (отсортированы, без повторов)."""
+    name: str
+    countries: tuple[str, ...]
+
+
+class DayEntry(NamedTuple):
+    """Данные одного дня на одном языке."""
+    events: tuple[EventRecord, ...]  # по времени (time_key), при равенстве — в порядке приёма
+    holidays: tuple[HolidayGroup, ...]  # в порядке первого появления названия
+
+
+EMPTY_DAY = DayEntry((), ())
+
+
+@dataclass(frozen=True)
+class CalendarIndex:
+    """Неизменяемый индекс календаря: язык -> дата -> DayEntry и выбор недели."""
+    days: dict[str, dict[date, DayEntry]]
+    week_scores: dict[date, int]
+    as_of: date
+    monday: date
+    highlight_rules: str = ""  # digest правил, по которым вычислено выделение событий
+
+    def reference_monday(self, today: Optional[date] = None) -> date:
+        """Неделя для генерации (при равенстве выбирается ближайшая к ``today``)."""
+        today = today or date.today()
+        if today == self.as_of:
+            return self.monday
+        return pick_reference_monday(self.week_scores, today)
+
+    def day(self, lang: str, d: date) -> DayEntry:
+        return self.days.get(lang, {}).get(d, EMPTY_DAY)
+
+    def week_days(self, lang: str, monday: date) -> dict[date, DayEntry]:
+        """Дни недели ``monday`` на языке ``lang`` (только дни с данными)."""
+        days = self.days.get(lang, {})
+        week = (monday + timedelta(days=i) for i in range(7))
+        return {d: days[d] for d in week if d in days}
+
+    def for_week(self, monday: date) -> "CalendarIndex":
+        """Индекс только с днями одной недели (для передачи в процесс пула)."""
+        return CalendarIndex(
+            days={lang: self.week_days(lang, monday) for lang in self.days},
+            week_scores=self.week_scores,
+            as_of=self.as_of,
+            monday=self.monday,
+            highlight_rules=self.highlight_rules,
+        )
+
+
+def _order_events(day_items: list[EventRecord]) -> tuple[EventRecord, ...]:
+    return tuple(sorted(day_items, key=attrgetter("time_key")))
+
+
+def _order_holidays(day_items: list[EventRecord]) -> tuple[EventRecord, ...]:
+    return tuple(day_items)
+
+
+def group_holidays_by_name(holidays) -> tuple[HolidayGroup, ...]:
+    """Праздники дня по названию: страны каждого праздника без повторов."""
+    grouped: dict[str, list[str]] = {}
+    for hol in holidays:
+        name = hol.holiday or hol.event
+        if name:
+            grouped.setdefault(name, []).append(hol.country)
+    return tuple(HolidayGroup(name, tuple(sorted(set(countries)))) for name, countries in grouped.items())
+
+
+class _ListGrouping(NamedTuple):
+    source: list[EventRecord]
+    by_date: dict[date, tuple[EventRecord, ...]]
+
+
+_DAY_ORDER = {
+    "work_en": _order_events,
+    "work_ru": _order_events,
+    "holidays_en": _order_holidays,
+    "holidays_ru": _order_holidays,
+}
+
+_lock = threading.Lock()
+_groupings: dict[str, _ListGrouping] = {}
+
+
+def _grouped(name: str, items: list[EventRecord]) -> dict[date, tuple[EventRecord, ...]]:
+    """Список ``items`` по датам; пересобираются только дни, где события добавлены или удалены.
+
+    События сравниваются по id(): предыдущий список хранится в кэше, поэтому
+    id его событий не могут достаться новым объектам.
+    """
+    cached = _groupings.get(name)
+    if cached is not None and cached.source is items:
+        return cached.by_date
+    old_items = cached.source if cached is not None else []
+    old_by_date = cached.by_date if cached is not None else {}
+
+    old_ids = {id(item) for item in old_items}
+    new_ids = {id(item) for item in items}
+    affected = {item.day for item in items if id(item) not in old_ids}
+    affected.update(item.day for item in old_items if id(item) not in new_ids)
+    affected.discard(None)
+
+    by_date = {d: day for d, day in old_by_date.items() if d not in affected}
+    if affected:
+        regrouped: dict[date, list[EventRecord]] = {}
+        for item in items:
+            if item.day in affected:
+                regrouped.setdefault(item.day, []).append(item)
+        order = _DAY_ORDER[name]
+        for d, day_items in regrouped.items():
+            by_date[d] = order(day_items)
+
+    _groupings[name] = _ListGrouping(items, by_date)
+    return by_date
+
+
+def build_calendar_index(
+    store: DataStore,
+    today: Optional[date] = None,
+    highlight_rules: str = "",
+) -> CalendarIndex:
+    """Построить индекс по спискам ``store`` (неизменённые списки не перегруппировываются)."""
+    with _lock:
+        grouped = {name: _grouped(name, store[name]) for name in _DAY_ORDER}
+
+    days: dict[str, dict[date, DayEntry]] = {}
+    for lang in LANGUAGES:
+        events = grouped[f"work_{lang}"]
+        holidays = grouped[f"holidays_{lang}"]
+        days[lang] = {
+            d: DayEntry(events.get(d, ()), group_holidays_by_name(holidays.get(d, ())))
+            for d in sorted(events.keys() | holidays.keys())
+        }
+
+    week_scores = count_items_by_week(*grouped.values())
+    as_of = today or date.today()
+    return CalendarIndex(
+        days=days,
+        week_scores=week_scores,
+        as_of=as_of,
+        monday=pick_reference_monday(week_scores, as_of),
+        highlight_rules=highlight_rules,
+    )
+
+
+def refresh_calendar_index(store: DataStore, highlight_rules: str = "") -> CalendarIndex:
+    """Перестроить текущий индекс после изменения ``store`` (вызывается под store_lock)."""
+    global _current
+    _current = build_calendar_index(store, highlight_rules=highlight_rules)
+    return _current
+
+
+def get_calendar_index() -> CalendarIndex:
+    """Текущий индекс календаря (снимок: последующие изменения данных его не меняют)."""
+    return _current
+
+
+_current: CalendarIndex = build_calendar_index(data_store, highlight_rules=get_highlight_engine().digest)
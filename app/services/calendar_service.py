@@ -1,31 +1,230 @@
 """Calendar data processing service."""
-from app.utils.text_utils import has_cyrillic
+from typing import Iterable, Optional
+
+from app.services.calendar_index import refresh_calendar_index
+from app.services.data_store import (
+    EventIdentity,
+    bump_data_version,
+    data_store,
+    event_index,
+    store_lock,
+)
+from app.services.event_record import EventRecord
+from app.services.highlight_rules import HighlightEngine, get_highlight_engine, refresh_highlight_rules
+from app.services.state_store import PersistedState, StateChange, state_store
+
+
+def to_records(items: Iterable) -> list[EventRecord]:
+    """Записи EventRecord из dict событий (не-dict элементы пропускаются)."""
+    return [EventRecord.from_dict(item) for item in items if isinstance(item, dict)]
 
 
 def split_events_data(all_data: list) -> tuple[list, list, list, list]:
     """Разделяет данные из единого файла на 4 списка: work_en, work_ru, holidays_en, holidays_ru."""
-    work_en = []
-    work_ru = []
-    holidays_en = []
-    holidays_ru = []
-    
-    for item in all_data:
-        if not isinstance(item, dict):
-            continue
-        
-        is_holiday = "holiday" in item and item.get("holiday")
-        text_to_check = item.get("holiday", "") if is_holiday else item.get("event", "")
-        is_russian = has_cyrillic(text_to_check)
-        
-        if is_holiday:
-            if is_russian:
-                holidays_ru.append(item)
+    return split_records(to_records(all_data))
+
+
+def split_records(records: Iterable[EventRecord]) -> tuple[list, list, list, list]:
+    """Разделяет записи на 4 списка: work_en, work_ru, holidays_en, holidays_ru."""
+    buckets: dict[str, list[EventRecord]] = {
+        "work_en": [],
+        "work_ru": [],
+        "holidays_en": [],
+        "holidays_ru": [],
+    }
+
+    for record in records:
+        buckets[record.bucket].append(record)
+
+    return buckets["work_en"], buckets["work_ru"], buckets["holidays_en"], buckets["holidays_ru"]
+
+
+def event_identity(item: EventRecord) -> EventIdentity:
+    """Идентичность события для upsert/delete: (source_id, Key)."""
+    return item.identity
+
+
+def _rebuild_index() -> None:
+    event_index.clear()
+    for name, items in data_store.items():
+        for item in items:
+            event_index[event_identity(item)] = (name, item)
+
+
+# Правила, по которым вычислены признаки выделения записей data_store.
+_highlight_engine: HighlightEngine = get_highlight_engine()
+
+
+def _apply_highlight_rules(engine: HighlightEngine) -> int:
+    """Пересчитать выделение записей, вычисленное по другим правилам (вызывается под store_lock).
+
+    Записи с изменившимся признаком заменяются копиями (в списке-копии), у
+    остальных только обновляется rules_version. Возвращает число замен.
+    """
+    changed = 0
+    for name, items in data_store.items():
+        replaced: dict[int, EventRecord] = {}
+        for item in items:
+            if item.rules_version == engine.version:
+                continue
+            record = item.with_highlight(engine)
+            if record.highlight != item.highlight:
+                replaced[id(item)] = record
+                event_index[event_identity(record)] = (name, record)
             else:
-                holidays_en.append(item)
+                item.rules_version = engine.version
+        if replaced:
+            data_store[name] = [replaced.get(id(item), item) for item in items]
+            changed += len(replaced)
+    return changed
+
+
+def _refresh_index() -> int:
+    """Привести выделение к текущим правилам и перестроить индекс (вызывается под store_lock)."""
+    global _highlight_engine
+    engine = get_highlight_engine()
+    changed = _apply_highlight_rules(engine)
+    _highlight_engine = engine
+    refresh_calendar_index(data_store, highlight_rules=engine.digest)
+    return changed
+
+
+def sync_highlight_rules() -> int:
+    """Подхватить изменённые правила выделения. Возвращает число событий, у которых изменился признак."""
+    engine = refresh_highlight_rules()
+    if engine is _highlight_engine:
+        return 0
+    with store_lock:
+        return _refresh_index()
+
+
+def _save_state(change: StateChange, entry: Optional[dict] = None) -> None:
+    """Передать изменение на сохранение (списки data_store не меняются на месте, снимок — ссылки).
+
+    Записи EventRecord сериализуются через to_dict при записи.
+    """
+    change.save(dict(data_store), entry)
+
+
+def replace_records(records: Iterable[EventRecord]) -> dict[str, int]:
+    """Полная замена данных календаря готовыми записями (потоковый приём)."""
+    work_en, work_ru, holidays_en, holidays_ru = split_records(records)
+    with state_store.mutation("calendar") as change, store_lock:
+        data_store["work_en"] = work_en
+        data_store["work_ru"] = work_ru
+        data_store["holidays_en"] = holidays_en
+        data_store["holidays_ru"] = holidays_ru
+        _rebuild_index()
+        _refresh_index()
+        bump_data_version()
+        _save_state(change)
+    return {key: len(value) for key, value in data_store.items()}
+
+
+def clear_events() -> None:
+    """Очистка данных календаря."""
+    with state_store.mutation("calendar") as change, store_lock:
+        for key in data_store:
+            data_store[key] = []
+        event_index.clear()
+        _refresh_index()
+        bump_data_version()
+        _save_state(change)
+
+
+def _apply_upsert(
+    events: list[EventRecord],
+    delete: Iterable[tuple[Optional[str], Optional[int | str]]],
+) -> dict[str, int]:
+    """Применить upsert/delete к data_store (вызывается под store_lock)."""
+    # Заменяемые и удаляемые события адресуются по id() объекта в списке:
+    # пересборка списка не вычисляет идентичность каждого события.
+    replaced: dict[str, dict[int, EventRecord]] = {}
+    removed_ids: dict[str, set[int]] = {}
+    appended: dict[str, list[EventRecord]] = {}
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+
+    for source_id, key in delete:
+        if key is None:
+            identities = [ident for ident in event_index if ident[0] == source_id]
         else:
-            if is_russian:
-                work_ru.append(item)
-            else:
-                work_en.append(item)
-    
-    return work_en, work_ru, holidays_en, holidays_ru
+            identities = [(source_id, str(key))]
+        for ident in identities:
+            entry = event_index.pop(ident, None)
+            if entry is not None:
+                removed_ids.setdefault(entry[0], set()).add(id(entry[1]))
+                counts["removed"] += 1
+
+    # Повтор идентичности в одном запросе: побеждает последнее событие.
+    latest = {event_identity(item): item for item in events}
+    for ident, item in latest.items():
+        name = item.bucket
+        entry = event_index.get(ident)
+        if entry is None:
+            appended.setdefault(name, []).append(item)
+            counts["inserted"] += 1
+        elif entry[1] == item:
+            counts["unchanged"] += 1
+            continue
+        elif entry[0] == name:
+            replaced.setdefault(name, {})[id(entry[1])] = item
+            counts["updated"] += 1
+        else:
+            removed_ids.setdefault(entry[0], set()).add(id(entry[1]))
+            appended.setdefault(name, []).append(item)
+            counts["updated"] += 1
+        event_index[ident] = (name, item)
+
+    for name in replaced.keys() | removed_ids.keys() | appended.keys():
+        replace_map = replaced.get(name, {})
+        remove_set = removed_ids.get(name, set())
+        items = data_store[name]
+        if replace_map or remove_set:
+            items = [
+                replace_map.get(key, item)
+                for item in items
+                if (key := id(item)) not in remove_set
+            ]
+        else:
+            items = list(items)
+        items.extend(appended.get(name, ()))
+        data_store[name] = items
+
+    return counts
+
+
+def upsert_events(
+    events: list[dict],
+    delete: Iterable[tuple[Optional[str], Optional[int | str]]] = (),
+) -> dict[str, int]:
+    """Инкрементальное обновление по (source_id, Key).
+
+    Удаления применяются раньше вставок. ``Key=None`` в удалении — все события
+    источника. Переписываются только затронутые списки (копия со ссылками на
+    те же события: снимки data_store у идущих генераций не меняются).
+    """
+    delete = list(delete)
+    records = to_records(events)
+    with state_store.mutation("calendar") as change, store_lock:
+        counts = _apply_upsert(records, delete)
+        if counts["inserted"] or counts["updated"] or counts["removed"]:
+            _refresh_index()
+            bump_data_version()
+            _save_state(change, {"events": events, "delete": delete})
+    return counts
+
+
+def restore_events(persisted: PersistedState) -> None:
+    """Загрузить сохранённые изменения: снимок (если есть), затем журнал upsert-ов.
+
+    Вызывается при старте и, при нескольких воркерах, когда другой воркер изменил данные.
+    """
+    with store_lock:
+        if persisted.snapshot is not None:
+            for key in data_store:
+                data_store[key] = to_records(persisted.snapshot.get(key, []))
+            _rebuild_index()
+        for entry in persisted.journal:
+            _apply_upsert(to_records(entry["events"]), [tuple(item) for item in entry["delete"]])
+        _refresh_index()
+        bump_data_version()
@@ -1,13 +1,17 @@
 """Data storage service."""
-from typing import TypedDict
+import threading
+import uuid
+from typing import Optional, TypedDict
+
+from app.services.event_record import EventRecord
 
 
 class DataStore(TypedDict):
-    """Type definition for data store."""
-    work_en: list[dict]
-    work_ru: list[dict]
-    holidays_en: list[dict]
-    holidays_ru: list[dict]
+    """Type definition for data store (события хранятся как EventRecord)."""
+    work_en: list[EventRecord]
+    work_ru: list[EventRecord]
+    holidays_en: list[EventRecord]
+    holidays_ru: list[EventRecord]
 
 
 # Глобальное хранилище данных
@@ -17,3 +21,39 @@ data_store: DataStore = {
     "holidays_en": [],
     "holidays_ru": [],
 }
+
+# Идентичность события: (source_id, Key как строка).
+EventIdentity = tuple[Optional[str], str]
+
+# Индекс для upsert/delete: идентичность -> (список data_store, событие).
+event_index: dict[EventIdentity, tuple[str, EventRecord]] = {}
+
+# Изменения data_store и event_index выполняются под этой блокировкой.
+store_lock = threading.Lock()
+
+# Версия данных: увеличивается при каждом изменении data_store.
+# Эпоха отличает версии разных запусков процесса (версия начинается с нуля).
+# При нескольких воркерах версию задаёт общее хранилище состояния (set_data_version).
+_data_epoch = uuid.uuid4().hex[:8]
+_version_lock = threading.Lock()
+_data_version = 0
+
+
+def get_data_version() -> str:
+    """Текущая версия данных календаря."""
+    return f"{_data_epoch}.{_data_version}"
+
+
+def set_data_version(epoch: str, version: int) -> None:
+    """Установить общую для всех воркеров версию данных."""
+    global _data_epoch, _data_version
+    with _version_lock:
+        _data_epoch, _data_version = epoch, version
+
+
+def bump_data_version() -> str:
+    """Отметить изменение данных календаря и вернуть новую версию."""
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+    return get_data_version()
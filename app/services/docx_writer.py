@@ -0,0 +1,164 @@
+"""Zip-level .docx writer: rewrite only the changed parts of a template.
+
+``Document.save`` re-serializes and recompresses every part of the package,
+including images, fonts and styles that a render never touches. Here the
+output archive is assembled from the template's zip: unchanged members are
+copied as their already-compressed bytes, and only the modified XML parts are
+serialized and deflated again.
+
+If the document no longer maps 1:1 onto the template's members (a render
+added a part) or the template uses zip features this writer does not handle
+(zip64, encryption), it falls back to ``Document.save``.
+
+The member copy itself (``replace_members``) is not tied to .docx: the
+multi-week Excel export uses it to put worksheets written and compressed in
+render workers into one workbook.
+"""
+
+from __future__ import annotations
+
+import struct
+import zipfile
+import zlib
+from io import BytesIO
+from typing import Iterable, NamedTuple
+
+from docx.document import Document as DocumentObject
+
+# Структуры заголовков zip (APPNOTE 4.3.7, 4.3.12, 4.3.16) — как в модуле zipfile.
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_LOCAL_SIG = b"PK\x03\x04"
+_CENTRAL_SIG = b"PK\x01\x02"
+_END_SIG = b"PK\x05\x06"
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class UnsupportedArchive(Exception):
+    """Template archive cannot be copied member-by-member."""
+
+
+class CompressedMember(NamedTuple):
+    """Deflated member data with the CRC-32 and size its zip headers need."""
+    payload: bytes
+    crc: int
+    size: int
+
+
+def _dos_datetime(date_time: tuple) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | second // 2
+    return dos_time, dos_date
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_member(data: bytes) -> CompressedMember:
+    """Compress a member's content (may run in another process than the archive writer)."""
+    return CompressedMember(_deflate(data), zlib.crc32(data), len(data))
+
+
+def _raw_member(source: BytesIO, info: zipfile.ZipInfo) -> bytes:
+    """Compressed bytes of a member, read straight from the source archive."""
+    source.seek(info.header_offset)
+    header = source.read(_LOCAL_HEADER.size)
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_SIG:
+        raise UnsupportedArchive(f"Bad local header for {info.filename}")
+    name_len, extra_len = fields[10], fields[11]
+    source.seek(info.header_offset + _LOCAL_HEADER.size + name_len + extra_len)
+    return source.read(info.compress_size)
+
+
+def _changed_blobs(doc: DocumentObject, changed_parts: Iterable[str]) -> dict[str, bytes]:
+    """Serialized XML of the changed parts, keyed by zip member name."""
+    parts = {str(part.partname): part for part in doc.part.package.iter_parts()}
+    return {partname.lstrip("/"): parts[partname].blob for partname in changed_parts}
+
+
+def _write_archive(template_data: bytes, doc: DocumentObject, changed: dict[str, bytes]) -> BytesIO:
+    with zipfile.ZipFile(BytesIO(template_data)) as zf:
+        members = set(zf.namelist())
+    package_parts = {str(part.partname).lstrip("/") for part in doc.part.package.iter_parts()}
+    if not package_parts <= members:
+        raise UnsupportedArchive("Document parts differ from the template archive")
+    return replace_members(template_data, {name: compress_member(blob) for name, blob in changed.items()})
+
+
+def replace_members(archive: bytes, changed: dict[str, CompressedMember]) -> BytesIO:
+    """Copy ``archive`` member by member, writing ``changed`` members instead of the originals.
+
+    Members keep their order, names and timestamps; unchanged ones are copied
+    as their compressed bytes.
+    """
+    source = BytesIO(archive)
+    with zipfile.ZipFile(source) as zf:
+        infos = zf.infolist()
+    if not set(changed) <= {info.filename for info in infos}:
+        raise UnsupportedArchive("Replaced members are missing from the archive")
+
+    out = BytesIO()
+    central = []
+    for info in infos:
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            raise UnsupportedArchive(f"Encrypted member {info.filename}")
+        if max(info.file_size, info.compress_size, info.header_offset) >= _ZIP32_LIMIT:
+            raise UnsupportedArchive("zip64 archives are not supported")
+
+        member = changed.get(info.filename)
+        if member is None:
+            payload = _raw_member(source, info)
+            method, crc, size = info.compress_type, info.CRC, info.file_size
+            flags = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+        else:
+            payload, crc, size = member
+            method = zipfile.ZIP_DEFLATED
+            flags = info.flag_bits & _FLAG_UTF8
+
+        name = info.orig_filename.encode("utf-8" if info.flag_bits & _FLAG_UTF8 else "cp437")
+        dos_time, dos_date = _dos_datetime(info.date_time)
+        offset = out.tell()
+        out.write(_LOCAL_HEADER.pack(
+            _LOCAL_SIG, info.extract_version, info.reserved, flags, method,
+            dos_time, dos_date, crc, len(payload), size, len(name), 0,
+        ))
+        out.write(name)
+        out.write(payload)
+        central.append(_CENTRAL_HEADER.pack(
+            _CENTRAL_SIG, info.create_version, info.create_system, info.extract_version,
+            info.reserved, flags, method, dos_time, dos_date, crc, len(payload), size,
+            len(name), len(info.extra), len(info.comment), 0, info.internal_attr,
+            info.external_attr, offset,
+        ) + name + info.extra + info.comment)
+
+    central_offset = out.tell()
+    for record in central:
+        out.write(record)
+    out.write(_END_RECORD.pack(
+        _END_SIG, 0, 0, len(central), len(central), out.tell() - central_offset, central_offset, 0,
+    ))
+    out.seek(0)
+    return out
+
+
+def save_docx(doc: DocumentObject, template_data: bytes, changed_parts: Iterable[str]) -> BytesIO:
+    """Save ``doc`` (a copy of the template ``template_data``) rewriting only ``changed_parts``.
+
+    ``changed_parts`` are OPC part names such as ``/word/document.xml``.
+    """
+    try:
+        return _write_archive(template_data, doc, _changed_blobs(doc, changed_parts))
+    except (UnsupportedArchive, KeyError, zipfile.BadZipFile):
+        buffer = BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer
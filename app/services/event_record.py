@@ -0,0 +1,166 @@
+"""Compact record of one calendar event, as kept in ``data_store``.
+
+Events arrive as ``CalendarEvent.model_dump()`` dicts. The store keeps them
+as ``EventRecord`` instead: a ``__slots__`` object with the source fields and
+the values renderers need, computed once at ingest — parsed date, time sort
+key, 24h time, language, holiday flag, the display text (the event text in
+the record's language and the sanitized Excel cell values) and the red
+highlight flag. Renderers only read these fields and do not scan text. Repeated strings (dates, times,
+country codes) and the parsed values are shared between records.
+
+Records are not modified after creation (only the bookkeeping field
+``rules_version`` is updated when new highlight rules leave the flag as is);
+``to_dict`` gives back the source fields for persistence.
+"""
+
+from __future__ import annotations
+
+import datetime
+import sys
+from typing import Optional
+
+from app.services.highlight_rules import HighlightEngine, get_highlight_engine
+from app.utils.date_utils import format_time_display, parse_date, parse_time
+from app.utils.text_utils import convert_month_suffix_to_ru, has_cyrillic, sanitize_text
+
+# Поля исходного события (CalendarEvent) в порядке схемы.
+SOURCE_FIELDS = ("date", "time", "country", "event", "holiday", "Key", "source_id")
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class EventRecord:
+    """Событие календаря: исходные поля и значения, вычисленные при приёме."""
+
+    __slots__ = (
+        *SOURCE_FIELDS,
+        "day",         # разобранная дата (None — дата не распознана)
+        "time_key",    # ключ сортировки по времени, (99, 99) — без времени
+        "time_24",     # время в 24-часовом формате для Word
+        "is_holiday",
+        "lang",        # "ru" | "en"
+        "event_text",  # текст события на языке записи (для ru — русские суффиксы месяцев)
+        "time_display",  # время ячейки Excel (как в источнике, без пробелов по краям)
+        "cell_country",  # код страны для ячейки Excel (sanitize_text)
+        "cell_event",  # текст события для ячейки Excel (sanitize_text)
+        "highlight",   # выделить красным (правила highlight_rules)
+        "rules_version",  # версия правил, по которым вычислен highlight
+    )
+
+    date: str
+    time: Optional[str]
+    country: str
+    event: Optional[str]
+    holiday: Optional[str]
+    Key: Optional[int | str]
+    source_id: Optional[str]
+    day: Optional[datetime.date]
+    time_key: tuple[int, int]
+    time_24: str
+    is_holiday: bool
+    lang: str
+    event_text: Optional[str]
+    time_display: str
+    cell_country: str
+    cell_event: str
+    highlight: bool
+    rules_version: int
+
+    @classmethod
+    def create(
+        cls,
+        date: str = "",
+        time: Optional[str] = "",
+        country: str = "",
+        event: Optional[str] = None,
+        holiday: Optional[str] = None,
+        Key: Optional[int | str] = 0,
+        source_id: Optional[str] = None,
+    ) -> "EventRecord":
+        """Запись из исходных полей (значения по умолчанию — как в CalendarEvent)."""
+        record = cls.__new__(cls)
+        date = _intern(date)
+        time = _intern(time)
+        record.date = date
+        record.time = time
+        record.country = _intern(country)
+        record.event = event
+        record.holiday = holiday
+        record.Key = Key
+        record.source_id = _intern(source_id)
+
+        record.day = parse_date(date)
+        record.time_key, record.time_24 = parse_time(time)
+        record.is_holiday = bool(holiday)
+        record.lang = "ru" if has_cyrillic(holiday if record.is_holiday else event) else "en"
+
+        # Нормализация текста один раз при приёме (sanitize_text возвращает
+        # неизменённую строку тем же объектом).
+        record.event_text = convert_month_suffix_to_ru(event) if record.lang == "ru" else event
+        record.time_display = _intern(format_time_display(time))
+        record.cell_country = _intern(sanitize_text(record.country))
+        record.cell_event = sanitize_text(record.event_text)
+        record._set_highlight(get_highlight_engine())
+        return record
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "EventRecord":
+        """Запись из dict события (model_dump() или сохранённое состояние)."""
+        return cls.create(**{name: item[name] for name in SOURCE_FIELDS if name in item})
+
+    @classmethod
+    def from_model(cls, event) -> "EventRecord":
+        """Запись из проверенной модели CalendarEvent (без промежуточного dict)."""
+        return cls.create(
+            event.date, event.time, event.country, event.event, event.holiday, event.Key, event.source_id,
+        )
+
+    def _set_highlight(self, engine: HighlightEngine) -> None:
+        self.highlight = not self.is_holiday and engine.matches(self.event_text, self.lang, self.country)
+        self.rules_version = engine.version
+
+    def with_highlight(self, engine: HighlightEngine) -> "EventRecord":
+        """Копия записи с признаком выделения по правилам ``engine`` (запись не меняется)."""
+        record = _record_from_slots(tuple(getattr(self, name) for name in self.__slots__))
+        record._set_highlight(engine)
+        return record
+
+    @property
+    def bucket(self) -> str:
+        """Список data_store: work_en, work_ru, holidays_en или holidays_ru."""
+        return f"{'holidays' if self.is_holiday else 'work'}_{self.lang}"
+
+    @property
+    def identity(self) -> tuple[Optional[str], str]:
+        """Идентичность для upsert/delete: (source_id, Key как строка)."""
+        return self.source_id, str(self.Key)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in SOURCE_FIELDS}
+
+    def _source(self) -> tuple:
+        return tuple(getattr(self, name) for name in SOURCE_FIELDS)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EventRecord):
+            return NotImplemented
+        return self._source() == other._source()
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Значения слотов кортежем: без имён полей у каждой записи при передаче в пул.
+        return _record_from_slots, (tuple(getattr(self, name) for name in self.__slots__),)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in SOURCE_FIELDS)
+        return f"EventRecord({fields})"
+
+
+def _record_from_slots(values: tuple) -> EventRecord:
+    record = EventRecord.__new__(EventRecord)
+    for name, value in zip(EventRecord.__slots__, values):
+        setattr(record, name, value)
+    return record
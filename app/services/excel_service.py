@@ -1,89 +1,54 @@
 """Excel document generation service."""
-import re
-from datetime import date
+from copy import copy
+from datetime import date, timedelta
+from functools import lru_cache
 from io import BytesIO
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from openpyxl import Workbook
-from openpyxl.styles import Border
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet._writer import WorksheetWriter
 from openpyxl.worksheet.worksheet import Worksheet
 
+from app.core.config import EXCEL_ENGINE, EXCEL_ENGINES
+from app.services.calendar_index import EMPTY_DAY, CalendarIndex, DayEntry
+from app.services.docx_writer import CompressedMember, compress_member, replace_members
+from app.services.highlight_rules import get_highlight_engine
 from app.utils.date_utils import (
     format_date_ru,
     format_date_en,
     format_sheet_name_ru,
     format_sheet_name_en,
-    group_items_by_date,
-    choose_reference_monday,
     get_week_dates,
-    parse_time_for_sort,
-    format_time_display,
+    get_monday_of_week,
 )
-from app.utils.text_utils import sanitize_text, convert_month_suffix_to_ru
+from app.utils.text_utils import sanitize_text
 from app.utils.constants import (
-    FONT_HEADER,
-    FONT_DATE,
-    FONT_TIME,
-    FONT_TIME_RED,
-    FONT_EVENT,
-    FONT_EVENT_RED,
-    FONT_HOLIDAY,
-    GRAY_FILL,
-    WHITE_FILL,
-    NO_FILL,
+    CELL_STYLES,
     COUNTRY_NAMES_EN,
     COUNTRY_NAMES_RU,
-    ALIGN_LEFT,
-    ALIGN_CENTER,
-    BORDER_THIN,
-    BORDER_MEDIUM,
 )
 
 
-_RU_RATE_PATTERNS: tuple[re.Pattern[str], ...] = (
-    re.compile(r"(?<!\w)цб(?!\w)"),
-    re.compile(r"(?<!\w)ецб(?!\w)"),
-    re.compile(r"ключев\w*\s+ставк\w*"),
-    re.compile(r"базов\w*\s+ставк\w*"),
-    re.compile(r"годов\w*\s+ставк\w*"),
-    re.compile(r"процентн\w*\s+ставк\w*"),
-    re.compile(r"проц\.?\s*ставк\w*"),
-)
+def should_highlight_event(event_text: str, lang: str, country: str) -> bool:
+    """Returns True when event should be shown in red (current highlight rules)."""
+    return get_highlight_engine().matches(event_text, lang, country)
 
-_EN_RATE_PATTERNS: tuple[re.Pattern[str], ...] = (
-    re.compile(r"\binterest\s+rate\b"),
-    re.compile(r"\bloan\s+prime\s+rate\b"),
-)
 
+@lru_cache(maxsize=4096)
+def text_width(text: str) -> float:
+    """Оценка ширины текста: символ ASCII — 1.0, остальные (кириллица и т.п.) — 1.3.
 
-def should_highlight_event(event_text: str, lang: str, country: str) -> bool:
-    """Returns True when event should be shown in red."""
-    text = (event_text or "").casefold()
-    country_upper = (country or "").strip().upper()
-
-    # US-only labor market highlights.
-    if country_upper == "US":
-        if lang == "ru":
-            if "изменение числа занятых вне с/х сектора" in text:
-                return True
-            if "уровень безработицы" in text:
-                return True
-        if lang == "en":
-            # Accept both "nonfarm" and "non farm" spellings.
-            if "nonfarm payrolls" in text or "non farm payrolls" in text:
-                return True
-            if "unemployment rate" in text:
-                return True
-
-    if lang == "ru":
-        if "ввп" in text:
-            return True
-        return any(p.search(text) for p in _RU_RATE_PATTERNS)
-    if lang == "en":
-        if "gdp" in text:
-            return True
-        return any(p.search(text) for p in _EN_RATE_PATTERNS)
-    return False
+    Число не-ASCII символов считается через encode (в C, без цикла по символам);
+    результат кэшируется, т.к. названия событий повторяются из недели в неделю.
+    """
+    non_ascii = len(text) - len(text.encode("ascii", "ignore"))
+    return len(text) + 0.3 * non_ascii
 
 
 class ColumnWidthTracker:
@@ -93,169 +58,71 @@ class ColumnWidthTracker:
     
     def update(self, col: int, value: str):
         if value:
-            text = str(value)
-            width = 0.0
-            for char in text:
-                if ord(char) > 127:
-                    width += 1.3
-                else:
-                    width += 1.0
-            self.widths[col] = max(self.widths.get(col, 0), width)
+            width = text_width(str(value))
+            if width > self.widths.get(col, 0):
+                self.widths[col] = width
     
-    def apply(self, ws: Worksheet, padding: float = 2.0):
-        for col, width in self.widths.items():
-            col_letter = ws.cell(1, col).column_letter
-            ws.column_dimensions[col_letter].width = width + padding
+    def apply(self, ws: Worksheet | WriteOnlyWorksheet, padding: float = 2.0):
+        apply_column_widths(ws, self.widths, padding=padding)
 
 
-def write_header_row(ws: Worksheet, lang: str, tracker: ColumnWidthTracker):
-    """Записывает строку заголовков."""
-    if lang == "en":
-        headers = ["Date/time", "Country", "News"]
-    else:
-        headers = ["Дата/Время", "Страна", "Событие"]
-    
-    for i, header in enumerate(headers):
-        col = 3 + i
-        cell = ws.cell(2, col)
-        cell.value = header
-        cell.font = FONT_HEADER
-        cell.alignment = ALIGN_CENTER
-        cell.border = Border(
-            left=BORDER_MEDIUM if i == 0 else BORDER_THIN,
-            right=BORDER_MEDIUM if i == 2 else BORDER_THIN,
-            top=BORDER_MEDIUM,
-            bottom=BORDER_MEDIUM
-        )
-        tracker.update(col, header)
-
-
-def write_date_row(ws: Worksheet, row: int, date_text: str, is_first: bool, tracker: ColumnWidthTracker):
-    """Запись строки с датой (объединённые ячейки C:E)."""
-    ws.merge_cells(f"C{row}:E{row}")
-    cell = ws.cell(row, 3)
-    cell.value = date_text
-    cell.font = FONT_DATE
-    cell.alignment = ALIGN_LEFT
-    cell.fill = GRAY_FILL
-    top = BORDER_MEDIUM if is_first else BORDER_THIN
-    cell.border = Border(left=BORDER_MEDIUM, right=BORDER_MEDIUM, top=top, bottom=BORDER_THIN)
-
-    cell_d = ws.cell(row, 4)
-    cell_d.fill = GRAY_FILL
-    cell_d.border = Border(top=top, bottom=BORDER_THIN)
-
-    cell_e = ws.cell(row, 5)
-    cell_e.fill = GRAY_FILL
-    cell_e.border = Border(right=BORDER_MEDIUM, top=top, bottom=BORDER_THIN)
-
-    tracker.update(5, date_text)
-
-
-def write_event_row(ws: Worksheet, row: int, time_str, country, event,
-                    highlight: bool, is_last: bool, tracker: ColumnWidthTracker):
-    """Запись строки события."""
-    cell_c = ws.cell(row, 3)
-    cell_d = ws.cell(row, 4)
-    cell_e = ws.cell(row, 5)
-    
-    time_display = format_time_display(time_str)
-    country_safe = sanitize_text(country)
-    event_safe = sanitize_text(event)
-    
-    cell_c.value = time_display
-    cell_d.value = country_safe
-    cell_e.value = event_safe
-    
-    tracker.update(3, time_display)
-    tracker.update(4, country_safe)
-    tracker.update(5, event_safe)
-    
-    if highlight:
-        cell_c.font = FONT_TIME_RED
-        cell_d.font = FONT_EVENT_RED
-        cell_e.font = FONT_EVENT_RED
-    else:
-        cell_c.font = FONT_TIME
-        cell_d.font = FONT_EVENT
-        cell_e.font = FONT_EVENT
-    
-    cell_c.alignment = ALIGN_LEFT
-    cell_d.alignment = ALIGN_LEFT
-    cell_e.alignment = ALIGN_LEFT
-    cell_c.fill = WHITE_FILL
-    cell_d.fill = WHITE_FILL
-    cell_e.fill = WHITE_FILL
-    
-    bottom = BORDER_MEDIUM if is_last else BORDER_THIN
-    cell_c.border = Border(left=BORDER_MEDIUM, right=BORDER_THIN, top=BORDER_THIN, bottom=bottom)
-    cell_d.border = Border(left=BORDER_THIN, right=BORDER_THIN, top=BORDER_THIN, bottom=bottom)
-    cell_e.border = Border(left=BORDER_THIN, right=BORDER_MEDIUM, top=BORDER_THIN, bottom=bottom)
-
-
-def write_holiday_row(ws: Worksheet, row: int, text, is_last: bool, tracker: ColumnWidthTracker):
-    """Запись строки праздника (объединённые ячейки, красный текст)."""
-    ws.merge_cells(f"C{row}:E{row}")
-    cell = ws.cell(row, 3)
-    text_safe = sanitize_text(text)
-    cell.value = text_safe
-    cell.font = FONT_HOLIDAY
-    cell.alignment = ALIGN_LEFT
-    cell.fill = NO_FILL
-    bottom = BORDER_MEDIUM if is_last else BORDER_THIN
-    cell.border = Border(left=BORDER_MEDIUM, right=BORDER_MEDIUM, top=BORDER_THIN, bottom=bottom)
-    
-    ws.cell(row, 4).border = Border(top=BORDER_THIN, bottom=bottom)
-    ws.cell(row, 5).border = Border(right=BORDER_MEDIUM, top=BORDER_THIN, bottom=bottom)
-    
-    tracker.update(5, text_safe)
+def apply_column_widths(ws: Worksheet | WriteOnlyWorksheet, widths: dict[int, float], padding: float = 2.0):
+    for col, width in widths.items():
+        ws.column_dimensions[get_column_letter(col)].width = width + padding
 
 
-def fill_worksheet(
-    ws: Worksheet,
-    events: list[dict],
-    holidays: list[dict],
-    lang: str = "en",
-    monday: Optional[date] = None,
-) -> Optional[date]:
-    """Заполнение листа данными. Возвращает дату понедельника недели."""
-    tracker = ColumnWidthTracker()
-    
-    write_header_row(ws, lang, tracker)
-    
-    events_by_date = group_items_by_date(events)
-    holidays_by_date = group_items_by_date(holidays)
+class SheetRow(NamedTuple):
+    """Строка листа календаря: значения колонок C, D, E и имена их стилей из палитры."""
+    kind: str  # "header" | "date" | "holiday" | "event" | "blank"
+    values: tuple[str, ...]
+    styles: tuple[str, str, str]
+
+
+# Строки, у которых ячейки C:E объединены.
+MERGED_ROW_KINDS = ("date", "holiday")
+
+
+def _edge_suffix(flag: bool, suffix: str) -> str:
+    return suffix if flag else ""
+
+
+def build_sheet_rows(
+    days: dict[date, DayEntry],
+    lang: str,
+    monday: date,
+) -> list[SheetRow]:
+    """Раскладка листа недели ``monday`` по строкам без привязки к openpyxl.
+
+    ``days`` — дни одного языка из CalendarIndex (события уже отсортированы по времени).
+    """
+    if lang == "en":
+        headers = ("Date/time", "Country", "News")
+    else:
+        headers = ("Дата/Время", "Страна", "Событие")
+    rows = [SheetRow("header", headers, ("cal_header_c", "cal_header_d", "cal_header_e"))]
 
-    if monday is None:
-        monday = choose_reference_monday(events_by_date, holidays_by_date)
     week_dates = get_week_dates(monday)
     
     format_date = format_date_en if lang == "en" else format_date_ru
     country_names = COUNTRY_NAMES_EN if lang == "en" else COUNTRY_NAMES_RU
     
-    current_row = 3
-    
     for i, d in enumerate(week_dates):
         is_first = (i == 0)
         is_last_day = (i == len(week_dates) - 1)
         
-        write_date_row(ws, current_row, format_date(d), is_first=is_first, tracker=tracker)
-        current_row += 1
+        edge = _edge_suffix(is_first, "_first")
+        rows.append(SheetRow(
+            "date",
+            (format_date(d),),
+            (f"cal_date_c{edge}", f"cal_date_d{edge}", f"cal_date_e{edge}"),
+        ))
         
-        day_holidays = holidays_by_date.get(d, [])
-        day_events = events_by_date.get(d, [])
+        day_events, day_holidays = days.get(d, EMPTY_DAY)
         
         if day_holidays:
-            holidays_grouped: dict[str, list[str]] = {}
-            for hol in day_holidays:
-                name = hol.get("holiday", "") or hol.get("event", "")
-                country = hol.get("country", "")
-                if name:
-                    holidays_grouped.setdefault(name, []).append(country)
-            
             holiday_parts = []
-            for name, countries in holidays_grouped.items():
-                country_list = ", ".join(country_names.get(c, c) for c in sorted(set(countries)))
+            for name, countries in day_holidays:
+                country_list = ", ".join(country_names.get(c, c) for c in countries)
                 if lang == "en":
                     holiday_parts.append(f"{name}. Markets in {country_list}")
                 else:
@@ -263,69 +130,241 @@ def fill_worksheet(
             
             holiday_text = "; ".join(holiday_parts)
             is_last_row = (len(day_events) == 0) and is_last_day
-            write_holiday_row(ws, current_row, holiday_text, is_last=is_last_row, tracker=tracker)
-            current_row += 1
-        
-        day_events.sort(key=lambda x: parse_time_for_sort(x.get("time", "")))
+            edge = _edge_suffix(is_last_row, "_last")
+            rows.append(SheetRow(
+                "holiday",
+                (sanitize_text(holiday_text),),
+                (f"cal_holiday_c{edge}", f"cal_holiday_d{edge}", f"cal_holiday_e{edge}"),
+            ))
         
         for j, ev in enumerate(day_events):
             is_last_event = (j == len(day_events) - 1) and is_last_day
             
-            event_text = ev.get("event", "")
-            # Для русского календаря конвертируем английские месяцы в русские
-            if lang == "ru":
-                event_text = convert_month_suffix_to_ru(event_text)
-
-            write_event_row(
-                ws, current_row,
-                ev.get("time", ""),
-                ev.get("country", ""),
-                event_text,
-                highlight=should_highlight_event(event_text, lang, ev.get("country", "")),
-                is_last=is_last_event,
-                tracker=tracker
-            )
-            current_row += 1
+            # Текст, значения ячеек и выделение вычислены при приёме (EventRecord).
+            tone = "_red" if ev.highlight else ""
+            edge = _edge_suffix(is_last_event, "_last")
+            rows.append(SheetRow(
+                "event",
+                (ev.time_display, ev.cell_country, ev.cell_event),
+                (f"cal_event_c{tone}{edge}", f"cal_event_d{tone}{edge}", f"cal_event_e{tone}{edge}"),
+            ))
         
         if not day_holidays and not day_events:
-            cell_c = ws.cell(current_row, 3)
-            cell_d = ws.cell(current_row, 4)
-            cell_e = ws.cell(current_row, 5)
-            bottom = BORDER_MEDIUM if is_last_day else BORDER_THIN
-            cell_c.border = Border(left=BORDER_MEDIUM, right=BORDER_THIN, top=BORDER_THIN, bottom=bottom)
-            cell_d.border = Border(left=BORDER_THIN, right=BORDER_THIN, top=BORDER_THIN, bottom=bottom)
-            cell_e.border = Border(left=BORDER_THIN, right=BORDER_MEDIUM, top=BORDER_THIN, bottom=bottom)
-            current_row += 1
-    
-    tracker.apply(ws, padding=2.0)
+            edge = _edge_suffix(is_last_day, "_last")
+            rows.append(SheetRow("blank", (), (f"cal_blank_c{edge}", f"cal_blank_d{edge}", f"cal_blank_e{edge}")))
     
-    return monday
+    return rows
 
 
-def generate_excel(work_en: list[dict], work_ru: list[dict],
-                   holidays_en: list[dict], holidays_ru: list[dict]) -> BytesIO:
-    """Генерация Excel файла из данных без шаблона."""
-    wb = Workbook()
-    
-    ws_ru = wb.active
-    ws_ru.title = "Календарь"
-    ws_en = wb.create_sheet("Economic calendar")
+def measure_columns(rows: list[SheetRow]) -> ColumnWidthTracker:
+    """Ширина колонок C:E по содержимому строк."""
+    tracker = ColumnWidthTracker()
+    for row in rows:
+        if row.kind in ("header", "event"):
+            for i, value in enumerate(row.values):
+                tracker.update(3 + i, value)
+        elif row.kind in ("date", "holiday"):
+            # Объединённая строка C:E учитывается в ширине колонки E.
+            tracker.update(5, row.values[0])
+    return tracker
+
+
+class StylePalette:
+    """Палитра CELL_STYLES, зарегистрированная в книге как именованные стили.
+
+    Ячейка получает копию готового набора индексов стиля, поэтому openpyxl
+    не создаёт и не хэширует объекты Border/Font для каждой ячейки.
+    Номера стилей ячеек (cellXfs) регистрируются сразу в порядке палитры и
+    совпадают во всех книгах: лист, записанный в другом процессе, можно
+    перенести в любую книгу с этой палитрой.
+    """
+
+    def __init__(self, wb: Workbook):
+        self._styles: dict[str, StyleArray] = {}
+        for name, spec in CELL_STYLES.items():
+            named = NamedStyle(name=name, font=spec.get("font", DEFAULT_FONT), **{
+                key: value for key, value in spec.items() if key != "font"
+            })
+            wb.add_named_style(named)
+            self._styles[name] = named.as_tuple()
+            wb._cell_styles.add(self._styles[name])
+
+    def apply(self, cell, style_name: str):
+        cell._style = copy(self._styles[style_name])
+
+
+def write_rows(ws: Worksheet, rows: list[SheetRow], palette: StylePalette):
+    """Запись подготовленных строк в обычный (in-memory) лист, начиная со строки 2."""
+    for current_row, row in enumerate(rows, start=2):
+        if row.kind in MERGED_ROW_KINDS:
+            ws.merge_cells(start_row=current_row, start_column=3, end_row=current_row, end_column=5)
+        for i, style_name in enumerate(row.styles):
+            cell = ws.cell(current_row, 3 + i)
+            if i < len(row.values):
+                cell.value = row.values[i]
+            palette.apply(cell, style_name)
+
+
+def stream_rows(ws: WriteOnlyWorksheet, rows: list[SheetRow], palette: StylePalette):
+    """Потоковая запись строк в write-only лист (визуально совпадает с write_rows)."""
+    ws.append([])
+    for current_row, row in enumerate(rows, start=2):
+        if row.kind in MERGED_ROW_KINDS:
+            ws.merged_cells.add(f"C{current_row}:E{current_row}")
+        cells = []
+        for i, style_name in enumerate(row.styles):
+            cell = WriteOnlyCell(ws, row.values[i] if i < len(row.values) else None)
+            palette.apply(cell, style_name)
+            cells.append(cell)
+        ws.append([None, None, *cells])
+
+
+def fill_worksheet(
+    ws: Worksheet,
+    days: dict[date, DayEntry],
+    lang: str,
+    monday: date,
+    palette: Optional[StylePalette] = None,
+) -> None:
+    """Заполнение листа данными недели ``monday``."""
+    rows = build_sheet_rows(days, lang, monday)
+    write_rows(ws, rows, palette or StylePalette(ws.parent))
+    measure_columns(rows).apply(ws, padding=2.0)
+
+
+class SheetLayout(NamedTuple):
+    """Готовый к записи лист: имя, строки и ширины колонок."""
+    title: str
+    rows: list[SheetRow]
+    widths: dict[int, float]
+
+
+def build_week_sheet(days: dict[date, DayEntry], lang: str, monday: date) -> SheetLayout:
+    """Раскладка листа одной недели на одном языке (выполняется в пуле генерации)."""
+    rows = build_sheet_rows(days, lang, monday)
+    title = format_sheet_name_ru(monday) if lang == "ru" else format_sheet_name_en(monday)
+    return SheetLayout(title=title, rows=rows, widths=measure_columns(rows).widths)
+
+
+def _write_sheet(ws: Worksheet | WriteOnlyWorksheet, sheet: SheetLayout, palette: StylePalette, engine: str):
+    if engine == "streaming":
+        # В write-only листе ширины задаются до записи первой строки.
+        apply_column_widths(ws, sheet.widths)
+        stream_rows(ws, sheet.rows, palette)
+    else:
+        write_rows(ws, sheet.rows, palette)
+        apply_column_widths(ws, sheet.widths)
+
+
+def assemble_workbook(sheets: list[SheetLayout], engine: Optional[str] = None) -> BytesIO:
+    """Сборка книги из готовых раскладок листов выбранным движком."""
+    engine = resolve_excel_engine(engine)
+    wb = Workbook(write_only=(engine == "streaming"))
+    palette = StylePalette(wb)
+    if engine == "standard":
+        wb.remove(wb.active)
+
+    for sheet in sheets:
+        _write_sheet(wb.create_sheet(sheet.title), sheet, palette, engine)
 
-    combined_events_by_date = group_items_by_date(work_en + work_ru)
-    combined_holidays_by_date = group_items_by_date(holidays_en + holidays_ru)
-    monday = choose_reference_monday(combined_events_by_date, combined_holidays_by_date)
-    
-    monday_ru = fill_worksheet(ws_ru, work_ru, holidays_ru, lang="ru", monday=monday)
-    if monday_ru:
-        ws_ru.title = format_sheet_name_ru(monday_ru)
-    
-    monday_en = fill_worksheet(ws_en, work_en, holidays_en, lang="en", monday=monday)
-    if monday_en:
-        ws_en.title = format_sheet_name_en(monday_en)
-    
     buffer = BytesIO()
     wb.save(buffer)
     buffer.seek(0)
     wb.close()
     
     return buffer
+
+
+class SheetPart(NamedTuple):
+    """Записанный лист: имя и сжатая часть xl/worksheets/sheetN.xml (передаётся между процессами)."""
+    title: str
+    xml: CompressedMember
+
+
+def render_week_sheet(days: dict[date, DayEntry], lang: str, monday: date,
+                      engine: Optional[str] = None) -> SheetPart:
+    """Лист одной недели на одном языке целиком: раскладка, запись ячеек,
+    сериализация XML и сжатие (выполняется в пуле генерации).
+
+    Лист пишется в книгу с палитрой StylePalette, поэтому номера стилей в его
+    XML совпадают с книгой, которую собирает assemble_sheet_parts.
+    """
+    engine = resolve_excel_engine(engine)
+    sheet = build_week_sheet(days, lang, monday)
+    wb = Workbook(write_only=(engine == "streaming"))
+    palette = StylePalette(wb)
+    ws = wb.create_sheet(sheet.title)
+    _write_sheet(ws, sheet, palette, engine)
+    if engine == "streaming":
+        ws.close()
+        writer = ws._writer
+        try:
+            xml = writer.read()
+        finally:
+            writer.cleanup()
+    else:
+        writer = WorksheetWriter(ws, out=BytesIO())
+        writer.write()
+        xml = writer.read()
+    wb.close()
+    return SheetPart(title=sheet.title, xml=compress_member(xml))
+
+
+def assemble_sheet_parts(parts: list[SheetPart]) -> BytesIO:
+    """Книга из готовых листов: сохраняется оболочка с палитрой и пустыми листами,
+    затем их части заменяются готовыми на уровне zip (без разбора и пересжатия)."""
+    wb = Workbook()
+    StylePalette(wb)
+    wb.remove(wb.active)
+    for part in parts:
+        wb.create_sheet(part.title)
+
+    envelope = BytesIO()
+    wb.save(envelope)
+    # Пути частей листов известны после сохранения (номера назначаются при записи).
+    members = {ws.path.lstrip("/"): part.xml for ws, part in zip(wb.worksheets, parts)}
+    wb.close()
+    return replace_members(envelope.getvalue(), members)
+
+
+def resolve_excel_engine(engine: Optional[str] = None) -> str:
+    """Движок генерации: явно указанный или из конфигурации."""
+    engine = (engine or EXCEL_ENGINE).strip().lower()
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine: {engine}. Expected one of: {', '.join(EXCEL_ENGINES)}")
+    return engine
+
+
+def generate_excel(index: CalendarIndex, engine: Optional[str] = None,
+                   monday: Optional[date] = None) -> BytesIO:
+    """Генерация Excel файла из индекса календаря без шаблона.
+
+    engine="standard" строит книгу в памяти, engine="streaming" пишет строки
+    потоково (openpyxl write-only) и подходит для недель с сотнями событий.
+    """
+    monday = monday or index.reference_monday()
+    sheets = [
+        build_week_sheet(index.week_days("ru", monday), "ru", monday),
+        build_week_sheet(index.week_days("en", monday), "en", monday),
+    ]
+    return assemble_workbook(sheets, engine)
+
+
+def week_mondays(date_from: date, date_to: date) -> list[date]:
+    """Понедельники всех недель, пересекающихся с периодом [date_from, date_to]."""
+    first = get_monday_of_week(date_from)
+    last = get_monday_of_week(date_to)
+    return [first + timedelta(weeks=i) for i in range((last - first).days // 7 + 1)]
+
+
+def week_sheet_jobs(index: CalendarIndex, mondays: list[date], engine: Optional[str] = None) -> list[dict]:
+    """Аргументы render_week_sheet для каждого листа книги за период: RU и EN по каждой неделе.
+
+    Каждому заданию передаются только дни его недели, чтобы задания были
+    независимыми и дешёвыми для передачи в процессы пула.
+    """
+    return [
+        {"days": index.week_days(lang, monday), "lang": lang, "monday": monday, "engine": engine}
+        for monday in mondays
+        for lang in ("ru", "en")
+    ]
@@ -0,0 +1,259 @@
+"""Rules that mark calendar events to be shown in red.
+
+Rules are a table: language, an optional list of country codes and a
+pattern — a plain substring (``kind="text"``) or a regular expression
+(``kind="regex"``) matched against the case-folded event text. For each
+(language, country) the applicable rules are compiled into one alternation,
+so an event is checked with a single ``search``. Regular expressions must
+not contain capturing groups (named groups and backreferences would clash
+once rules are joined) or global inline flags, and every combined pattern is
+compiled before a rule table is accepted.
+
+The table is read from ``HIGHLIGHT_RULES_PATH`` (built-in defaults if the
+file does not exist). A changed file is detected by its stat signature and
+loaded without a restart; every load creates a new immutable engine with its
+own ``version`` and a content ``digest``. Events are evaluated once at ingest
+and keep the flag together with the engine version it was computed with.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from app.core.config import HIGHLIGHT_RULES_PATH
+
+logger = logging.getLogger(__name__)
+
+RULE_KINDS = ("text", "regex")
+RULE_LANGUAGES = ("ru", "en")
+# Правила приходят из запроса без авторизации и проверяются на каждом событии.
+MAX_PATTERN_LENGTH = 200
+
+
+class HighlightRule(NamedTuple):
+    """Правило выделения: шаблон для языка ``lang`` (страны пусто — любая страна)."""
+    lang: str
+    pattern: str
+    kind: str = "text"
+    countries: tuple[str, ...] = ()
+
+
+DEFAULT_HIGHLIGHT_RULES: tuple[HighlightRule, ...] = (
+    # Рынок труда — только США.
+    HighlightRule("ru", "изменение числа занятых вне с/х сектора", countries=("US",)),
+    HighlightRule("ru", "уровень безработицы", countries=("US",)),
+    HighlightRule("en", "nonfarm payrolls", countries=("US",)),
+    HighlightRule("en", "non farm payrolls", countries=("US",)),
+    HighlightRule("en", "unemployment rate", countries=("US",)),
+    # ВВП и ставки — все страны.
+    HighlightRule("ru", "ввп"),
+    HighlightRule("ru", r"(?<!\w)цб(?!\w)", "regex"),
+    HighlightRule("ru", r"(?<!\w)ецб(?!\w)", "regex"),
+    HighlightRule("ru", r"ключев\w*\s+ставк\w*", "regex"),
+    HighlightRule("ru", r"базов\w*\s+ставк\w*", "regex"),
+    HighlightRule("ru", r"годов\w*\s+ставк\w*", "regex"),
+    HighlightRule("ru", r"процентн\w*\s+ставк\w*", "regex"),
+    HighlightRule("ru", r"проц\.?\s*ставк\w*", "regex"),
+    HighlightRule("en", "gdp"),
+    HighlightRule("en", r"\binterest\s+rate\b", "regex"),
+    HighlightRule("en", r"\bloan\s+prime\s+rate\b", "regex"),
+)
+
+
+def _check_regex(i: int, pattern: str) -> None:
+    # Проверяется сам шаблон и в том виде, в каком он входит в общее выражение (глобальный
+    # флаг вроде (?i) внутри группы — ошибка). Без захватывающих групп номера
+    # групп не сдвигаются при объединении и ссылок на группы быть не может.
+    try:
+        re.compile(pattern)
+        compiled = re.compile(f"(?:{pattern})")
+    except re.error as e:
+        raise ValueError(f"Rule {i}: invalid regular expression: {e}") from None
+    if compiled.groups:
+        raise ValueError(f"Rule {i}: capturing groups are not allowed, use (?:...).")
+
+
+def parse_rules(items: list) -> tuple[HighlightRule, ...]:
+    """Правила из списка dict (тело запроса или файл); ошибки — ValueError."""
+    if not isinstance(items, list):
+        raise ValueError("'rules' must be a list.")
+    rules = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Rule {i}: expected an object.")
+        lang = item.get("lang")
+        pattern = item.get("pattern")
+        kind = item.get("kind", "text")
+        countries = item.get("countries") or []
+        if lang not in RULE_LANGUAGES:
+            raise ValueError(f"Rule {i}: 'lang' must be one of {', '.join(RULE_LANGUAGES)}.")
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError(f"Rule {i}: 'pattern' must be a non-empty string.")
+        if len(pattern) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Rule {i}: 'pattern' is longer than {MAX_PATTERN_LENGTH} characters.")
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Rule {i}: 'kind' must be one of {', '.join(RULE_KINDS)}.")
+        if not isinstance(countries, list) or not all(isinstance(c, str) for c in countries):
+            raise ValueError(f"Rule {i}: 'countries' must be a list of country codes.")
+        if kind == "regex":
+            _check_regex(i, pattern)
+        rules.append(HighlightRule(
+            lang,
+            pattern if kind == "regex" else pattern.casefold(),
+            kind,
+            tuple(sorted({c.strip().upper() for c in countries if c.strip()})),
+        ))
+    return tuple(rules)
+
+
+def rules_to_json(rules: tuple[HighlightRule, ...]) -> list[dict]:
+    return [
+        {"lang": r.lang, "pattern": r.pattern, "kind": r.kind, "countries": list(r.countries)}
+        for r in rules
+    ]
+
+
+_versions = itertools.count(1)
+
+
+class HighlightEngine:
+    """Скомпилированные правила: одно регулярное выражение на (язык, страна).
+
+    Таблица, которую нельзя скомпилировать, — ValueError.
+    """
+
+    def __init__(self, rules: tuple[HighlightRule, ...], source: Optional[Path] = None):
+        self.rules = rules
+        self.source = source
+        self.version = next(_versions)
+        payload = json.dumps(rules_to_json(rules), ensure_ascii=False, sort_keys=True)
+        self.digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+        # Страны, для которых есть отдельные правила; остальные используют общий шаблон языка.
+        self._countries = frozenset(c for rule in rules for c in rule.countries)
+        self._matchers: dict[tuple[str, str], Optional[re.Pattern[str]]] = {
+            (lang, country): self._compile(lang, country)
+            for lang in RULE_LANGUAGES
+            for country in ("", *self._countries)
+        }
+
+    def _compile(self, lang: str, country: str) -> Optional[re.Pattern[str]]:
+        parts = [
+            rule.pattern if rule.kind == "regex" else re.escape(rule.pattern)
+            for rule in self.rules
+            if rule.lang == lang and (not rule.countries or country in rule.countries)
+        ]
+        if not parts:
+            return None
+        try:
+            return re.compile("|".join(f"(?:{part})" for part in parts))
+        except re.error as e:
+            raise ValueError(f"Rules for lang={lang!r} country={country or '*'!r}: {e}") from None
+
+    def matches(self, event_text: Optional[str], lang: str, country: Optional[str]) -> bool:
+        """True, если событие нужно выделить красным."""
+        country_upper = (country or "").strip().upper()
+        if country_upper not in self._countries:
+            country_upper = ""
+        matcher = self._matchers.get((lang, country_upper))
+        if matcher is None:
+            return False
+        return matcher.search((event_text or "").casefold()) is not None
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "digest": self.digest,
+            "source": str(self.source) if self.source else "default",
+            "rules": rules_to_json(self.rules),
+        }
+
+
+def _file_stat(path: Path) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def load_highlight_rules(path: Path) -> HighlightEngine:
+    """Движок по файлу правил (``{"rules": [...]}``); без файла — правила по умолчанию."""
+    if not path.exists():
+        return HighlightEngine(DEFAULT_HIGHLIGHT_RULES)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in {path}: {e}") from None
+    items = data.get("rules") if isinstance(data, dict) else data
+    return HighlightEngine(parse_rules(items), source=path)
+
+
+_lock = threading.Lock()
+_engine: HighlightEngine
+_engine_stat: Optional[tuple] = None
+
+
+def _load_current() -> None:
+    global _engine, _engine_stat
+    # stat до чтения: если файл заменят после, следующая проверка это заметит.
+    file_stat = _file_stat(HIGHLIGHT_RULES_PATH)
+    _engine = load_highlight_rules(HIGHLIGHT_RULES_PATH)
+    _engine_stat = file_stat
+
+
+def get_highlight_engine() -> HighlightEngine:
+    """Текущие правила (без проверки файла)."""
+    return _engine
+
+
+def refresh_highlight_rules() -> HighlightEngine:
+    """Перечитать файл правил, если он изменился (в том числе другим воркером).
+
+    Ошибочный файл не заменяет действующие правила (предупреждение в лог).
+    """
+    global _engine_stat
+    if _file_stat(HIGHLIGHT_RULES_PATH) == _engine_stat:
+        return _engine
+    with _lock:
+        file_stat = _file_stat(HIGHLIGHT_RULES_PATH)
+        if file_stat != _engine_stat:
+            try:
+                _load_current()
+            except (OSError, ValueError, re.error) as e:
+                logger.warning("Highlight rules not reloaded: %s", e)
+                _engine_stat = file_stat
+        return _engine
+
+
+def update_highlight_rules(items: list) -> HighlightEngine:
+    """Проверить, сохранить в файл и применить новые правила (ValueError / OSError)."""
+    global _engine, _engine_stat
+    engine = HighlightEngine(parse_rules(items), source=HIGHLIGHT_RULES_PATH)
+    target = HIGHLIGHT_RULES_PATH
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        tmp_path = target.parent / f".{target.name}.{int(time.time() * 1000)}.tmp"
+        tmp_path.write_text(
+            json.dumps({"rules": rules_to_json(engine.rules)}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, target)
+        _engine, _engine_stat = engine, _file_stat(target)
+    return engine
+
+
+try:
+    _load_current()
+except (OSError, ValueError, re.error) as e:
+    logger.warning("Highlight rules file ignored, using defaults: %s", e)
+    _engine = HighlightEngine(DEFAULT_HIGHLIGHT_RULES)
+    _engine_stat = _file_stat(HIGHLIGHT_RULES_PATH)
@@ -0,0 +1,163 @@
+"""Quote analytics over the stored history, computed with NumPy.
+
+All symbols are processed together: the ring buffers are gathered into one
+matrix (symbol x observation, last observation in the last column) and
+returns, volatility, min/max and movers are computed with array operations,
+without a Python loop over symbols. Results are cached per history
+generation (the version of the history file), so repeated requests between
+two ``/receive`` calls are served from memory.
+"""
+
+from __future__ import annotations
+
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from app.services.quotes_store import HistoryView, QuoteHistory, quote_history
+
+# Поля записи истории (см. quotes_store): дата (ordinal), old_price, new_price, pct_change.
+_DATE, _OLD, _NEW, _PCT = range(4)
+# Сдвиг строк для одного searchsorted по всем символам (больше любого ordinal даты).
+_ROW_STRIDE = 10_000_000
+WEEK_DAYS = 7
+
+_CACHE_MAX_ENTRIES = 16
+_cache_lock = threading.Lock()
+_cache: OrderedDict[tuple, dict] = OrderedDict()
+
+
+def _load(view: HistoryView) -> tuple[np.ndarray, np.ndarray]:
+    """Даты и цены (new_price) всех символов, выровненные по последнему наблюдению.
+
+    Возвращает (dates, prices) формы (символы, capacity); пустые ячейки в
+    начале строки: дата 0, цена NaN. Данные копируются из отображения.
+    """
+    n, capacity = len(view.symbols), view.capacity
+    if n == 0:
+        return np.zeros((0, capacity)), np.zeros((0, capacity))
+    cells = np.frombuffer(view.values, dtype=np.float64, count=n * capacity * 4).reshape(n, capacity, 4)
+    starts = np.asarray(view.starts, dtype=np.int64)[:, None]
+    counts = np.asarray(view.counts, dtype=np.int64)[:, None]
+    columns = np.arange(capacity, dtype=np.int64)[None, :]
+    # Колонка j — логическая запись j - (capacity - count) (последняя запись — в последней колонке).
+    physical = (starts + counts - capacity + columns) % capacity
+    valid = columns >= capacity - counts
+    rows = np.arange(n)[:, None]
+    dates = np.where(valid, cells[rows, physical, _DATE], 0.0)
+    prices = np.where(valid, cells[rows, physical, _NEW], np.nan)
+    return dates, prices
+
+
+def _pct(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (new / old - 1.0) * 100.0
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def _value(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+def _movers(symbols: list[str], values: np.ndarray, top: int) -> dict[str, list[dict]]:
+    order = np.argsort(values, kind="stable")  # NaN — в конце
+    known = order[~np.isnan(values[order])]
+    gainers = known[::-1][:top]
+    losers = known[:top]
+    return {
+        "gainers": [{"symbol": symbols[i], "return_pct": float(values[i])} for i in gainers if values[i] > 0],
+        "losers": [{"symbol": symbols[i], "return_pct": float(values[i])} for i in losers if values[i] < 0],
+    }
+
+
+def compute_analytics(
+    symbols: list[str],
+    dates: np.ndarray,
+    prices: np.ndarray,
+    window: int,
+    top: int,
+) -> dict:
+    """Аналитика по матрицам ``_load``: доходности, волатильность, min/max, лидеры роста и падения.
+
+    * ``daily_return_pct`` — последнее наблюдение к предыдущему;
+    * ``weekly_return_pct`` — к последнему наблюдению не позже чем за 7 дней;
+    * ``volatility_pct`` — стандартное отклонение дневных доходностей за ``window`` наблюдений;
+    * ``min`` / ``max`` — по ценам последних ``window`` наблюдений.
+    """
+    n, capacity = prices.shape
+    window = max(1, min(window, capacity))
+    if n == 0:
+        return {"symbols": [], "movers": {"daily": _movers([], np.zeros(0), top), "weekly": _movers([], np.zeros(0), top)}}
+
+    last_price = prices[:, -1]
+    last_date = dates[:, -1]
+    daily_returns = _pct(prices[:, 1:], prices[:, :-1]) if capacity > 1 else np.full((n, 0), np.nan)
+    daily = daily_returns[:, -1] if capacity > 1 else np.full(n, np.nan)
+
+    # Неделя: один searchsorted по всем строкам (даты строки возрастают, пустые — 0 в начале).
+    offsets = np.arange(n, dtype=np.float64)[:, None] * _ROW_STRIDE
+    flat_dates = (dates + offsets).ravel()
+    targets = np.where(last_date > 0, last_date - WEEK_DAYS, -1.0) + offsets[:, 0]
+    pos = np.searchsorted(flat_dates, targets, side="right") - 1
+    row_start = np.arange(n) * capacity
+    found = (pos >= row_start) & (dates.ravel()[np.maximum(pos, 0)] > 0)
+    week_ago = np.where(found, prices.ravel()[np.maximum(pos, 0)], np.nan)
+    weekly = _pct(last_price, week_ago)
+
+    with warnings.catch_warnings():
+        # Символы без данных в окне: NaN без предупреждений NumPy.
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        recent_returns = daily_returns[:, -(window - 1):] if window > 1 else np.full((n, 0), np.nan)
+        volatility = np.nanstd(recent_returns, axis=1, ddof=1) if recent_returns.shape[1] else np.full(n, np.nan)
+        recent_prices = prices[:, -window:]
+        low = np.nanmin(recent_prices, axis=1)
+        high = np.nanmax(recent_prices, axis=1)
+        observations = np.count_nonzero(dates > 0, axis=1)
+
+    rows = []
+    for i, symbol in enumerate(symbols):
+        rows.append({
+            "symbol": symbol,
+            "last_date": date.fromordinal(int(last_date[i])).isoformat() if last_date[i] > 0 else None,
+            "last_price": _value(last_price[i]),
+            "daily_return_pct": _value(daily[i]),
+            "weekly_return_pct": _value(weekly[i]),
+            "volatility_pct": _value(volatility[i]),
+            "min": _value(low[i]),
+            "max": _value(high[i]),
+            "observations": int(observations[i]),
+        })
+    return {
+        "symbols": rows,
+        "movers": {"daily": _movers(symbols, daily, top), "weekly": _movers(symbols, weekly, top)},
+    }
+
+
+def get_quote_analytics(window: int = 20, top: int = 5, history: QuoteHistory = quote_history) -> dict:
+    """Аналитика по всей истории котировок (кэш по версии истории и параметрам)."""
+    key = (history.generation(), window, top)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    with history.read_view() as view:
+        dates, prices = _load(view)
+        symbols, generation = view.symbols, view.generation
+    result = {
+        "generation": generation,
+        "window": window,
+        **compute_analytics(symbols, dates, prices, window, top),
+    }
+
+    with _cache_lock:
+        _cache[(generation, window, top)] = result
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
@@ -5,12 +5,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date, datetime
 from io import BytesIO
-from pathlib import Path
 from typing import Any, Optional
 
-from docx import Document
 from docx.shared import RGBColor
 
+from app.services.docx_writer import save_docx
+from app.services.quotes_template_service import open_template_copy
+
 
 GREEN = RGBColor.from_string("00B050")
 RED = RGBColor.from_string("FF0000")
@@ -46,6 +47,10 @@ class Quote:
     pct_change: Optional[float]
     report_date: Optional[str]
 
+    @property
+    def new_price(self) -> Optional[float]:
+        return _to_float(self.new_price_raw)
+
 
 def _to_float(value: Any) -> Optional[float]:
     if value is None:
@@ -191,10 +196,14 @@ def _build_label_index(table) -> dict[str, int]:
     return index
 
 
-def fill_template(*, template_path: Path, quotes: list[Quote]) -> tuple[BytesIO, int]:
+def fill_template(
+    *,
+    quotes: list[Quote],
+    template_sha256: Optional[str] = None,
+) -> tuple[BytesIO, int]:
     quotes_by_symbol = {q.symbol.strip().lower(): q for q in quotes}
 
-    doc = Document(str(template_path))
+    template, doc = open_template_copy(template_sha256)
     if not doc.tables:
         raise ValueError("Template must contain at least one table")
 
@@ -218,10 +227,8 @@ def fill_template(*, template_path: Path, quotes: list[Quote]) -> tuple[BytesIO,
         _set_cell_text(table.cell(row_idx, 2), pct_text, color=color)
         updated += 1
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer, updated
+    # Меняется только тело документа; остальные части копируются из шаблона как есть.
+    return save_docx(doc, template.data, ["/word/document.xml"]), updated
 
 
 def get_quotes_filename(report_dt: Optional[date]) -> str:
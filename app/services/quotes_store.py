@@ -1,26 +1,511 @@
-"""In-memory data storage for quotes."""
+"""Data storage for quotes: the last received payload and per-symbol price history.
+
+The last payload is kept in memory (and persisted through ``state_store``).
+History is a time series per symbol: a fixed-capacity ring buffer of report
+dates and prices, sorted by date, in a memory-mapped file. Opening the file
+is instant on restart (nothing is read up front); a request finds its date
+range by binary search in the mapping and converts only those points.
+"""
 
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
 import time
-from typing import TypedDict, Optional
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, TypedDict, Optional
+
+from app.core.config import (
+    PERSIST_STATE,
+    QUOTES_HISTORY_CAPACITY,
+    QUOTES_HISTORY_MAX_SYMBOLS,
+    QUOTES_HISTORY_PATH,
+)
+from app.services.state_store import PersistedState, state_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 
 class QuotesStore(TypedDict):
     quotes: list[dict]
     report_date: Optional[str]
     last_received_utc: Optional[str]
+    payload_hash: str
+
+
+def _hash_quotes(quotes: list[dict]) -> str:
+    raw = json.dumps(quotes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
 quotes_store: QuotesStore = {
     "quotes": [],
     "report_date": None,
     "last_received_utc": None,
+    "payload_hash": _hash_quotes([]),
 }
 
 
+# Поля quotes_store меняются вместе (set_quotes вызывается из пула потоков).
+_quotes_lock = threading.Lock()
+
+
+def get_quotes_snapshot() -> tuple[list[dict], str]:
+    """Котировки и их хэш из одного и того же приёма."""
+    with _quotes_lock:
+        return quotes_store["quotes"], quotes_store["payload_hash"]
+
+
 def set_quotes(*, quotes: list[dict], report_date: Optional[str]) -> None:
-    quotes_store["quotes"] = quotes
-    quotes_store["report_date"] = report_date
-    quotes_store["last_received_utc"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    payload_hash = _hash_quotes(quotes)
+    with state_store.mutation("quotes") as change:
+        last_received_utc = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with _quotes_lock:
+            quotes_store.update(
+                quotes=quotes,
+                report_date=report_date,
+                last_received_utc=last_received_utc,
+                payload_hash=payload_hash,
+            )
+        change.save({
+            "quotes": quotes,
+            "report_date": report_date,
+            "last_received_utc": last_received_utc,
+        })
+
+
+def restore_quotes(persisted: PersistedState) -> None:
+    """Загрузить сохранённый снимок котировок (при старте или после изменения другим воркером)."""
+    snapshot = persisted.snapshot
+    if not snapshot:
+        return
+    payload_hash = _hash_quotes(snapshot["quotes"])
+    with _quotes_lock:
+        quotes_store.update(
+            quotes=snapshot["quotes"],
+            report_date=snapshot["report_date"],
+            last_received_utc=snapshot["last_received_utc"],
+            payload_hash=payload_hash,
+        )
+
+
+# --- История котировок -------------------------------------------------------
+#
+# Файл: заголовок (64 байта), каталог символов (64 байта на символ) и данные:
+# на каждый символ ``capacity`` записей по 4 double — дата (ordinal), old_price,
+# new_price, pct_change (NaN — нет значения). Записи символа — кольцевой буфер:
+# логическая запись i лежит в ячейке (start + i) % capacity, даты возрастают.
+
+_HISTORY_MAGIC = b"QHIST1" + sys.byteorder[0].encode() + b"\0"  # double в порядке байт платформы
+_HEADER = struct.Struct("<8sIII")  # magic, capacity, max_symbols, symbol_count
+_GENERATION = struct.Struct("<Q")  # счётчик записей (версия данных истории), смещение 24
+_GENERATION_OFFSET = 24
+_HEADER_SIZE = 64
+_ENTRY = struct.Struct("<48sII")  # имя символа (utf-8), start, count
+_ENTRY_SIZE = 64
+_FIELDS = 4  # дата, old_price, new_price, pct_change
+_MAX_NAME_BYTES = 48
+
+
+class HistoryPoint(NamedTuple):
+    """Котировка символа на дату отчёта."""
+    date: date
+    old_price: Optional[float]
+    new_price: Optional[float]
+    pct_change: Optional[float]
+
+
+def _to_double(value: Optional[float]) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _from_double(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class HistoryView(NamedTuple):
+    """Содержимое истории без копирования (действительно только внутри ``read_view``).
+
+    ``values`` — все ячейки файла: double[max_symbols * capacity * 4]; записи
+    символа i — ячейки [i * capacity, (i + 1) * capacity), логический порядок
+    начинается с ``starts[i]``, заполнено ``counts[i]``.
+    """
+    symbols: list[str]
+    starts: list[int]
+    counts: list[int]
+    capacity: int
+    values: memoryview
+    generation: int
+
+
+class QuoteHistory:
+    """Кольцевые буферы истории котировок по символам в файле, отображённом в память.
+
+    ``path=None`` — анонимное отображение (история только на время работы процесса).
+    Запись и чтение выполняются под блокировкой файла (flock), поэтому файл
+    могут одновременно использовать несколько воркеров.
+    """
+
+    def __init__(self, path: Optional[Path], capacity: int, max_symbols: int):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.max_symbols = max(1, max_symbols)
+        self._lock = threading.RLock()
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._values: Optional[memoryview] = None
+        self._slots: dict[str, int] = {}
+        self._skipped: set[str] = set()
+
+    @property
+    def _data_offset(self) -> int:
+        return _HEADER_SIZE + self.max_symbols * _ENTRY_SIZE
+
+    @property
+    def _size(self) -> int:
+        return self._data_offset + self.max_symbols * self.capacity * _FIELDS * 8
+
+    # -- открытие ------------------------------------------------------------
+
+    def open(self) -> None:
+        """Отобразить файл в память (создаётся или перестраивается при другой раскладке)."""
+        with self._lock:
+            if self._mm is not None:
+                return
+            if self.path is not None:
+                try:
+                    self._open_file()
+                except OSError as e:
+                    logger.warning("Quotes history is not persisted: cannot open %s (%s)", self.path, e)
+                    self.path = None
+            if self.path is None:
+                self._mm = mmap.mmap(-1, self._size)
+                self._init_header()
+            self._values = memoryview(self._mm)[self._data_offset:].cast("d")
+
+    def _open_file(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                with self._file_lock(fd, exclusive=True):
+                    if self._replaced(fd):
+                        continue  # файл заменили, пока ждали блокировку
+                    size = os.fstat(fd).st_size
+                    header = b""
+                    if size >= _HEADER_SIZE:
+                        with open(self.path, "rb") as f:
+                            header = f.read(_HEADER.size)
+                    if header and _HEADER.unpack(header)[:3] != (_HISTORY_MAGIC, self.capacity, self.max_symbols):
+                        self._rebuild(fd, header)
+                        continue  # открыть перестроенный файл
+                    if size < self._size:
+                        os.ftruncate(fd, self._size)
+                    self._mm = mmap.mmap(fd, self._size)
+                    if not header or size == 0:
+                        self._init_header()
+                    self._fd = fd
+                    return
+            finally:
+                if self._fd != fd:
+                    os.close(fd)
+
+    def _replaced(self, fd: int) -> bool:
+        """Файл по пути ``path`` — уже не тот, что открыт как ``fd`` (перестроен другим процессом)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(fd)
+        return (st.st_dev, st.st_ino) != (opened.st_dev, opened.st_ino)
+
+    def _reopen(self) -> None:
+        """Отобразить файл, которым другой процесс заменил текущий, в его раскладке."""
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                magic, capacity, max_symbols, _count = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            pass
+        else:
+            if magic == _HISTORY_MAGIC and (capacity, max_symbols) != (self.capacity, self.max_symbols):
+                # Без этого воркеры со старыми настройками перестраивали бы файл обратно.
+                logger.warning(
+                    "Quotes history %s was rebuilt by another process: capacity %s, max_symbols %s",
+                    self.path, capacity, max_symbols,
+                )
+                self.capacity, self.max_symbols = capacity, max_symbols
+        self.open()
+
+    def _init_header(self) -> None:
+        _HEADER.pack_into(self._mm, 0, _HISTORY_MAGIC, self.capacity, self.max_symbols, 0)
+
+    def _rebuild(self, fd: int, header: bytes) -> None:
+        """Перенести историю из файла с другой раскладкой (ёмкость, число символов).
+
+        Новый файл заменяет старый (os.replace); ``fd`` остаётся открытым на старом.
+        """
+        magic, capacity, max_symbols, _count = _HEADER.unpack(header)
+        old_points: dict[str, list[HistoryPoint]] = {}
+        generation = 0
+        if magic == _HISTORY_MAGIC:
+            old = QuoteHistory(None, capacity, max_symbols)
+            with mmap.mmap(fd, 0) as old_mm:
+                old._mm = old_mm
+                old._values = memoryview(old_mm)[old._data_offset:].cast("d")
+                try:
+                    generation = old._generation()
+                    for symbol in old._read_directory():
+                        old_points[symbol] = old._read_points(symbol, None, None)
+                finally:
+                    old._values.release()
+                    old._values = old._mm = None
+            logger.info("Quotes history resized: capacity %s -> %s", capacity, self.capacity)
+        else:
+            logger.warning("Quotes history file %s has an unknown format; starting a new history", self.path)
+
+        new = QuoteHistory(None, self.capacity, self.max_symbols)
+        new.open()
+        for symbol, points in old_points.items():
+            for point in points[-self.capacity:]:
+                new._put(symbol, point)
+        # Версия продолжает старую: кэши по версии не примут новый файл за прежние данные.
+        _GENERATION.pack_into(new._mm, _GENERATION_OFFSET, generation + 1)
+        tmp_path = self.path.parent / f".{self.path.name}.{int(time.time() * 1000)}.tmp"
+        tmp_path.write_bytes(new._mm[:])
+        new.close()
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._values is not None:
+                self._values.release()
+                self._values = None
+            if self._mm is not None:
+                if self._fd is not None:
+                    self._mm.flush()
+                self._mm.close()
+                self._mm = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._slots.clear()
+
+    @staticmethod
+    @contextmanager
+    def _file_lock(fd: Optional[int], exclusive: bool) -> Iterator[None]:
+        if fd is None or fcntl is None:
+            yield
+            return
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        self.open()
+        with self._lock:
+            while True:
+                with self._file_lock(self._fd, exclusive):
+                    # После перестройки другим воркером отображение указывает на старый файл.
+                    if self._fd is None or not self._replaced(self._fd):
+                        yield
+                        return
+                self._reopen()
+
+    # -- каталог символов ----------------------------------------------------
+
+    def _read_directory(self) -> dict[str, int]:
+        """Символы, добавленные в файл (в том числе другими процессами)."""
+        count = _HEADER.unpack_from(self._mm, 0)[3]
+        for slot in range(len(self._slots), count):
+            name = _ENTRY.unpack_from(self._mm, _HEADER_SIZE + slot * _ENTRY_SIZE)[0]
+            self._slots[name.rstrip(b"\0").decode("utf-8")] = slot
+        return self._slots
+
+    def _entry(self, slot: int) -> tuple[int, int]:
+        _name, start, count = _ENTRY.unpack_from(self._mm, _HEADER_SIZE + slot * _ENTRY_SIZE)
+        return start, count
+
+    def _set_entry(self, slot: int, start: int, count: int) -> None:
+        offset = _HEADER_SIZE + slot * _ENTRY_SIZE + _MAX_NAME_BYTES
+        struct.pack_into("<II", self._mm, offset, start, count)
+
+    def _add_symbol(self, symbol: str) -> Optional[int]:
+        name = symbol.encode("utf-8")
+        count = len(self._slots)
+        if len(name) > _MAX_NAME_BYTES or count >= self.max_symbols:
+            if symbol not in self._skipped:
+                self._skipped.add(symbol)
+                logger.warning("Quotes history: symbol %r skipped (name too long or no free slots)", symbol)
+            return None
+        _ENTRY.pack_into(self._mm, _HEADER_SIZE + count * _ENTRY_SIZE, name, 0, 0)
+        _HEADER.pack_into(self._mm, 0, _HISTORY_MAGIC, self.capacity, self.max_symbols, count + 1)
+        self._slots[symbol] = count
+        return count
+
+    # -- кольцевой буфер -----------------------------------------------------
+
+    def _base(self, slot: int, start: int, i: int) -> int:
+        return (slot * self.capacity + (start + i) % self.capacity) * _FIELDS
+
+    def _bisect(self, slot: int, start: int, count: int, ordinal: int, right: bool = False) -> int:
+        values = self._values
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            day = values[self._base(slot, start, mid)]
+            if day < ordinal or (right and day == ordinal):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _write(self, slot: int, start: int, i: int, row: tuple[float, ...]) -> None:
+        base = self._base(slot, start, i)
+        for k, value in enumerate(row):
+            self._values[base + k] = value
+
+    def _move(self, slot: int, start: int, src: int, dst: int) -> None:
+        a, b = self._base(slot, start, src), self._base(slot, start, dst)
+        self._values[b:b + _FIELDS] = self._values[a:a + _FIELDS]
+
+    def _put(self, symbol: str, point: HistoryPoint) -> bool:
+        """Записать точку (та же дата — замена). Вызывается под блокировкой."""
+        slot = self._read_directory().get(symbol)
+        if slot is None:
+            slot = self._add_symbol(symbol)
+            if slot is None:
+                return False
+        start, count = self._entry(slot)
+        ordinal = point.date.toordinal()
+        row = (float(ordinal), *(_to_double(v) for v in point[1:]))
+        i = self._bisect(slot, start, count, ordinal)
+
+        if i < count and self._values[self._base(slot, start, i)] == ordinal:
+            self._write(slot, start, i, row)
+            return True
+        if count < self.capacity:
+            for j in range(count, i, -1):
+                self._move(slot, start, j - 1, j)
+            self._write(slot, start, i, row)
+            self._set_entry(slot, start, count + 1)
+            return True
+        # Буфер заполнен: самая старая запись вытесняется.
+        if i == 0:
+            return False  # старше всей хранимой истории
+        if i == count:
+            self._write(slot, start, 0, row)
+            self._set_entry(slot, (start + 1) % self.capacity, count)
+            return True
+        for j in range(1, i):
+            self._move(slot, start, j, j - 1)
+        self._write(slot, start, i - 1, row)
+        return True
+
+    def _read_points(self, symbol: str, date_from: Optional[date], date_to: Optional[date]) -> list[HistoryPoint]:
+        slot = self._read_directory().get(symbol)
+        if slot is None:
+            return []
+        start, count = self._entry(slot)
+        lo = self._bisect(slot, start, count, date_from.toordinal()) if date_from else 0
+        hi = self._bisect(slot, start, count, date_to.toordinal(), right=True) if date_to else count
+        values = self._values
+        points = []
+        for i in range(lo, hi):
+            base = self._base(slot, start, i)
+            points.append(HistoryPoint(
+                date.fromordinal(int(values[base])),
+                _from_double(values[base + 1]),
+                _from_double(values[base + 2]),
+                _from_double(values[base + 3]),
+            ))
+        return points
+
+    # -- публичный интерфейс -------------------------------------------------
+
+    def _generation(self) -> int:
+        return _GENERATION.unpack_from(self._mm, _GENERATION_OFFSET)[0]
+
+    def record(self, report_date: date, quotes: Iterable) -> int:
+        """Записать котировки (объекты с symbol/old_price/new_price/pct_change) на дату отчёта."""
+        written = 0
+        with self._locked(exclusive=True):
+            for quote in quotes:
+                symbol = quote.symbol.strip().lower()
+                if not symbol:
+                    continue
+                point = HistoryPoint(report_date, quote.old_price, quote.new_price, quote.pct_change)
+                written += self._put(symbol, point)
+            if written:
+                _GENERATION.pack_into(self._mm, _GENERATION_OFFSET, self._generation() + 1)
+        return written
+
+    def generation(self) -> int:
+        """Версия данных истории: меняется при каждой записи (в том числе другим воркером)."""
+        with self._locked(exclusive=False):
+            return self._generation()
+
+    @contextmanager
+    def read_view(self) -> Iterator[HistoryView]:
+        """Данные всех символов прямо из отображения, под блокировкой чтения."""
+        with self._locked(exclusive=False):
+            slots = self._read_directory()
+            entries = [self._entry(slot) for slot in range(len(slots))]
+            yield HistoryView(
+                symbols=sorted(slots, key=slots.get),
+                starts=[start for start, _count in entries],
+                counts=[count for _start, count in entries],
+                capacity=self.capacity,
+                values=self._values,
+                generation=self._generation(),
+            )
+
+    def points(
+        self,
+        symbol: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> Optional[list[HistoryPoint]]:
+        """История символа за период (None — символа нет в истории)."""
+        symbol = symbol.strip().lower()
+        with self._locked(exclusive=False):
+            if symbol not in self._read_directory():
+                return None
+            return self._read_points(symbol, date_from, date_to)
+
+    def symbols(self) -> dict[str, int]:
+        """Символы истории и число хранимых дат."""
+        with self._locked(exclusive=False):
+            return {symbol: self._entry(slot)[1] for symbol, slot in self._read_directory().items()}
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path) if self.path else None,
+            "capacity": self.capacity,
+            "max_symbols": self.max_symbols,
+            "symbols": len(self.symbols()),
+        }
+
 
+quote_history = QuoteHistory(
+    QUOTES_HISTORY_PATH if PERSIST_STATE else None,
+    QUOTES_HISTORY_CAPACITY,
+    QUOTES_HISTORY_MAX_SYMBOLS,
+)
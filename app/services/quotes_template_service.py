@@ -6,8 +6,13 @@ import os
 import threading
 import time
 from pathlib import Path
+from typing import Optional
+
+from docx.document import Document as DocumentObject
 
 from app.core.config import QUOTES_TEMPLATE_FALLBACK_PATH, QUOTES_TEMPLATE_PATH
+from app.services.state_store import PersistedState, state_store
+from app.services.template_cache import TemplateCache, TemplateEntry, parse_template
 
 _LOCK = threading.Lock()
 
@@ -41,6 +46,22 @@ def get_template_path() -> Path:
     return ensure_template_exists()
 
 
+_cache = TemplateCache(get_template_path)
+
+
+def get_template_hash() -> str:
+    return _cache.get().sha256
+
+
+def restore_template(persisted: PersistedState) -> None:
+    if persisted.snapshot:
+        _cache.invalidate(persisted.snapshot["sha256"])
+
+
+def open_template_copy(expected_sha256: Optional[str] = None) -> tuple[TemplateEntry, DocumentObject]:
+    return _cache.open_copy(expected_sha256)
+
+
 def get_template_info() -> dict:
     path = get_template_path()
     stat = path.stat()
@@ -70,12 +91,17 @@ def update_template_bytes(
         raise ValueError("File does not look like a .docx (zip) document.")
 
     target = Path(QUOTES_TEMPLATE_PATH)
+    # Parse before writing so a broken upload never replaces a working template.
+    entry = parse_template(target, data)
     target.parent.mkdir(parents=True, exist_ok=True)
 
-    with _LOCK:
+    # Хэш нового шаблона сохраняется в state_store: другие воркеры сбрасывают свой кэш при sync.
+    with state_store.mutation("quotes_template") as change, _LOCK:
         tmp_path = target.parent / f".{target.name}.{int(time.time() * 1000)}.tmp"
         tmp_path.write_bytes(data)
         os.replace(tmp_path, target)
+        _cache.replace(entry)
+        change.save({"sha256": entry.sha256})
 
     return get_template_info()
 
@@ -0,0 +1,104 @@
+"""In-memory LRU cache of rendered documents."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable, Optional
+
+from app.core.config import (
+    QUOTES_RENDER_CACHE_MAX_ENTRIES,
+    RENDER_CACHE_MAX_BYTES,
+    RENDER_CACHE_MAX_ENTRIES,
+)
+
+
+@dataclass(frozen=True)
+class RenderedFile:
+    """A rendered document ready to be sent to the client."""
+    content: bytes
+    media_type: str
+    filename: str
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def make_etag(key: Hashable) -> str:
+    """Strong ETag derived from the cache key (the key fully determines the content)."""
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+class RenderCache:
+    """LRU cache bounded both by number of entries and by total content size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self._items: OrderedDict[Hashable, RenderedFile] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def get(self, key: Hashable) -> Optional[RenderedFile]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key: Hashable, item: RenderedFile) -> None:
+        size = len(item.content)
+        if self.max_entries == 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old.content)
+            self._items[key] = item
+            self._size += size
+            while len(self._items) > self.max_entries or self._size > self.max_bytes:
+                _key, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted.content)
+                self.evictions += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "size_bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "not_modified": self.not_modified,
+            }
+
+
+calendar_render_cache = RenderCache(
+    max_entries=RENDER_CACHE_MAX_ENTRIES,
+    max_bytes=RENDER_CACHE_MAX_BYTES,
+)
+
+quotes_render_cache = RenderCache(
+    max_entries=QUOTES_RENDER_CACHE_MAX_ENTRIES,
+    max_bytes=RENDER_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,128 @@
+"""Worker pool for CPU-bound document rendering.
+
+openpyxl/python-docx rendering is synchronous and holds the GIL, so it is
+moved off the event loop. In "process" mode workers are started up front
+(from a forkserver with the heavy libraries preloaded, where available) and
+each worker warms up the templates before serving renders.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import RENDER_EXECUTOR, RENDER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_PRELOAD_MODULES = [
+    "openpyxl",
+    "docx",
+    "app.services.excel_service",
+    "app.services.word_service",
+    "app.services.quotes_doc_service",
+]
+
+_lock = threading.Lock()
+_executor: Optional[Executor] = None
+
+
+def _warm_up_worker() -> None:
+    """Worker initializer: load both templates into this worker's template cache."""
+    from app.services import quotes_template_service, template_service
+
+    for service in (template_service, quotes_template_service):
+        try:
+            service.get_template_hash()
+        except Exception:  # noqa: BLE001 - a missing template is reported by the endpoint
+            logger.warning("Template warm-up failed in render worker", exc_info=True)
+
+
+def _ping() -> bool:
+    return True
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(_PRELOAD_MODULES)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _create_executor() -> Executor:
+    workers = max(1, RENDER_WORKERS)
+    if RENDER_EXECUTOR == "process":
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_mp_context(),
+            initializer=_warm_up_worker,
+        )
+    if RENDER_EXECUTOR != "thread":
+        logger.warning("Unknown RENDER_EXECUTOR=%r, falling back to thread pool", RENDER_EXECUTOR)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+
+
+def get_executor() -> Executor:
+    """Return the render pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = _create_executor()
+        return _executor
+
+
+def start_render_executor() -> None:
+    """Create the pool and start all workers (called on application startup)."""
+    executor = get_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        futures = [executor.submit(_ping) for _ in range(max(1, RENDER_WORKERS))]
+        for future in futures:
+            future.result()
+
+
+def shutdown_render_executor() -> None:
+    """Stop the pool (called on application shutdown)."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_broken(executor: Executor) -> None:
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_render(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a render function in the pool without blocking the event loop.
+
+    In process mode ``func`` must be a module-level function and its
+    arguments/result must be picklable.
+    """
+    executor = get_executor()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); the next render gets a fresh pool.
+        _discard_broken(executor)
+        raise
+
+
+async def run_render_many(func: Callable[..., T], jobs: list[dict[str, Any]]) -> list[T]:
+    """Run ``func(**job)`` for every job in parallel in the pool; results keep job order."""
+    return list(await asyncio.gather(*(run_render(func, **job) for job in jobs)))
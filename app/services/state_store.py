@@ -0,0 +1,370 @@
+"""Durable storage of calendar and quotes state in a local SQLite file.
+
+Each state ("calendar", "quotes", the current template hashes) is kept as a snapshot plus a journal of
+incremental changes made after it, and has a version counter in the ``meta``
+table. Full replacements are written as a new snapshot and drop the journal;
+once the journal reaches ``compact_every`` entries the current state is
+written as a snapshot instead (compaction). At startup the snapshot and the
+remaining journal are read back once.
+
+Two modes:
+
+* single process (default): ingest endpoints only enqueue a record and a
+  background writer thread commits queued records in batches, so a request
+  never waits for disk I/O;
+* shared (several uvicorn workers): a change is made inside a
+  ``BEGIN IMMEDIATE`` transaction, which serializes writers across processes.
+  The worker first catches up with changes committed by other workers, applies
+  its own change and commits it before the request returns. Readers call
+  ``sync``, which compares the version counter and loads only what changed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+from app.core.config import PERSIST_STATE, SHARED_STATE, STATE_COMPACT_EVERY, STATE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    name TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    saved_utc TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class StateRecord(NamedTuple):
+    """One change: the full state after it, and the journal entry (None = snapshot)."""
+    name: str
+    state: Any
+    entry: Any = None
+
+
+class PersistedState(NamedTuple):
+    """Stored changes of one state: a snapshot to start from (None = keep the
+    current state) and journal entries to apply on top of it."""
+    snapshot: Optional[Any]
+    journal: list[Any]
+
+
+class _Registration(NamedTuple):
+    apply: Callable[[PersistedState], None]
+    on_version: Optional[Callable[[str, int], None]]
+
+
+class StateChange:
+    """Handle passed to a mutation; the mutation reports the resulting state."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.record: Optional[StateRecord] = None
+
+    def save(self, state: Any, entry: Any = None) -> None:
+        """``state`` must not be mutated afterwards (it may be serialized later)."""
+        self.record = StateRecord(self.name, state, entry)
+
+
+def _json_default(value: Any) -> Any:
+    # Объекты состояния с to_dict() (EventRecord) сохраняются как dict.
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _connect(path: Path, **kwargs) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    # Файлы, созданные до появления счётчиков версий.
+    for table in ("snapshot", "journal"):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "version" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _version_key(name: str) -> str:
+    return f"version:{name}"
+
+
+class StateStore:
+    """Snapshot + journal persistence, asynchronous or shared between processes."""
+
+    def __init__(self, path: Path, compact_every: int, enabled: bool = True, shared: bool = False):
+        self.path = path
+        self.compact_every = max(1, compact_every)
+        self.enabled = enabled
+        self.shared = shared
+        self.epoch = ""
+        self._registry: dict[str, _Registration] = {}
+        self._seen: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._journal_len: dict[str, int] = {}
+        self._writes = 0
+        self._compactions = 0
+        self._last_error: Optional[str] = None
+
+    def register(
+        self,
+        name: str,
+        apply: Callable[[PersistedState], None],
+        on_version: Optional[Callable[[str, int], None]] = None,
+    ) -> None:
+        """Register a state: ``apply`` loads stored changes into memory,
+        ``on_version`` receives the shared (epoch, version) in shared mode."""
+        self._registry[name] = _Registration(apply, on_version)
+
+    def open(self) -> bool:
+        """Create the database if needed. Disables persistence if the file is unusable."""
+        if not self.enabled:
+            return False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(_connect(self.path)) as conn:
+                conn.executescript(_SCHEMA)
+                with conn:
+                    _migrate(conn)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)",
+                        (uuid.uuid4().hex[:8],),
+                    )
+                self.epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("State persistence disabled: cannot open %s (%s)", self.path, e)
+            self.enabled = False
+        return self.enabled
+
+    def restore(self) -> None:
+        """Load every registered state and start writing changes (call after ``open``)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            for name in self._registry:
+                self._seen.pop(name, None)
+                self._catch_up(conn, name)
+        if not self.shared:
+            self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+            self._thread.start()
+
+    def sync(self, *names: str) -> None:
+        """Shared mode: load changes of ``names`` committed by other workers.
+
+        Reads SQLite (and may wait for a writer's lock): async endpoints call it
+        through ``run_in_threadpool``.
+        """
+        if not (self.shared and self.enabled):
+            return
+        with self._lock:
+            conn = self._connection()
+            for name in names:
+                self._catch_up(conn, name)
+
+    @contextmanager
+    def mutation(self, name: str) -> Iterator[StateChange]:
+        """Wrap a change of ``name``; the body calls ``change.save(...)`` if it changed anything."""
+        change = StateChange(name)
+        if not self.enabled:
+            yield change
+            return
+        if not self.shared:
+            # Под блокировкой: записи попадают в очередь в порядке изменений.
+            with self._lock:
+                yield change
+                if change.record is not None and self._thread is not None:
+                    self._queue.put(change.record)
+            return
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._catch_up(conn, name)
+                yield change
+                if change.record is not None:
+                    self._write(conn, [change.record])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if change.record is not None:
+                self._set_seen(name, self._version(conn, name))
+
+    def flush(self) -> None:
+        """Block until every queued change is committed."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Commit pending changes and stop the writer."""
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+            self._thread = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "shared": self.shared,
+            "path": str(self.path),
+            "pending": self._queue.qsize(),
+            "versions": dict(self._seen),
+            "journal_entries": dict(self._journal_len),
+            "writes": self._writes,
+            "compactions": self._compactions,
+            "last_error": self._last_error,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Транзакции управляются явно (BEGIN IMMEDIATE / COMMIT).
+            self._conn = _connect(self.path, isolation_level=None, check_same_thread=False)
+        return self._conn
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (_version_key(name),)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_seen(self, name: str, version: int) -> None:
+        self._seen[name] = version
+        registration = self._registry.get(name)
+        if self.shared and registration and registration.on_version:
+            registration.on_version(self.epoch, version)
+
+    def _catch_up(self, conn: sqlite3.Connection, name: str) -> None:
+        registration = self._registry.get(name)
+        if registration is None:
+            return
+        version = self._version(conn, name)
+        seen = self._seen.get(name)
+        if seen == version:
+            return
+
+        since = seen or 0
+        snapshot = None
+        row = conn.execute("SELECT payload, version FROM snapshot WHERE name = ?", (name,)).fetchone()
+        if row is not None and (seen is None or row[1] > seen):
+            snapshot, since = json.loads(row[0]), row[1]
+        journal = conn.execute(
+            "SELECT payload FROM journal WHERE name = ? AND version > ? ORDER BY seq",
+            (name, since),
+        ).fetchall()
+        if snapshot is not None or journal:
+            registration.apply(PersistedState(snapshot, [json.loads(payload) for (payload,) in journal]))
+        self._set_seen(name, version)
+
+    def _run(self) -> None:
+        conn = _connect(self.path)
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                records = [item for item in batch if item is not _STOP]
+                try:
+                    if records:
+                        with conn:
+                            self._write(conn, records)
+                except sqlite3.Error as e:
+                    self._last_error = str(e)
+                    logger.exception("Failed to persist state")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(records) != len(batch):
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, records: list[StateRecord]) -> None:
+        """Write records inside the caller's transaction."""
+        # Only the last snapshot of each state in a batch matters: earlier changes
+        # to the same state are contained in it.
+        last_snapshot: dict[str, int] = {}
+        for i, rec in enumerate(records):
+            if rec.entry is None:
+                last_snapshot[rec.name] = i
+
+        versions: dict[str, int] = {}
+        journal_len: dict[str, int] = {}
+        compactions = 0
+        saved_utc = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        for i, rec in enumerate(records):
+            if i < last_snapshot.get(rec.name, -1):
+                continue
+            if rec.name not in versions:
+                # Другие процессы тоже пишут в файл: счётчики читаются внутри транзакции.
+                versions[rec.name] = self._version(conn, rec.name)
+                journal_len[rec.name] = conn.execute(
+                    "SELECT COUNT(*) FROM journal WHERE name = ?", (rec.name,)
+                ).fetchone()[0]
+            versions[rec.name] += 1
+            version = versions[rec.name]
+            if rec.entry is not None and journal_len[rec.name] + 1 < self.compact_every:
+                conn.execute(
+                    "INSERT INTO journal (name, payload, version) VALUES (?, ?, ?)",
+                    (rec.name, _dumps(rec.entry), version),
+                )
+                journal_len[rec.name] += 1
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot (name, payload, saved_utc, version) VALUES (?, ?, ?, ?)",
+                (rec.name, _dumps(rec.state), saved_utc, version),
+            )
+            conn.execute("DELETE FROM journal WHERE name = ?", (rec.name,))
+            journal_len[rec.name] = 0
+            if rec.entry is not None:
+                compactions += 1
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(_version_key(name), str(version)) for name, version in versions.items()],
+        )
+        self._journal_len.update(journal_len)
+        self._compactions += compactions
+        self._writes += len(records)
+
+
+state_store = StateStore(STATE_DB_PATH, STATE_COMPACT_EVERY, enabled=PERSIST_STATE, shared=SHARED_STATE)
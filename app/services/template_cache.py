@@ -0,0 +1,103 @@
+"""In-memory cache of parsed Word templates.
+
+The template is read and parsed once; every render gets a deep copy of the
+parsed document, which is several times cheaper than unzipping and parsing
+the .docx again. An optional compiler derives a render plan from the parsed
+document once per template. Uploads swap the cached entry atomically. A
+lookup does no file I/O: an upload handled by another process (another
+uvicorn worker) is announced with the new content hash through the shared
+state store, and the entry is dropped and reloaded on the next lookup.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from docx import Document
+from docx.document import Document as DocumentObject
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    """Parsed template together with its raw bytes and content hash."""
+    path: Path
+    data: bytes
+    sha256: str
+    document: DocumentObject
+    plan: Any = None
+
+
+PlanCompiler = Callable[[DocumentObject], Any]
+
+
+def parse_template(path: Path, data: bytes, compile_plan: Optional[PlanCompiler] = None) -> TemplateEntry:
+    """Parse .docx bytes; raises ValueError if they are not a Word document."""
+    try:
+        document = Document(BytesIO(data))
+    except Exception as e:
+        raise ValueError(f"File is not a valid .docx document: {e}") from e
+    return TemplateEntry(
+        path=path,
+        data=data,
+        sha256=hashlib.sha256(data).hexdigest(),
+        document=document,
+        plan=compile_plan(document) if compile_plan else None,
+    )
+
+
+class TemplateCache:
+    """Holds the current parsed template, loaded lazily from ``resolve_path``."""
+
+    def __init__(self, resolve_path: Callable[[], Path], compile_plan: Optional[PlanCompiler] = None):
+        self._resolve_path = resolve_path
+        self._compile_plan = compile_plan
+        self._lock = threading.Lock()
+        self._entry: Optional[TemplateEntry] = None
+
+    def get(self, expected_sha256: Optional[str] = None) -> TemplateEntry:
+        """Return the cached template.
+
+        ``expected_sha256`` lets another process (a render worker) detect that
+        the template was replaced on disk since it was cached here.
+        """
+        entry = self._entry
+        if entry is not None and self._is_current(entry, expected_sha256):
+            return entry
+        with self._lock:
+            entry = self._entry
+            if entry is None or not self._is_current(entry, expected_sha256):
+                path = self._resolve_path()
+                entry = parse_template(path, path.read_bytes(), self._compile_plan)
+                self._entry = entry
+            return entry
+
+    @staticmethod
+    def _is_current(entry: TemplateEntry, expected_sha256: Optional[str]) -> bool:
+        return expected_sha256 is None or entry.sha256 == expected_sha256
+
+    def invalidate(self, sha256: Optional[str] = None) -> None:
+        """Drop the cached entry unless it already has content hash ``sha256``
+        (another process installed that template); the next lookup reloads it."""
+        with self._lock:
+            if self._entry is not None and self._entry.sha256 != sha256:
+                self._entry = None
+
+    def open_copy(self, expected_sha256: Optional[str] = None) -> tuple[TemplateEntry, DocumentObject]:
+        """Cached entry (raw bytes, plan) together with a private copy of its document."""
+        entry = self.get(expected_sha256)
+        return entry, copy.deepcopy(entry.document)
+
+    def parse(self, path: Path, data: bytes) -> TemplateEntry:
+        """Parse (and compile) template bytes the same way cached entries are built."""
+        return parse_template(path, data, self._compile_plan)
+
+    def replace(self, entry: TemplateEntry) -> None:
+        """Install an entry whose bytes were just written to ``entry.path``."""
+        with self._lock:
+            self._entry = entry
@@ -0,0 +1,165 @@
+"""Compiled render plan for the calendar Word template.
+
+The template is analysed once, when it is loaded or uploaded: every
+``{{...}}`` placeholder is located (document body including nested tables,
+headers and footers), the run formatting it inherits is resolved, and the
+XML parts that a render rewrites are recorded. A render then only resolves
+the recorded positions in its private copy of the document.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, NamedTuple, Optional
+
+from docx.document import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.shared import Length, Pt
+from docx.text.paragraph import Paragraph
+
+PLACEHOLDER_RE = re.compile(r"\{\{[^{}]+\}\}")
+
+# Placeholders replaced by a block of paragraphs (the whole paragraph is rewritten).
+BLOCK_PLACEHOLDERS = ("{{CONTENT_RU}}", "{{CONTENT_EN}}")
+# Placeholders substituted inside their paragraph.
+INLINE_PLACEHOLDERS = ("{{CALENDAR_DATE}}",)
+
+# Paragraphs whose text may contain a placeholder (confirmed against p.text).
+_CANDIDATE_PARAGRAPHS_XPATH = ".//w:p[contains(string(.), '{{')]"
+
+
+class StoryRoot(NamedTuple):
+    """Root element of a document story: the body (rel_id=None) or a header/footer part."""
+    rel_id: Optional[str]
+    partname: str
+    element: object
+    parent: object
+
+
+def iter_story_roots(doc: Document) -> Iterator[StoryRoot]:
+    """Body first, then every unique header/footer part."""
+    yield StoryRoot(None, str(doc.part.partname), doc.element.body, doc._body)
+    for rel_id, rel in doc.part.rels.items():
+        if rel.is_external or rel.reltype not in (RT.HEADER, RT.FOOTER):
+            continue
+        part = rel.target_part
+        yield StoryRoot(rel_id, str(part.partname), part.element, None)
+
+
+class PlaceholderIndex(dict):
+    """placeholder -> paragraphs (in document order) where it occurs."""
+
+    def first(self, placeholder: str) -> Optional[Paragraph]:
+        paragraphs = self.get(placeholder)
+        return paragraphs[0] if paragraphs else None
+
+
+def _iter_placeholder_paragraphs(doc: Document) -> Iterator[tuple[StoryRoot, Paragraph, list[str]]]:
+    for story in iter_story_roots(doc):
+        for p in story.element.xpath(_CANDIDATE_PARAGRAPHS_XPATH):
+            found = PLACEHOLDER_RE.findall(p.text)
+            if found:
+                yield story, Paragraph(p, story.parent), list(dict.fromkeys(found))
+
+
+def build_placeholder_index(doc: Document) -> PlaceholderIndex:
+    """One XPath pass over the document: every {{...}} with its paragraphs."""
+    index = PlaceholderIndex()
+    for _story, para, found in _iter_placeholder_paragraphs(doc):
+        for placeholder in found:
+            index.setdefault(placeholder, []).append(para)
+    return index
+
+
+def run_font(para: Paragraph) -> tuple[Optional[str], Optional[Length]]:
+    """Font a replacement inherits: the first run's, or Arial 11 for an empty paragraph."""
+    if para.runs:
+        font = para.runs[0].font
+        return font.name, font.size
+    return "Arial", Pt(11)
+
+
+class PlaceholderSite(NamedTuple):
+    """Position of a placeholder paragraph, independent of a particular document copy."""
+    placeholder: str
+    rel_id: Optional[str]
+    partname: str
+    path: tuple[int, ...]
+    font_name: Optional[str]
+    font_size: Optional[Length]
+
+
+def _element_path(root, element) -> tuple[int, ...]:
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """Where each placeholder lives in the template and what a render touches."""
+    sites: dict[str, tuple[PlaceholderSite, ...]]
+    parts: frozenset[str]
+
+    @property
+    def missing(self) -> list[str]:
+        """Required block placeholders absent from the template."""
+        return [ph for ph in BLOCK_PLACEHOLDERS if ph not in self.sites]
+
+    def resolve(self, doc: Document, placeholders) -> dict[str, list[tuple[Paragraph, PlaceholderSite]]]:
+        """Paragraphs of ``placeholders`` in ``doc`` (a copy of the compiled template).
+
+        All positions are resolved before anything is modified, since block
+        replacements shift the indices of following siblings.
+        """
+        roots = {story.rel_id: story for story in iter_story_roots(doc)}
+        resolved: dict[str, list[tuple[Paragraph, PlaceholderSite]]] = {}
+        for placeholder in placeholders:
+            for site in self.sites.get(placeholder, ()):
+                story = roots[site.rel_id]
+                element = story.element
+                for i in site.path:
+                    element = element[i]
+                resolved.setdefault(placeholder, []).append((Paragraph(element, story.parent), site))
+        return resolved
+
+    def describe(self) -> list[dict]:
+        """Placeholders found in the template (for API responses)."""
+        result = []
+        for placeholder, sites in self.sites.items():
+            if placeholder in BLOCK_PLACEHOLDERS:
+                kind = "block"
+            elif placeholder in INLINE_PLACEHOLDERS:
+                kind = "inline"
+            else:
+                kind = "unknown"
+            result.append({
+                "placeholder": placeholder,
+                "kind": kind,
+                "occurrences": len(sites),
+                "parts": sorted({site.partname for site in sites}),
+            })
+        return result
+
+
+def compile_render_plan(doc: Document) -> RenderPlan:
+    """Analyse a parsed template once and build its render plan."""
+    sites: dict[str, list[PlaceholderSite]] = {}
+    parts: set[str] = set()
+    for story, para, found in _iter_placeholder_paragraphs(doc):
+        path = _element_path(story.element, para._p)
+        font_name, font_size = run_font(para)
+        for placeholder in found:
+            sites.setdefault(placeholder, []).append(
+                PlaceholderSite(placeholder, story.rel_id, story.partname, path, font_name, font_size)
+            )
+            if placeholder in BLOCK_PLACEHOLDERS or placeholder in INLINE_PLACEHOLDERS:
+                parts.add(story.partname)
+    return RenderPlan(
+        sites={placeholder: tuple(found) for placeholder, found in sites.items()},
+        parts=frozenset(parts),
+    )
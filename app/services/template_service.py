@@ -6,8 +6,14 @@ import os
 import threading
 import time
 from pathlib import Path
+from typing import Optional
+
+from docx.document import Document as DocumentObject
 
 from app.core.config import WORD_TEMPLATE_FALLBACK_PATH, WORD_TEMPLATE_PATH
+from app.services.template_cache import TemplateCache, TemplateEntry
+from app.services.state_store import PersistedState, state_store
+from app.services.template_plan import compile_render_plan
 
 _LOCK = threading.Lock()
 
@@ -45,6 +51,25 @@ def get_template_path() -> Path:
     return ensure_template_exists()
 
 
+_cache = TemplateCache(get_template_path, compile_render_plan)
+
+
+def get_template_hash() -> str:
+    """Return sha256 of the current template content (served from the template cache)."""
+    return _cache.get().sha256
+
+
+def restore_template(persisted: PersistedState) -> None:
+    """Шаблон, загруженный другим воркером: кэш сбрасывается, если хэш другой."""
+    if persisted.snapshot:
+        _cache.invalidate(persisted.snapshot["sha256"])
+
+
+def open_template_copy(expected_sha256: Optional[str] = None) -> tuple[TemplateEntry, DocumentObject]:
+    """Return the cached template entry (bytes, render plan) and a private copy of its document."""
+    return _cache.open_copy(expected_sha256)
+
+
 def get_template_info() -> dict:
     """Return metadata about the current template."""
     path = get_template_path()
@@ -76,11 +101,18 @@ def update_template_bytes(
         raise ValueError("File does not look like a .docx (zip) document.")
 
     target = Path(WORD_TEMPLATE_PATH)
+    # Parse and compile before writing so a broken upload never replaces a working template.
+    entry = _cache.parse(target, data)
+    if entry.plan.missing:
+        raise ValueError(f"Template is missing required placeholders: {', '.join(entry.plan.missing)}")
     target.parent.mkdir(parents=True, exist_ok=True)
 
-    with _LOCK:
+    # Хэш нового шаблона сохраняется в state_store: другие воркеры сбрасывают свой кэш при sync.
+    with state_store.mutation("template") as change, _LOCK:
         tmp_path = target.parent / f".{target.name}.{int(time.time() * 1000)}.tmp"
         tmp_path.write_bytes(data)
         os.replace(tmp_path, target)
+        _cache.replace(entry)
+        change.save({"sha256": entry.sha256})
 
-    return get_template_info()
+    return {**get_template_info(), "placeholders": entry.plan.describe()}
@@ -1,29 +1,37 @@
 """Word document generation service."""
+import re
 from datetime import date
 from io import BytesIO
-from pathlib import Path
-from typing import Optional, Iterator
+from typing import NamedTuple, Optional
+from xml.sax.saxutils import escape, quoteattr
 
-from docx import Document
+from docx.document import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.text.paragraph import Paragraph
-from docx.oxml import OxmlElement
-
-from app.utils.date_utils import (
-    get_monday_of_week,
-    get_week_dates,
-    choose_reference_monday,
-    group_items_by_date,
-    parse_time_for_sort,
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from app.services.calendar_index import EMPTY_DAY, CalendarIndex, DayEntry, HolidayGroup
+from app.services.docx_writer import save_docx
+from app.services.event_record import EventRecord
+from app.services.template_plan import (
+    PlaceholderIndex,
+    RenderPlan,
+    build_placeholder_index,
+    run_font,
 )
-from app.utils.constants import COUNTRY_NAMES_RU, COUNTRY_NAMES_EN
+from app.services.template_service import open_template_copy
+from app.utils.date_utils import convert_to_24h, get_week_dates
+from app.utils.constants import COLOR_RED, COUNTRY_NAMES_RU, COUNTRY_NAMES_EN
 from app.utils.text_utils import convert_month_suffix_to_ru
 
 
 # Дни недели
 DAYS_RU = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
 DAYS_EN = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Строка с названием дня недели оформляется как заголовок дня
+_DAY_NAME = re.compile("|".join(DAYS_RU + DAYS_EN))
 
 # Месяцы
 MONTHS_RU = ["января", "февраля", "марта", "апреля", "мая", "июня",
@@ -32,39 +40,6 @@ MONTHS_EN = ["January", "February", "March", "April", "May", "June",
              "July", "August", "September", "October", "November", "December"]
 
 
-def convert_to_24h(time_str: str) -> str:
-    """Конвертация времени из AM/PM в 24-часовой формат."""
-    if not time_str or not isinstance(time_str, str):
-        return ""
-    
-    time_str = time_str.strip().upper()
-    if not time_str:
-        return ""
-    
-    if "AM" not in time_str and "PM" not in time_str:
-        return time_str
-    
-    is_pm = "PM" in time_str
-    time_clean = time_str.replace("AM", "").replace("PM", "").strip()
-    
-    try:
-        if ":" in time_clean:
-            parts = time_clean.split(":")
-            hours = int(parts[0])
-            minutes = int(parts[1]) if len(parts) > 1 else 0
-            
-            if is_pm and hours != 12:
-                hours += 12
-            elif not is_pm and hours == 12:
-                hours = 0
-            
-            return f"{hours:02d}:{minutes:02d}"
-    except (ValueError, IndexError):
-        pass
-    
-    return time_str
-
-
 def format_date_header(d: date, lang: str) -> str:
     """Форматирование заголовка дня: 'Понедельник, 12 января'."""
     if lang == "ru":
@@ -75,13 +50,19 @@ def format_date_header(d: date, lang: str) -> str:
 
 def format_event_line(time_str: str, country: str, event: str, lang: str) -> str:
     """Форматирование строки события: '02:50 – США: событие'."""
-    country_names = COUNTRY_NAMES_RU if lang == "ru" else COUNTRY_NAMES_EN
-    country_display = country_names.get(country, country)
-    
     # Для русского языка конвертируем английские месяцы в русские
     event_text = convert_month_suffix_to_ru(event) if lang == "ru" else event
-    
-    time_24 = convert_to_24h(time_str)
+    return _event_line(convert_to_24h(time_str), country, event_text, lang)
+
+
+def format_record_line(ev: EventRecord, lang: str) -> str:
+    """Строка события из EventRecord (время и текст события вычислены при приёме)."""
+    return _event_line(ev.time_24, ev.country, ev.event_text, lang)
+
+
+def _event_line(time_24: str, country: str, event_text: str, lang: str) -> str:
+    country_names = COUNTRY_NAMES_RU if lang == "ru" else COUNTRY_NAMES_EN
+    country_display = country_names.get(country, country)
     
     if time_24:
         return f"{time_24} – {country_display}: {event_text}"
@@ -89,20 +70,13 @@ def format_event_line(time_str: str, country: str, event: str, lang: str) -> str
         return f"{country_display}: {event_text}"
 
 
-def format_holiday_line(holidays: list[dict], lang: str) -> str:
-    """Форматирование строки праздников."""
+def format_holiday_line(holidays: tuple[HolidayGroup, ...], lang: str) -> str:
+    """Форматирование строки праздников (праздники дня, сгруппированные по названию)."""
     country_names = COUNTRY_NAMES_RU if lang == "ru" else COUNTRY_NAMES_EN
     
-    grouped: dict[str, list[str]] = {}
-    for hol in holidays:
-        name = hol.get("holiday", "") or hol.get("event", "")
-        country = hol.get("country", "")
-        if name:
-            grouped.setdefault(name, []).append(country)
-    
     parts = []
-    for name, countries in grouped.items():
-        country_list = ", ".join(country_names.get(c, c) for c in sorted(set(countries)))
+    for name, countries in holidays:
+        country_list = ", ".join(country_names.get(c, c) for c in countries)
         if lang == "ru":
             parts.append(f"{name}. Праздник в {country_list}")
         else:
@@ -111,194 +85,246 @@ def format_holiday_line(holidays: list[dict], lang: str) -> str:
     return "; ".join(parts)
 
 
-def generate_content(
-    events: list[dict],
-    holidays: list[dict],
+class ContentLine(NamedTuple):
+    """Строка контента календаря; формат (заголовок дня или обычная строка) известен заранее.
+
+    Как и раньше, заголовком оформляется любая строка с названием дня недели
+    (например, праздник "Easter Monday"), а не только заголовки дат.
+    """
+    text: str
+    is_day_header: bool = False
+    highlight: bool = False  # событие выделяется красным (как в Excel)
+
+
+def generate_content_lines(
+    days: dict[date, DayEntry],
     lang: str,
-    monday: Optional[date] = None,
-) -> str:
-    """Генерация текстового контента для одного языка."""
-    
-    events_by_date = group_items_by_date(events)
-    holidays_by_date = group_items_by_date(holidays)
+    monday: date,
+) -> list[ContentLine]:
+    """Генерация структурированного контента недели ``monday`` для одного языка.
 
-    if monday is None:
-        monday = choose_reference_monday(events_by_date, holidays_by_date)
-    
+    ``days`` — дни одного языка из CalendarIndex (события уже отсортированы по времени).
+    """
     week_dates = get_week_dates(monday)
     
-    lines = []
+    lines: list[ContentLine] = []
     no_data_text = "Нет важных макроданных" if lang == "ru" else "No important macroeconomic data"
     
     for d in week_dates:
-        lines.append(format_date_header(d, lang))
+        lines.append(ContentLine(format_date_header(d, lang), is_day_header=True))
         
-        day_holidays = holidays_by_date.get(d, [])
-        day_events = events_by_date.get(d, [])
+        day_events, day_holidays = days.get(d, EMPTY_DAY)
         
         has_content = False
         
         if day_holidays:
-            lines.append(format_holiday_line(day_holidays, lang))
+            holiday_line = format_holiday_line(day_holidays, lang)
+            lines.append(ContentLine(holiday_line, _is_day_header(holiday_line)))
             has_content = True
         
         if day_events:
-            day_events.sort(key=lambda x: parse_time_for_sort(x.get("time", "")))
             for ev in day_events:
-                line = format_event_line(
-                    ev.get("time", ""),
-                    ev.get("country", ""),
-                    ev.get("event", ""),
-                    lang
-                )
-                lines.append(line)
+                event_line = format_record_line(ev, lang)
+                lines.append(ContentLine(event_line, _is_day_header(event_line), ev.highlight))
             has_content = True
         
         if not has_content:
-            lines.append(no_data_text)
+            lines.append(ContentLine(no_data_text))
         
-        lines.append("")
+        lines.append(ContentLine(""))
     
-    return "\n".join(lines).strip()
+    while lines and not lines[-1].text:
+        lines.pop()
+    return lines
 
 
-def insert_paragraph_after(paragraph: Paragraph, parent) -> Paragraph:
-    """Вставить новый параграф ПОСЛЕ указанного."""
-    new_p = OxmlElement('w:p')
-    paragraph._element.addnext(new_p)
-    return Paragraph(new_p, parent)
+def generate_content(days: dict[date, DayEntry], lang: str, monday: date) -> str:
+    """Генерация текстового контента для одного языка."""
+    lines = generate_content_lines(days, lang, monday)
+    return "\n".join(line.text for line in lines).strip()
 
 
-def iter_all_paragraphs(doc: Document) -> Iterator[tuple[Paragraph, any]]:
-    """Итерация по ВСЕМ параграфам документа."""
-    for para in doc.paragraphs:
-        yield para, doc
-    
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    yield para, cell
-    
-    for section in doc.sections:
-        if section.header:
-            for para in section.header.paragraphs:
-                yield para, section.header
-        if section.footer:
-            for para in section.footer.paragraphs:
-                yield para, section.footer
-
-
-def format_paragraph(para: Paragraph, line: str, font_name: str, font_size):
-    """Форматирование параграфа с текстом."""
-    is_day_header = any(day in line for day in DAYS_RU + DAYS_EN)
-    
-    if is_day_header:
-        para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = para.add_run(line)
-        run.bold = True
-        run.font.name = "Arial"
-        run.font.size = Pt(11)
-    else:
-        para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        run = para.add_run(line)
-        run.bold = False
-        run.font.name = font_name or "Arial"
-        run.font.size = font_size or Pt(11)
-
-
-def replace_placeholder(doc: Document, placeholder: str, content: str) -> bool:
-    """Замена placeholder-а в документе на контент."""
-    for para, parent in iter_all_paragraphs(doc):
-        if placeholder in para.text:
-            if para.runs:
-                first_run = para.runs[0]
-                font_name = first_run.font.name
-                font_size = first_run.font.size
-            else:
-                font_name = "Arial"
-                font_size = Pt(11)
-            
-            para.clear()
-            
-            content_lines = content.split("\n")
-            
-            if content_lines:
-                format_paragraph(para, content_lines[0], font_name, font_size)
-            
-            current_para = para
-            for line in content_lines[1:]:
-                new_para = insert_paragraph_after(current_para, parent)
-                format_paragraph(new_para, line, font_name, font_size)
-                current_para = new_para
-            
-            return True
-    
-    return False
+def _is_day_header(line: str) -> bool:
+    return _DAY_NAME.search(line) is not None
+
+
+def _run_content_xml(text: str) -> str:
+    """Содержимое w:r для текста (как Run.text в python-docx: табуляции и переносы — отдельные элементы)."""
+    parts = []
+    for i, chunk in enumerate(re.split(r"(\t|\r\n|\r|\n)", text)):
+        if i % 2:
+            parts.append("<w:tab/>" if chunk == "\t" else "<w:br/>")
+        elif chunk:
+            space = ' xml:space="preserve"' if chunk != chunk.strip() else ""
+            parts.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+    return "".join(parts)
+
+
+def _run_xml(text: str, font_name: str, half_points: int, bold: bool, color: Optional[str] = None) -> str:
+    font = quoteattr(font_name)
+    bold_xml = "<w:b/>" if bold else '<w:b w:val="0"/>'
+    color_xml = f'<w:color w:val="{color}"/>' if color else ""
+    return (
+        f'<w:r><w:rPr><w:rFonts w:ascii={font} w:hAnsi={font}/>{bold_xml}{color_xml}'
+        f'<w:sz w:val="{half_points}"/></w:rPr>{_run_content_xml(text)}</w:r>'
+    )
+
+
+def build_content_elements(lines: list[ContentLine], font_name, font_size) -> list:
+    """Все абзацы блока контента одним lxml-фрагментом (один разбор XML).
+
+    Заголовок дня — по центру, жирный Arial 11; остальные строки — слева,
+    шрифтом placeholder-а (по умолчанию Arial 11), выделенные события — красным.
+    """
+    event_font = font_name or "Arial"
+    event_size = int(round((font_size or Pt(11)).pt * 2))
+    header_run = ("Arial", 22, True)
+    event_run = (event_font, event_size, False)
+
+    paragraphs = []
+    for line in lines:
+        align = "center" if line.is_day_header else "left"
+        run = _run_xml(
+            line.text,
+            *(header_run if line.is_day_header else event_run),
+            color=COLOR_RED if line.highlight else None,
+        )
+        paragraphs.append(f'<w:p><w:pPr><w:jc w:val="{align}"/></w:pPr>{run}</w:p>')
+    body = parse_xml(f"<w:body {nsdecls('w')}>{''.join(paragraphs)}</w:body>")
+    return list(body)
+
+
+def fill_placeholder_paragraph(para: Paragraph, lines: list[ContentLine], font: Optional[tuple] = None):
+    """Заменить абзац с placeholder-ом блоком абзацев контента.
+
+    ``font`` — унаследованный шрифт (из плана шаблона); иначе берётся из первого run-а.
+    """
+    font_name, font_size = font or run_font(para)
+
+    if not lines:
+        lines = [ContentLine("")]
+    elements = build_content_elements(lines, font_name, font_size)
+
+    # Первая строка пишется в сам абзац placeholder-а (сохраняет его стиль и отступы).
+    para.clear()
+    first = elements[0]
+    para.alignment = WD_ALIGN_PARAGRAPH.CENTER if lines[0].is_day_header else WD_ALIGN_PARAGRAPH.LEFT
+    para._p.append(first.r_lst[0])
+
+    # Остальные абзацы вставляются одной операцией над деревом.
+    p = para._p
+    parent = p.getparent()
+    index = parent.index(p)
+    parent[index + 1:index + 1] = elements[1:]
+
+
+def fill_inline_paragraph(para: Paragraph, values: dict[str, str], font: Optional[tuple] = None) -> None:
+    """Подставить значения inline-placeholder-ов в абзац (одна перезапись абзаца)."""
+    new_text = para.text
+    for placeholder, value in values.items():
+        new_text = new_text.replace(placeholder, value)
+    font_name, font_size = font or run_font(para)
+
+    para.clear()
+    run = para.add_run(new_text)
+    run.font.name = font_name or "Arial"
+    run.font.size = font_size or Pt(11)
+
+
+def _apply_replacements(
+    sites: dict[str, list[tuple[Paragraph, Optional[tuple]]]],
+    blocks: dict[str, list[ContentLine]],
+    inline: dict[str, str],
+) -> set[str]:
+    """Все замены за один проход; каждый абзац переписывается один раз.
+
+    ``sites`` — placeholder -> [(абзац, унаследованный шрифт или None)].
+    """
+    replaced: set[str] = set()
+
+    # Inline-замены группируются по абзацу.
+    inline_by_para: dict[int, tuple[Paragraph, Optional[tuple], dict[str, str]]] = {}
+    for placeholder, value in inline.items():
+        for para, font in sites.get(placeholder, ()):
+            entry = inline_by_para.setdefault(id(para._p), (para, font, {}))
+            entry[2][placeholder] = value
+            replaced.add(placeholder)
+    for para, font, values in inline_by_para.values():
+        fill_inline_paragraph(para, values, font)
+
+    # Блочный контент заменяет первый абзац с placeholder-ом целиком.
+    for placeholder, lines in blocks.items():
+        found = sites.get(placeholder)
+        if not found:
+            continue
+        para, font = found[0]
+        if placeholder not in para.text:
+            continue
+        fill_placeholder_paragraph(para, lines, font)
+        replaced.add(placeholder)
+
+    return replaced
+
+
+def apply_placeholders(
+    index: PlaceholderIndex,
+    blocks: Optional[dict[str, list[ContentLine]]] = None,
+    inline: Optional[dict[str, str]] = None,
+) -> set[str]:
+    """Применить все замены по индексу за один проход. Возвращает заменённые placeholder-ы."""
+    sites = {ph: [(para, None) for para in paragraphs] for ph, paragraphs in index.items()}
+    return _apply_replacements(sites, blocks or {}, inline or {})
+
+
+def execute_render_plan(
+    doc: Document,
+    plan: RenderPlan,
+    blocks: dict[str, list[ContentLine]],
+    inline: dict[str, str],
+) -> set[str]:
+    """Выполнить скомпилированный план шаблона на копии документа (без повторного анализа)."""
+    resolved = plan.resolve(doc, [*inline, *blocks])
+    sites = {
+        ph: [(para, (site.font_name, site.font_size)) for para, site in found]
+        for ph, found in resolved.items()
+    }
+    return _apply_replacements(sites, blocks, inline)
 
 
 def replace_inline_placeholder(doc: Document, placeholder: str, value: str) -> bool:
     """Замена placeholder-а на значение внутри существующего абзаца."""
-    replaced = False
-    for para, _parent in iter_all_paragraphs(doc):
-        if placeholder in para.text:
-            new_text = para.text.replace(placeholder, value)
-            if para.runs:
-                first_run = para.runs[0]
-                font_name = first_run.font.name
-                font_size = first_run.font.size
-            else:
-                font_name = "Arial"
-                font_size = Pt(11)
-
-            para.clear()
-            run = para.add_run(new_text)
-            run.font.name = font_name or "Arial"
-            run.font.size = font_size or Pt(11)
-            replaced = True
-    return replaced
+    return placeholder in apply_placeholders(build_placeholder_index(doc), inline={placeholder: value})
 
 
 def generate_word(
-    work_en: list[dict],
-    work_ru: list[dict],
-    holidays_en: list[dict],
-    holidays_ru: list[dict],
-    template_path: str | Path
+    index: CalendarIndex,
+    template_sha256: Optional[str] = None,
+    monday: Optional[date] = None,
 ) -> BytesIO:
-    """Генерация Word документа из шаблона."""
-    template_path = Path(template_path)
-    if not template_path.exists():
-        raise FileNotFoundError(f"Template not found: {template_path}")
-    
-    doc = Document(str(template_path))
-    
-    combined_events_by_date = group_items_by_date(work_en + work_ru)
-    combined_holidays_by_date = group_items_by_date(holidays_en + holidays_ru)
-    monday = choose_reference_monday(combined_events_by_date, combined_holidays_by_date)
+    """Генерация Word документа из шаблона (копия разобранного шаблона и его план из кэша)."""
+    template, doc = open_template_copy(template_sha256)
+    plan = template.plan
+    if plan.missing:
+        raise ValueError(f"Placeholder {plan.missing[0]} not found in template.")
+
+    monday = monday or index.reference_monday()
     calendar_date = f"{monday.day:02d}.{monday.month:02d}.{str(monday.year)[2:]}"
 
-    content_ru = generate_content(work_ru, holidays_ru, "ru", monday=monday)
-    content_en = generate_content(work_en, holidays_en, "en", monday=monday)
+    content_ru = generate_content_lines(index.week_days("ru", monday), "ru", monday)
+    content_en = generate_content_lines(index.week_days("en", monday), "en", monday)
     
-    if not replace_placeholder(doc, "{{CONTENT_RU}}", content_ru):
-        raise ValueError("Placeholder {{CONTENT_RU}} not found in template.")
-    
-    if not replace_placeholder(doc, "{{CONTENT_EN}}", content_en):
-        raise ValueError("Placeholder {{CONTENT_EN}} not found in template.")
+    blocks = {"{{CONTENT_RU}}": content_ru, "{{CONTENT_EN}}": content_en}
+    replaced = execute_render_plan(doc, plan, blocks=blocks, inline={"{{CALENDAR_DATE}}": calendar_date})
+    # План проверен при загрузке шаблона; копия документа должна с ним совпадать.
+    for placeholder in blocks:
+        if placeholder not in replaced:
+            raise ValueError(f"Placeholder {placeholder} not found in template.")
 
-    replace_inline_placeholder(doc, "{{CALENDAR_DATE}}", calendar_date)
-    
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    
-    return buffer
+    # Перезаписываются только части с placeholder-ами; картинки, стили и т.п. копируются из шаблона.
+    return save_docx(doc, template.data, plan.parts)
 
 
-def get_output_filename(events: list[dict], holidays: Optional[list[dict]] = None) -> str:
+def get_output_filename(index: CalendarIndex, monday: Optional[date] = None) -> str:
     """Генерация имени выходного файла на основе данных."""
-    events_by_date = group_items_by_date(events)
-    holidays_by_date = group_items_by_date(holidays or [])
-    monday = choose_reference_monday(events_by_date, holidays_by_date)
+    monday = monday or index.reference_monday()
     return f"Calendar_{monday.day:02d}.{monday.month:02d}.{monday.year}.docx"
@@ -52,3 +52,49 @@ MONTH_EN_TO_RU_NOMINATIVE = {
 }
 # Квартал
 QUARTER_EN_TO_RU = {"Q1": "1 кв.", "Q2": "2 кв.", "Q3": "3 кв.", "Q4": "4 кв."}
+
+
+# Палитра стилей ячеек календаря: все сочетания шрифта/заливки/выравнивания/границ,
+# которые использует раскладка листа. Регистрируются в книге как NamedStyle.
+# Имена: cal_<тип строки>_<колонка>[_red][_first|_last]; _first/_last — толстая
+# граница сверху/снизу (первая дата недели / последняя строка листа).
+def _build_cell_styles() -> dict[str, dict]:
+    def border(left=None, right=None, top=None, bottom=None) -> Border:
+        return Border(left=left, right=right, top=top, bottom=bottom)
+
+    styles: dict[str, dict] = {
+        "cal_header_c": dict(font=FONT_HEADER, alignment=ALIGN_CENTER,
+                             border=border(BORDER_MEDIUM, BORDER_THIN, BORDER_MEDIUM, BORDER_MEDIUM)),
+        "cal_header_d": dict(font=FONT_HEADER, alignment=ALIGN_CENTER,
+                             border=border(BORDER_THIN, BORDER_THIN, BORDER_MEDIUM, BORDER_MEDIUM)),
+        "cal_header_e": dict(font=FONT_HEADER, alignment=ALIGN_CENTER,
+                             border=border(BORDER_THIN, BORDER_MEDIUM, BORDER_MEDIUM, BORDER_MEDIUM)),
+    }
+    for suffix, top in (("", BORDER_THIN), ("_first", BORDER_MEDIUM)):
+        styles[f"cal_date_c{suffix}"] = dict(
+            font=FONT_DATE, alignment=ALIGN_LEFT, fill=GRAY_FILL,
+            border=border(BORDER_MEDIUM, BORDER_MEDIUM, top, BORDER_THIN))
+        styles[f"cal_date_d{suffix}"] = dict(fill=GRAY_FILL, border=border(top=top, bottom=BORDER_THIN))
+        styles[f"cal_date_e{suffix}"] = dict(
+            fill=GRAY_FILL, border=border(right=BORDER_MEDIUM, top=top, bottom=BORDER_THIN))
+    for suffix, bottom in (("", BORDER_THIN), ("_last", BORDER_MEDIUM)):
+        styles[f"cal_holiday_c{suffix}"] = dict(
+            font=FONT_HOLIDAY, alignment=ALIGN_LEFT, fill=NO_FILL,
+            border=border(BORDER_MEDIUM, BORDER_MEDIUM, BORDER_THIN, bottom))
+        styles[f"cal_holiday_d{suffix}"] = dict(border=border(top=BORDER_THIN, bottom=bottom))
+        styles[f"cal_holiday_e{suffix}"] = dict(border=border(right=BORDER_MEDIUM, top=BORDER_THIN, bottom=bottom))
+        row_borders = {
+            "c": border(BORDER_MEDIUM, BORDER_THIN, BORDER_THIN, bottom),
+            "d": border(BORDER_THIN, BORDER_THIN, BORDER_THIN, bottom),
+            "e": border(BORDER_THIN, BORDER_MEDIUM, BORDER_THIN, bottom),
+        }
+        for col, cell_border in row_borders.items():
+            styles[f"cal_blank_{col}{suffix}"] = dict(border=cell_border)
+            for tone, font_time, font_event in (("", FONT_TIME, FONT_EVENT), ("_red", FONT_TIME_RED, FONT_EVENT_RED)):
+                styles[f"cal_event_{col}{tone}{suffix}"] = dict(
+                    font=font_time if col == "c" else font_event,
+                    alignment=ALIGN_LEFT, fill=WHITE_FILL, border=cell_border)
+    return styles
+
+
+CELL_STYLES = _build_cell_styles()
@@ -1,49 +1,97 @@
 """Date and time utility functions."""
 from datetime import date, datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
 
 def parse_date(date_str) -> Optional[date]:
     """Парсинг даты. Защита от None, неверных типов и форматов."""
     if date_str is None or not isinstance(date_str, str):
         return None
+    return _parse_date_str(date_str)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(date_str: str) -> Optional[date]:
+    # Одни и те же даты повторяются у сотен событий: результат кэшируется.
     date_str = date_str.strip()
     if not date_str:
         return None
+    head = date_str[:10]
     try:
         if "-" in date_str:
-            return datetime.strptime(date_str[:10], "%Y-%m-%d").date()
+            # Быстрый путь: YYYY-MM-DD с фиксированными позициями, иначе strptime.
+            if head[4:5] == "-" and head[7:8] == "-" and _is_ascii_digits(head[:4] + head[5:7] + head[8:]):
+                return date(int(head[:4]), int(head[5:7]), int(head[8:]))
+            return datetime.strptime(head, "%Y-%m-%d").date()
         if "." in date_str:
-            return datetime.strptime(date_str[:10], "%d.%m.%Y").date()
+            if head[2:3] == "." and head[5:6] == "." and _is_ascii_digits(head[:2] + head[3:5] + head[6:]):
+                return date(int(head[6:]), int(head[3:5]), int(head[:2]))
+            return datetime.strptime(head, "%d.%m.%Y").date()
     except ValueError:
         pass
     return None
 
 
+def _is_ascii_digits(text: str) -> bool:
+    return len(text) == 8 and text.isascii() and text.isdigit()
+
+
+class ParsedTime(NamedTuple):
+    """Разобранное время события."""
+    sort_key: tuple[int, int]  # (часы, минуты); (99, 99) — время не распознано
+    time_24: str               # 24-часовой формат; нераспознанное время — как есть, в верхнем регистре
+
+
+_NO_TIME = ParsedTime((99, 99), "")
+
+
+def parse_time(time_str) -> ParsedTime:
+    """Разбор времени (в т.ч. AM/PM): ключ сортировки и строка в 24-часовом формате.
+
+    Различных значений времени немного, результат кэшируется.
+    """
+    if not time_str or not isinstance(time_str, str):
+        return _NO_TIME
+    return _parse_time_str(time_str)
+
+
+@lru_cache(maxsize=1024)
+def _parse_time_str(time_str: str) -> ParsedTime:
+    text = time_str.strip().upper()
+    if not text:
+        return _NO_TIME
+    is_pm = "PM" in text
+    is_am = "AM" in text
+    time_clean = text.replace("AM", "").replace("PM", "").strip() if is_pm or is_am else text
+
+    hours = minutes = None
+    if ":" in time_clean:
+        parts = time_clean.split(":")
+        try:
+            hours, minutes = int(parts[0]), int(parts[1])
+        except ValueError:
+            hours = minutes = None
+    if hours is None:
+        return ParsedTime((99, 99), text)
+
+    sort_hours = hours
+    if is_pm and hours != 12:
+        hours = sort_hours = hours + 12
+    elif is_am and hours == 12:
+        # "12 AM" — полночь. Строка с AM и PM одновременно сортируется как AM,
+        # а в 24-часовом виде остаётся 12 (как прежние parse_time_for_sort и convert_to_24h).
+        sort_hours = 0
+        if not is_pm:
+            hours = 0
+    # Время без AM/PM уже в 24-часовом формате и показывается как есть.
+    time_24 = f"{hours:02d}:{minutes:02d}" if is_pm or is_am else text
+    return ParsedTime((sort_hours, minutes), time_24)
+
+
 def parse_time_for_sort(time_str) -> tuple[int, int]:
     """Парсинг времени для сортировки. Защита от None и неверных типов."""
-    if time_str is None or not isinstance(time_str, str):
-        return (99, 99)
-    time_str = time_str.strip()
-    if not time_str:
-        return (99, 99)
-    time_str = time_str.upper()
-    is_pm = "PM" in time_str
-    is_am = "AM" in time_str
-    time_clean = time_str.replace("AM", "").replace("PM", "").strip()
-    try:
-        if ":" in time_clean:
-            parts = time_clean.split(":")
-            hours = int(parts[0])
-            minutes = int(parts[1]) if len(parts) > 1 else 0
-            if is_pm and hours != 12:
-                hours += 12
-            elif is_am and hours == 12:
-                hours = 0
-            return (hours, minutes)
-    except (ValueError, IndexError):
-        pass
-    return (99, 99)
+    return parse_time(time_str).sort_key
 
 
 def format_time_display(time_str) -> str:
@@ -53,6 +101,18 @@ def format_time_display(time_str) -> str:
     return time_str.strip()
 
 
+def convert_to_24h(time_str: str) -> str:
+    """Конвертация времени из AM/PM в 24-часовой формат."""
+    return parse_time(time_str).time_24
+
+
+# Таблицы для форматирования дат (строятся один раз).
+_DAYS_EN = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_MONTHS_EN = ("January", "February", "March", "April", "May", "June",
+              "July", "August", "September", "October", "November", "December")
+_TWO_DIGITS = tuple(f"{i:02d}" for i in range(32))
+
+
 def get_monday_of_week(d: date) -> date:
     """Получить понедельник недели."""
     return d - timedelta(days=d.weekday())
@@ -65,25 +125,22 @@ def get_week_dates(monday: date) -> list[date]:
 
 def format_date_ru(d: date) -> str:
     """Форматирование даты для русского языка."""
-    return f"{d.day:02d}.{d.month:02d}.{d.year}"
+    return f"{_TWO_DIGITS[d.day]}.{_TWO_DIGITS[d.month]}.{d.year}"
 
 
 def format_date_en(d: date) -> str:
     """Форматирование даты для английского языка."""
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    months = ["January", "February", "March", "April", "May", "June",
-              "July", "August", "September", "October", "November", "December"]
-    return f"{days[d.weekday()]} {months[d.month - 1]} {d.day} {d.year}"
+    return f"{_DAYS_EN[d.weekday()]} {_MONTHS_EN[d.month - 1]} {d.day} {d.year}"
 
 
 def format_sheet_name_ru(d: date) -> str:
     """Форматирование имени листа для русского языка."""
-    return f"Календарь {d.day:02d}.{d.month:02d}.{d.year}"
+    return f"Календарь {_TWO_DIGITS[d.day]}.{_TWO_DIGITS[d.month]}.{d.year}"
 
 
 def format_sheet_name_en(d: date) -> str:
     """Форматирование имени листа для английского языка."""
-    return f"Economic calendar_{d.day:02d}.{d.month:02d}.{str(d.year)[2:]}"
+    return f"Economic calendar_{_TWO_DIGITS[d.day]}.{_TWO_DIGITS[d.month]}.{str(d.year)[2:]}"
 
 
 def group_items_by_date(items: list[dict]) -> dict[date, list[dict]]:
@@ -98,31 +155,34 @@ def group_items_by_date(items: list[dict]) -> dict[date, list[dict]]:
     return grouped
 
 
-def choose_reference_monday(
-    events_by_date: dict[date, list[dict]],
-    holidays_by_date: dict[date, list[dict]],
-) -> date:
-    """Choose the most likely week to render, robust against outlier dates."""
+def count_items_by_week(*groups: dict[date, list]) -> dict[date, int]:
+    """Число элементов по неделям (понедельник -> количество); выходные не учитываются."""
     week_scores: dict[date, int] = {}
-
-    for d, items in events_by_date.items():
-        if d.weekday() >= 5:
-            continue
-        monday = get_monday_of_week(d)
-        week_scores[monday] = week_scores.get(monday, 0) + len(items)
-
-    for d, items in holidays_by_date.items():
-        if d.weekday() >= 5:
-            continue
-        monday = get_monday_of_week(d)
-        week_scores[monday] = week_scores.get(monday, 0) + len(items)
-
+    for items_by_date in groups:
+        for d, items in items_by_date.items():
+            if d.weekday() >= 5:
+                continue
+            monday = get_monday_of_week(d)
+            week_scores[monday] = week_scores.get(monday, 0) + len(items)
+    return week_scores
+
+
+def pick_reference_monday(week_scores: dict[date, int], today: Optional[date] = None) -> date:
+    """Неделя с наибольшим числом элементов; при равенстве — ближайшая к текущей."""
+    today_monday = get_monday_of_week(today or date.today())
     if not week_scores:
-        return get_monday_of_week(date.today())
+        return today_monday
 
-    today_monday = get_monday_of_week(date.today())
     best_monday, _score = max(
         week_scores.items(),
         key=lambda kv: (kv[1], -abs((kv[0] - today_monday).days)),
     )
     return best_monday
+
+
+def choose_reference_monday(
+    events_by_date: dict[date, list[dict]],
+    holidays_by_date: dict[date, list[dict]],
+) -> date:
+    """Choose the most likely week to render, robust against outlier dates."""
+    return pick_reference_monday(count_items_by_week(events_by_date, holidays_by_date))
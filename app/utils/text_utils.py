@@ -1,5 +1,6 @@
 """Text processing utility functions."""
 import re
+from functools import lru_cache
 
 from app.utils.constants import (
     MONTH_EN_TO_RU_GENITIVE,
@@ -8,13 +9,24 @@ from app.utils.constants import (
 )
 
 
+_CYRILLIC = re.compile('[\u0400-\u04FF]')
+_CELL_WHITESPACE = re.compile('[\n\r\t]')
+_CELL_WHITESPACE_TABLE = str.maketrans('\n\r\t', '   ')
+_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
 def sanitize_text(text) -> str:
-    """Санитизация текста для защиты от Excel formula injection."""
+    """Санитизация текста для защиты от Excel formula injection.
+
+    Текст без изменений возвращается тем же объектом (значения, вычисленные
+    при приёме, не занимают лишней памяти).
+    """
     if text is None or not isinstance(text, str):
         return ""
     text = text.strip()
-    text = text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-    if text and text[0] in ('=', '+', '-', '@'):
+    if _CELL_WHITESPACE.search(text):
+        text = text.translate(_CELL_WHITESPACE_TABLE)
+    if text.startswith(_FORMULA_PREFIXES):
         text = "'" + text
     return text
 
@@ -23,7 +35,15 @@ def has_cyrillic(text: str) -> bool:
     """Проверяет, содержит ли текст кириллицу."""
     if not text or not isinstance(text, str):
         return False
-    return any('\u0400' <= char <= '\u04FF' for char in text)
+    return _CYRILLIC.search(text) is not None
+
+
+# Суффикс периода в конце события: MONTH/DAY (JAN/23), MONTH (NOV) или квартал (Q1).
+_PERIOD_SUFFIX = re.compile(
+    r'\s+(?:(?P<month>JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)(?:/(?P<day>\d{1,2}))?'
+    r'|(?P<quarter>Q[1-4]))$',
+    re.IGNORECASE,
+)
 
 
 def convert_month_suffix_to_ru(event_text: str) -> str:
@@ -36,32 +56,24 @@ def convert_month_suffix_to_ru(event_text: str) -> str:
     """
     if not event_text or not isinstance(event_text, str):
         return event_text or ""
-    
+    return _convert_period_suffix(event_text)
+
+
+@lru_cache(maxsize=4096)
+def _convert_period_suffix(event_text: str) -> str:
+    # Названия событий повторяются каждую неделю: результат кэшируется.
     text = event_text.strip()
-    
-    # Паттерн: MONTH/DAY в конце (например JAN/23, FEB/14)
-    match_month_day = re.search(r'\s+(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)/(\d{1,2})$', text, re.IGNORECASE)
-    if match_month_day:
-        month_en = match_month_day.group(1).upper()
-        day = match_month_day.group(2)
-        month_ru = MONTH_EN_TO_RU_GENITIVE.get(month_en, month_en)
-        text = text[:match_month_day.start()].rstrip()
-        return f"{text}, {day} {month_ru}"
-    
-    # Паттерн: только MONTH в конце (например NOV, DEC)
-    match_month = re.search(r'\s+(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)$', text, re.IGNORECASE)
-    if match_month:
-        month_en = match_month.group(1).upper()
-        month_ru = MONTH_EN_TO_RU_NOMINATIVE.get(month_en, month_en)
-        text = text[:match_month.start()].rstrip()
-        return f"{text}, {month_ru}"
-    
-    # Паттерн: квартал Q1-Q4 в конце
-    match_quarter = re.search(r'\s+(Q[1-4])$', text, re.IGNORECASE)
-    if match_quarter:
-        quarter_en = match_quarter.group(1).upper()
-        quarter_ru = QUARTER_EN_TO_RU.get(quarter_en, quarter_en)
-        text = text[:match_quarter.start()].rstrip()
-        return f"{text}, {quarter_ru}"
-    
-    return event_text
+    match = _PERIOD_SUFFIX.search(text)
+    if match is None:
+        return event_text
+
+    head = text[:match.start()].rstrip()
+    quarter = match.group("quarter")
+    if quarter:
+        quarter = quarter.upper()
+        return f"{head}, {QUARTER_EN_TO_RU.get(quarter, quarter)}"
+    month_en = match.group("month").upper()
+    day = match.group("day")
+    if day:
+        return f"{head}, {day} {MONTH_EN_TO_RU_GENITIVE.get(month_en, month_en)}"
+    return f"{head}, {MONTH_EN_TO_RU_NOMINATIVE.get(month_en, month_en)}"
@@ -0,0 +1,52 @@
+"""Память на событие: dict из model_dump() против EventRecord (tracemalloc).
+
+    python -m benchmarks.bench_event_memory [--events 5000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Callable
+
+from app.models.schemas import EventsPayload
+from app.services.event_record import EventRecord
+from benchmarks.events import make_events
+
+
+def retained_bytes(body: str, convert: Callable[[list[dict]], list]) -> tuple[int, list]:
+    """Память, которая остаётся занятой после разбора тела и преобразования событий."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        payload = EventsPayload.model_validate_json(body)
+        dumped = [event.model_dump() for event in payload.events]
+        kept = convert(dumped)
+        del payload, dumped
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0], kept
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    body = json.dumps({"events": events}, ensure_ascii=False)
+    # Прогрев кэшей разбора дат/времени: они общие для всех записей.
+    [EventRecord.from_dict(event) for event in events]
+
+    as_dicts, kept = retained_bytes(body, lambda items: items)
+    del kept
+    as_records, kept = retained_bytes(body, lambda items: [EventRecord.from_dict(item) for item in items])
+    del kept
+
+    n = len(events)
+    print(f"model_dump() dicts: {as_dicts / n:.0f} B/event")
+    print(f"EventRecord:        {as_records / n:.0f} B/event ({100 * (1 - as_records / as_dicts):.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Excel за период: время построения листов (в пуле) и сборки книги (в процессе сервера).
+
+    python -m benchmarks.bench_excel_range [--weeks 13] [--events 1000] [--engine standard]
+
+Листы строятся последовательно в одном процессе: сумма их времени — работа,
+которую пул генерации делит между воркерами; сборка выполняется после них.
+"""
+import argparse
+import pickle
+import time
+from datetime import timedelta
+
+from app.services.calendar_index import build_calendar_index
+from app.services.calendar_service import split_records, to_records
+from app.services.excel_service import assemble_sheet_parts, render_week_sheet, week_mondays, week_sheet_jobs
+from benchmarks.events import MONDAY, make_events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=13)
+    parser.add_argument("--events", type=int, default=1000, help="событий в неделе")
+    parser.add_argument("--engine", default="standard")
+    args = parser.parse_args()
+
+    events = []
+    for week in range(args.weeks):
+        for event in make_events(args.events, MONDAY + timedelta(weeks=week), seed=week):
+            event["Key"] = f"{week}-{event['Key']}"
+            events.append(event)
+    work_en, work_ru, holidays_en, holidays_ru = split_records(to_records(events))
+    store = {"work_en": work_en, "work_ru": work_ru, "holidays_en": holidays_en, "holidays_ru": holidays_ru}
+    index = build_calendar_index(store, today=MONDAY)
+    jobs = week_sheet_jobs(index, week_mondays(MONDAY, MONDAY + timedelta(weeks=args.weeks - 1)), args.engine)
+
+    start = time.perf_counter()
+    parts = [render_week_sheet(**job) for job in jobs]
+    rendered = time.perf_counter()
+    workbook = assemble_sheet_parts(parts)
+    assembled = time.perf_counter()
+
+    print(f"{len(jobs)} sheets, {args.engine} engine")
+    print(f"sheets (pool):      {(rendered - start) * 1000:.0f} ms total, "
+          f"{(rendered - start) * 1000 / len(jobs):.0f} ms per sheet")
+    print(f"assembly (server):  {(assembled - rendered) * 1000:.0f} ms")
+    print(f"pool -> server:     {len(pickle.dumps(parts)) / 1e6:.2f} MB pickled")
+    print(f"workbook:           {len(workbook.getvalue()) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
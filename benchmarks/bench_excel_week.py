@@ -0,0 +1,39 @@
+"""Время генерации Excel за неделю с 1 000 событий (оба движка).
+
+    python -m benchmarks.bench_excel_week [--events 1000] [--runs 7]
+"""
+import argparse
+import statistics
+import time
+
+from app.services.calendar_index import build_calendar_index
+from app.services.calendar_service import split_records, to_records
+from app.services.excel_service import generate_excel
+from benchmarks.events import MONDAY, make_events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    work_en, work_ru, holidays_en, holidays_ru = split_records(to_records(make_events(args.events)))
+    store = {"work_en": work_en, "work_ru": work_ru, "holidays_en": holidays_en, "holidays_ru": holidays_ru}
+    week = build_calendar_index(store, today=MONDAY).for_week(MONDAY)
+
+    for engine in ("standard", "streaming"):
+        generate_excel(week, engine=engine, monday=MONDAY)  # прогрев кэшей
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            generate_excel(week, engine=engine, monday=MONDAY)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{engine:<10} {args.events} events, {args.runs} runs: "
+            f"median {statistics.median(timings) * 1000:.0f} ms, min {min(timings) * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
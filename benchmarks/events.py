@@ -0,0 +1,42 @@
+"""Синтетические события календаря для бенчмарков (воспроизводимые по seed)."""
+import random
+from datetime import date, timedelta
+
+MONDAY = date(2026, 10, 12)
+
+_EVENTS_EN = [
+    "Initial Jobless Claims", "Nonfarm Payrolls", "Unemployment Rate", "GDP Growth Rate QoQ Q3",
+    "Interest Rate Decision", "CPI YoY SEP", "Crude Oil Inventories OCT/23", "Retail Sales MoM",
+]
+_EVENTS_RU = [
+    "Первичные заявки на пособие", "Изменение числа занятых вне с/х сектора", "Уровень безработицы",
+    "ВВП (кв/кв) Q3", "Решение по ключевой ставке", "ИПЦ (г/г) SEP", "Розничные продажи",
+]
+_COUNTRIES = ["US", "GB", "EU", "DE", "JP", "CN", "CH", "AU"]
+_TIMES = ["8:30 AM", "10:00 AM", "2:00 PM", "12:30 PM", "12:00 AM", "", "Tentative", "3:45 PM", "09:15"]
+
+
+def make_events(n: int, monday: date = MONDAY, seed: int = 1) -> list[dict]:
+    """``n`` событий недели ``monday`` (поровну RU/EN) и несколько праздников."""
+    rnd = random.Random(seed)
+    events = []
+    for i in range(n):
+        day = monday + timedelta(days=rnd.randint(0, 4))
+        names = _EVENTS_EN if i % 2 else _EVENTS_RU
+        events.append({
+            "date": day.isoformat() if rnd.random() < 0.7 else day.strftime("%d.%m.%Y"),
+            "time": rnd.choice(_TIMES),
+            "country": rnd.choice(_COUNTRIES),
+            "event": rnd.choice(names),
+            "holiday": None,
+            "Key": i,
+            "source_id": f"s{i % 3}",
+        })
+    for i, (offset, country, name) in enumerate([
+        (2, "US", "Columbus Day"), (2, "CH", "Columbus Day"), (3, "JP", "День труда"),
+    ]):
+        events.append({
+            "date": (monday + timedelta(days=offset)).isoformat(), "time": "", "country": country,
+            "event": None, "holiday": name, "Key": f"h{i}", "source_id": None,
+        })
+    return events
@@ -0,0 +1,25 @@
+"""Общие настройки тестов: данные во временном каталоге, шаблоны из репозитория."""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# До импорта app: config читает окружение при импорте.
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="calendar-tests-"))
+os.environ.setdefault("WORD_TEMPLATE_PATH", str(BASE_DIR / "Template.docx"))
+os.environ.setdefault("QUOTES_TEMPLATE_PATH", str(BASE_DIR / "Template_quotes.docx"))
+os.environ.setdefault("PERSIST_STATE", "0")
+os.environ.setdefault("RENDER_EXECUTOR", "thread")
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
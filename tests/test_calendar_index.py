@@ -0,0 +1,56 @@
+from datetime import date
+
+from app.services.calendar_index import build_calendar_index
+from app.services.calendar_service import to_records
+
+MON, TUE, WED = date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)
+
+
+def _store(work_en: list) -> dict:
+    return {"work_en": work_en, "work_ru": [], "holidays_en": [], "holidays_ru": []}
+
+
+def _records() -> list:
+    return to_records([
+        {"date": "02.03.2026", "time": "10:00", "country": "US", "event": "GDP q/q", "Key": 1},
+        {"date": "03.03.2026", "time": "11:00", "country": "US", "event": "CPI", "Key": 2},
+        {"date": "03.03.2026", "time": "09:00", "country": "US", "event": "PPI", "Key": 3},
+        {"date": "04.03.2026", "time": "12:00", "country": "US", "event": "PMI", "Key": 4},
+    ])
+
+
+def test_replacing_one_record_regroups_only_its_day():
+    records = _records()
+    before = build_calendar_index(_store(records), today=MON)
+
+    changed = to_records([{"date": "03.03.2026", "time": "08:00", "country": "US", "event": "CPI y/y", "Key": 2}])[0]
+    # Копия списка со ссылками на те же события, как при upsert.
+    after = build_calendar_index(_store([changed if r is records[1] else r for r in records]), today=MON)
+
+    assert after.day("en", MON).events is before.day("en", MON).events
+    assert after.day("en", WED).events is before.day("en", WED).events
+    assert [ev.event for ev in after.day("en", TUE).events] == ["CPI y/y", "PPI"]
+    assert [ev.event for ev in before.day("en", TUE).events] == ["PPI", "CPI"]
+
+
+def test_moving_a_record_regroups_both_days():
+    records = _records()
+    before = build_calendar_index(_store(records), today=MON)
+
+    moved = to_records([{"date": "02.03.2026", "time": "12:00", "country": "US", "event": "PMI", "Key": 4}])[0]
+    after = build_calendar_index(_store([*records[:3], moved]), today=MON)
+
+    assert WED not in after.days["en"]
+    assert [ev.event for ev in after.day("en", MON).events] == ["GDP q/q", "PMI"]
+    assert after.day("en", TUE).events is before.day("en", TUE).events
+
+
+def test_removing_a_record_and_unchanged_list():
+    records = _records()
+    first = build_calendar_index(_store(records), today=MON)
+    same = build_calendar_index(_store(records), today=MON)
+    assert all(same.day("en", d).events is first.day("en", d).events for d in (MON, TUE, WED))
+
+    after = build_calendar_index(_store(records[1:]), today=MON)
+    assert MON not in after.days["en"]
+    assert after.day("en", TUE).events is first.day("en", TUE).events
@@ -0,0 +1,74 @@
+import pytest
+
+from app.utils.date_utils import convert_to_24h, parse_time, parse_time_for_sort
+
+
+# Прежние раздельные реализации (до общего разбора parse_time) — эталон поведения.
+def _baseline_sort_key(time_str) -> tuple[int, int]:
+    if time_str is None or not isinstance(time_str, str):
+        return (99, 99)
+    time_str = time_str.strip()
+    if not time_str:
+        return (99, 99)
+    time_str = time_str.upper()
+    is_pm = "PM" in time_str
+    is_am = "AM" in time_str
+    time_clean = time_str.replace("AM", "").replace("PM", "").strip()
+    try:
+        if ":" in time_clean:
+            parts = time_clean.split(":")
+            hours = int(parts[0])
+            minutes = int(parts[1]) if len(parts) > 1 else 0
+            if is_pm and hours != 12:
+                hours += 12
+            elif is_am and hours == 12:
+                hours = 0
+            return (hours, minutes)
+    except (ValueError, IndexError):
+        pass
+    return (99, 99)
+
+
+def _baseline_convert_to_24h(time_str) -> str:
+    if not time_str or not isinstance(time_str, str):
+        return ""
+    time_str = time_str.strip().upper()
+    if not time_str:
+        return ""
+    if "AM" not in time_str and "PM" not in time_str:
+        return time_str
+    is_pm = "PM" in time_str
+    time_clean = time_str.replace("AM", "").replace("PM", "").strip()
+    try:
+        if ":" in time_clean:
+            parts = time_clean.split(":")
+            hours = int(parts[0])
+            minutes = int(parts[1]) if len(parts) > 1 else 0
+            if is_pm and hours != 12:
+                hours += 12
+            elif not is_pm and hours == 12:
+                hours = 0
+            return f"{hours:02d}:{minutes:02d}"
+    except (ValueError, IndexError):
+        pass
+    return time_str
+
+
+TIMES = [
+    "", "   ", None, 930, "9:00", "09:15", "12:00", "12:00 AM", "12:30 PM", "8:30 am", " 3:45 pm ",
+    "11:59 PM", "Tentative", "All Day", "9:", "25", "ab:cd", "xx PM", "12:00 AM PM", "1:00 PM AM",
+]
+
+
+@pytest.mark.parametrize("time_str", TIMES)
+def test_parse_time_matches_previous_functions(time_str):
+    parsed = parse_time(time_str)
+    assert parsed.sort_key == _baseline_sort_key(time_str)
+    assert parsed.time_24 == _baseline_convert_to_24h(time_str)
+    assert parse_time_for_sort(time_str) == parsed.sort_key
+    assert convert_to_24h(time_str) == parsed.time_24
+
+
+def test_times_sort_in_day_order():
+    ordered = sorted(["2:00 PM", "", "12:00 AM", "9:00", "12:30 PM", "8:30 am"], key=parse_time_for_sort)
+    assert ordered == ["12:00 AM", "8:30 am", "9:00", "12:30 PM", "2:00 PM", ""]
@@ -0,0 +1,48 @@
+import zipfile
+from io import BytesIO
+
+from docx import Document
+
+from app.services.docx_writer import _raw_member, save_docx
+from tests.conftest import BASE_DIR
+
+
+def _members(data: bytes) -> dict[str, zipfile.ZipInfo]:
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        return {info.filename: info for info in zf.infolist()}
+
+
+def _raw(data: bytes, info: zipfile.ZipInfo) -> bytes:
+    """Сжатые байты члена архива, как они лежат в файле."""
+    return _raw_member(BytesIO(data), info)
+
+
+def test_unchanged_members_are_copied_and_changed_part_rewritten():
+    template = (BASE_DIR / "Template.docx").read_bytes()
+    doc = Document(BytesIO(template))
+    doc.add_paragraph("rendered")
+
+    out = save_docx(doc, template, ["/word/document.xml"]).getvalue()
+
+    with zipfile.ZipFile(BytesIO(out)) as zf:
+        assert zf.testzip() is None
+    before, after = _members(template), _members(out)
+    assert list(after) == list(before)
+    for name, info in before.items():
+        if name == "word/document.xml":
+            continue
+        assert after[name].compress_type == info.compress_type
+        assert after[name].CRC == info.CRC
+        assert _raw(out, after[name]) == _raw(template, info)
+
+    assert Document(BytesIO(out)).paragraphs[-1].text == "rendered"
+
+
+def test_falls_back_to_full_save_when_parts_differ():
+    template = (BASE_DIR / "Template.docx").read_bytes()
+    doc = Document(BytesIO(template))
+    doc.add_paragraph("rendered")
+
+    out = save_docx(doc, template, ["/word/not-in-template.xml"]).getvalue()
+
+    assert Document(BytesIO(out)).paragraphs[-1].text == "rendered"
@@ -0,0 +1,58 @@
+from datetime import date
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.calendar_index import build_calendar_index
+from app.services.calendar_service import split_records, to_records
+from app.services.excel_service import (
+    assemble_sheet_parts,
+    assemble_workbook,
+    build_week_sheet,
+    render_week_sheet,
+    week_mondays,
+    week_sheet_jobs,
+)
+
+MONDAY = date(2026, 3, 2)
+
+
+def _index():
+    events = [
+        {"date": "02.03.2026", "time": "10:00", "country": "US", "event": "GDP q/q"},
+        {"date": "03.03.2026", "time": "", "country": "DE", "holiday": "Holiday"},
+        {"date": "10.03.2026", "time": "8:30 AM", "country": "GB", "event": "ВВП (кв/кв)"},
+        {"date": "12.03.2026", "time": "12:00", "country": "EU", "event": "Interest Rate Decision"},
+    ]
+    work_en, work_ru, holidays_en, holidays_ru = split_records(to_records(events))
+    store = {"work_en": work_en, "work_ru": work_ru, "holidays_en": holidays_en, "holidays_ru": holidays_ru}
+    return build_calendar_index(store, today=MONDAY)
+
+
+def _read_back(data: bytes) -> list:
+    wb = load_workbook(BytesIO(data))
+    result = []
+    for ws in wb.worksheets:
+        widths = {key: dim.width for key, dim in ws.column_dimensions.items()}
+        result.append((ws.title, sorted(map(str, ws.merged_cells.ranges)), widths))
+        for row in ws.iter_rows():
+            for cell in row:
+                result.append((
+                    cell.coordinate, cell.value, cell.style,
+                    repr(cell.font), repr(cell.fill), repr(cell.border), repr(cell.alignment),
+                ))
+    return result
+
+
+@pytest.mark.parametrize("engine", ["standard", "streaming"])
+def test_sheets_rendered_separately_match_single_workbook(engine):
+    index = _index()
+    jobs = week_sheet_jobs(index, week_mondays(MONDAY, date(2026, 3, 13)), engine)
+    assert len(jobs) == 4
+
+    merged = assemble_sheet_parts([render_week_sheet(**job) for job in jobs]).getvalue()
+    layouts = [build_week_sheet(job["days"], job["lang"], job["monday"]) for job in jobs]
+    single = assemble_workbook(layouts, engine).getvalue()
+
+    assert _read_back(merged) == _read_back(single)
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from app.services import highlight_rules
+from app.services.highlight_rules import (
+    MAX_PATTERN_LENGTH,
+    HighlightEngine,
+    get_highlight_engine,
+    parse_rules,
+    refresh_highlight_rules,
+)
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    """Файл правил во временном каталоге; текущий движок восстанавливается после теста."""
+    path = tmp_path / "highlight_rules.json"
+    monkeypatch.setattr(highlight_rules, "HIGHLIGHT_RULES_PATH", path)
+    monkeypatch.setattr(highlight_rules, "_engine", highlight_rules._engine)
+    monkeypatch.setattr(highlight_rules, "_engine_stat", highlight_rules._file_stat(path))
+    return path
+
+
+def test_rules_are_joined_into_one_pattern_per_country():
+    engine = HighlightEngine(parse_rules([
+        {"lang": "en", "pattern": "GDP"},
+        {"lang": "en", "pattern": r"\binterest\s+rate\b", "kind": "regex"},
+        {"lang": "en", "pattern": "payrolls", "countries": ["us"]},
+    ]))
+    assert engine.matches("Q3 gdp growth", "en", "DE")
+    assert engine.matches("Interest  Rate Decision", "en", "JP")
+    assert engine.matches("Nonfarm Payrolls", "en", "US")
+    assert not engine.matches("Nonfarm Payrolls", "en", "CA")
+    assert not engine.matches("GDP", "ru", "US")
+
+
+@pytest.mark.parametrize("pattern", [
+    "(?i)rate",                # глобальный флаг не в начале общего выражения
+    r"(?P<x>rate)",            # именованная группа (повтор в другом правиле — ошибка)
+    r"(rate)\s+\1",            # ссылка на группу сдвинулась бы при объединении
+    "(rate)",
+    "rate)|(?:x",              # выход за пределы своей группы
+])
+def test_regex_that_does_not_combine_is_rejected(pattern):
+    items = [{"lang": "en", "pattern": "gdp", "kind": "regex"}, {"lang": "en", "pattern": pattern, "kind": "regex"}]
+    with pytest.raises(ValueError, match="Rule 1"):
+        parse_rules(items)
+
+
+def test_same_named_group_in_two_rules_is_rejected():
+    items = [{"lang": "en", "pattern": r"(?P<x>a)", "kind": "regex"}, {"lang": "en", "pattern": r"(?P<x>b)", "kind": "regex"}]
+    with pytest.raises(ValueError):
+        parse_rules(items)
+
+
+def test_pattern_length_is_capped():
+    parse_rules([{"lang": "en", "pattern": "a" * MAX_PATTERN_LENGTH}])
+    with pytest.raises(ValueError, match="longer than"):
+        parse_rules([{"lang": "en", "pattern": "a" * (MAX_PATTERN_LENGTH + 1)}])
+
+
+def test_engine_that_does_not_compile_raises_value_error():
+    rules = (
+        highlight_rules.HighlightRule("en", "gdp", "regex"),
+        highlight_rules.HighlightRule("en", "(?i)rate", "regex"),
+    )
+    with pytest.raises(ValueError, match="lang='en'"):
+        HighlightEngine(rules)
+
+
+def test_bad_rules_file_keeps_previous_engine(rules_file):
+    previous = get_highlight_engine()
+    rules_file.write_text(json.dumps({"rules": [
+        {"lang": "en", "pattern": "gdp", "kind": "regex"},
+        {"lang": "en", "pattern": "(?i)rate", "kind": "regex"},
+    ]}), encoding="utf-8")
+    assert refresh_highlight_rules() is previous
+
+    rules_file.write_text(json.dumps({"rules": [{"lang": "en", "pattern": "cpi"}]}), encoding="utf-8")
+    engine = refresh_highlight_rules()
+    assert engine is not previous
+    assert engine.matches("CPI y/y", "en", "US")
+
+
+def test_put_rules_that_do_not_combine_returns_400(client, rules_file):
+    previous = get_highlight_engine()
+    response = client.put("/api/calendar/highlight-rules", json={"rules": [
+        {"lang": "en", "pattern": r"(?P<x>a)", "kind": "regex"},
+        {"lang": "en", "pattern": r"(?P<x>b)", "kind": "regex"},
+    ]})
+    assert response.status_code == 400
+    assert not rules_file.exists()
+    assert get_highlight_engine() is previous
+
+    response = client.put("/api/calendar/highlight-rules", json={"rules": [{"lang": "en", "pattern": "gdp"}]})
+    assert response.status_code == 200
+    assert json.loads(rules_file.read_text(encoding="utf-8"))["rules"][0]["pattern"] == "gdp"
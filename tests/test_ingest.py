@@ -0,0 +1,131 @@
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.api.v1.ingest import JsonArrayStream, iter_validated_batches
+from app.models.schemas import CalendarEvent, EventsPayload
+
+LIMIT = 2000
+BATCH_SIZE = 2
+
+_ADAPTER = TypeAdapter(list[CalendarEvent])
+
+
+def _fallback(body: bytes) -> list[CalendarEvent]:
+    return EventsPayload.model_validate_json(body).events
+
+
+_app = FastAPI()
+
+
+@_app.post("/receive")
+async def _receive(request: Request):
+    batches = []
+    async for batch in iter_validated_batches(
+        request, _ADAPTER, root_key="events", fallback=_fallback, batch_size=BATCH_SIZE, limit=LIMIT,
+    ):
+        batches.append([event.event for event in batch])
+    return {"batches": batches}
+
+
+@pytest.fixture(scope="module")
+def ingest_client():
+    return TestClient(_app)
+
+
+def _events(n: int) -> list[dict]:
+    return [{"date": "02.03.2026", "country": "US", "event": f"e{i}"} for i in range(n)]
+
+
+def _chunks(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+@pytest.mark.parametrize("body", [
+    lambda events: json.dumps(events),
+    lambda events: json.dumps({"events": events, "meta": {"source": [1, 2]}}),
+    lambda events: json.dumps({"meta": 1, "events": events}),  # список не первым ключом — fallback
+])
+def test_json_bodies_are_read_in_batches(ingest_client, body):
+    response = ingest_client.post("/receive", content=_chunks(body(_events(5)).encode()))
+    assert response.status_code == 200
+    events = [name for batch in response.json()["batches"] for name in batch]
+    assert events == [f"e{i}" for i in range(5)]
+
+
+def test_ndjson_body_is_read_in_batches(ingest_client):
+    body = "\n".join(json.dumps(e) for e in _events(5)) + "\n"
+    response = ingest_client.post("/receive", content=_chunks(body.encode()), headers=NDJSON)
+    assert response.status_code == 200
+    assert response.json()["batches"] == [["e0", "e1"], ["e2", "e3"], ["e4"]]
+
+
+def test_invalid_item_is_reported_with_its_index_in_the_body(ingest_client):
+    events = _events(5)
+    del events[3]["country"]
+
+    response = ingest_client.post("/receive", content=json.dumps({"events": events}))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "events", 3, "country"]
+
+    response = ingest_client.post("/receive", content=json.dumps(events))
+    assert response.json()["detail"][0]["loc"] == ["body", 3, "country"]
+
+    body = "\n".join(json.dumps(e) for e in events)
+    response = ingest_client.post("/receive", content=body, headers=NDJSON)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 3, "country"]
+
+
+def test_malformed_json_is_422(ingest_client):
+    response = ingest_client.post("/receive", content=b'{"events": [{"date": "02.03.2026", "country": "US"}, {"date": ]}')
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+    body = json.dumps(_events(3)[0]) + "\n" + json.dumps(_events(3)[1]) + "\n{oops\n"
+    response = ingest_client.post("/receive", content=body, headers=NDJSON)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+    assert response.json()["detail"][0]["loc"] == ["body", 2]
+
+
+def test_body_over_the_limit_is_413(ingest_client):
+    body = json.dumps(_events(60)).encode()
+    assert len(body) > LIMIT
+
+    response = ingest_client.post("/receive", content=body)  # Content-Length больше лимита
+    assert response.status_code == 413
+
+    response = ingest_client.post("/receive", content=_chunks(body, 256))  # без Content-Length
+    assert response.status_code == 413
+
+    ndjson = "\n".join(json.dumps(e) for e in _events(60)).encode()
+    response = ingest_client.post("/receive", content=_chunks(ndjson, 256), headers=NDJSON)
+    assert response.status_code == 413
+
+
+def test_stream_reader_handles_any_chunk_boundary():
+    text = json.dumps({"events": [{"n": 12345, "s": "a,]}\\"}, 6789, [1, 2], "x"]})
+    for size in (1, 2, 3, 5, len(text)):
+        reader = JsonArrayStream("events")
+        items = []
+        for i in range(0, len(text), size):
+            items += reader.feed(text[i:i + size])
+        items += reader.feed("", final=True)
+        assert items == [{"n": 12345, "s": "a,]}\\"}, 6789, [1, 2], "x"]
+
+
+def test_calendar_receive_accepts_ndjson(client):
+    events = _events(3) + [{"date": "02.03.2026", "country": "RU", "event": "ВВП"}]
+    body = "\n".join(json.dumps(e, ensure_ascii=False) for e in events)
+    response = client.post("/api/calendar/receive", content=body.encode(), headers=NDJSON)
+    assert response.status_code == 200
+    assert response.json()["total_received"] == 4
+    assert response.json()["split"] == {"work_en": 3, "work_ru": 1, "holidays_en": 0, "holidays_ru": 0}
@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.quotes_store import QuoteHistory
+
+DAY = date(2026, 1, 5)
+
+
+def _quote(symbol: str, price: float):
+    return SimpleNamespace(symbol=symbol, old_price=None, new_price=price, pct_change=None)
+
+
+def _record(history: QuoteHistory, day_offset: int, price: float, symbol: str = "DXY") -> int:
+    return history.record(DAY + timedelta(days=day_offset), [_quote(symbol, price)])
+
+
+def _prices(history: QuoteHistory, symbol: str = "dxy") -> list[tuple[int, float]]:
+    return [((p.date - DAY).days, p.new_price) for p in history.points(symbol)]
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = QuoteHistory(tmp_path / "history.bin", capacity=4, max_symbols=8)
+    h.open()
+    yield h
+    h.close()
+
+
+def test_ring_buffer_keeps_the_latest_dates(history):
+    for i in range(7):
+        _record(history, i, 100.0 + i)
+    assert _prices(history) == [(3, 103.0), (4, 104.0), (5, 105.0), (6, 106.0)]
+
+    # Та же дата — замена; дата в середине — вытесняет самую старую.
+    _record(history, 5, 555.0)
+    _record(history, 10, 110.0)
+    assert _prices(history) == [(4, 104.0), (5, 555.0), (6, 106.0), (10, 110.0)]
+    _record(history, 8, 108.0)
+    assert _prices(history) == [(5, 555.0), (6, 106.0), (8, 108.0), (10, 110.0)]
+
+    # Старше всей хранимой истории — не записывается.
+    assert _record(history, 0, 1.0) == 0
+    assert [p.date for p in history.points("dxy", DAY + timedelta(days=6), DAY + timedelta(days=9))] == [
+        DAY + timedelta(days=6), DAY + timedelta(days=8),
+    ]
+
+
+def test_out_of_order_dates_are_sorted(history):
+    for offset in (3, 1, 2, 0):
+        _record(history, offset, float(offset))
+    assert _prices(history) == [(0, 0.0), (1, 1.0), (2, 2.0), (3, 3.0)]
+
+
+def test_reopen_keeps_history_and_rebuild_migrates_it(tmp_path):
+    path = tmp_path / "history.bin"
+    h = QuoteHistory(path, capacity=4, max_symbols=8)
+    for i in range(6):
+        _record(h, i, float(i))
+        _record(h, i, 10.0 * i, symbol="gold")
+    generation = h.generation()
+    h.close()
+
+    same = QuoteHistory(path, capacity=4, max_symbols=8)
+    assert _prices(same) == [(2, 2.0), (3, 3.0), (4, 4.0), (5, 5.0)]
+    assert same.generation() == generation
+    same.close()
+
+    smaller = QuoteHistory(path, capacity=2, max_symbols=4)
+    assert _prices(smaller) == [(4, 4.0), (5, 5.0)]
+    assert _prices(smaller, "gold") == [(4, 40.0), (5, 50.0)]
+    assert smaller.generation() > generation
+    smaller.close()
+
+    larger = QuoteHistory(path, capacity=8, max_symbols=8)
+    _record(larger, 6, 6.0)
+    assert _prices(larger) == [(4, 4.0), (5, 5.0), (6, 6.0)]
+    larger.close()
+
+
+def test_worker_follows_a_file_rebuilt_by_another_worker(tmp_path):
+    path = tmp_path / "history.bin"
+    old_worker = QuoteHistory(path, capacity=4, max_symbols=8)
+    _record(old_worker, 0, 1.0)
+    generation = old_worker.generation()
+
+    new_worker = QuoteHistory(path, capacity=8, max_symbols=8)
+    new_worker.open()  # перестраивает файл под новую ёмкость
+
+    _record(old_worker, 1, 2.0)
+    assert old_worker.capacity == 8
+    assert old_worker.generation() > generation
+    assert _prices(new_worker) == [(0, 1.0), (1, 2.0)]
+    assert _prices(old_worker) == [(0, 1.0), (1, 2.0)]
+    old_worker.close()
+    new_worker.close()
@@ -0,0 +1,116 @@
+import math
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.quotes_analytics import compute_analytics, get_quote_analytics
+from app.services.quotes_store import QuoteHistory
+
+DAY = date(2026, 3, 2)
+
+
+def _matrix(series: dict[str, list[tuple[int, float]]], capacity: int = 8):
+    """Матрицы дат и цен в раскладке _load: последнее наблюдение — в последней колонке."""
+    symbols = list(series)
+    dates = np.zeros((len(symbols), capacity))
+    prices = np.full((len(symbols), capacity), np.nan)
+    for row, points in enumerate(series.values()):
+        for col, (offset, price) in enumerate(points, start=capacity - len(points)):
+            dates[row, col] = (DAY + timedelta(days=offset)).toordinal()
+            prices[row, col] = price
+    return symbols, dates, prices
+
+
+def _rows(result) -> dict[str, dict]:
+    return {row["symbol"]: row for row in result["symbols"]}
+
+
+def test_weekly_return_uses_last_observation_at_least_a_week_old():
+    symbols, dates, prices = _matrix({
+        # Пропуски: наблюдения за 10 и 5 дней до последнего — берётся то, что за 10.
+        "gaps": [(0, 100.0), (5, 150.0), (10, 110.0)],
+        # Ровно 7 дней назад.
+        "exact": [(0, 50.0), (3, 60.0), (7, 55.0)],
+        # Ни одного наблюдения старше недели.
+        "short": [(0, 10.0), (6, 11.0)],
+        "single": [(3, 1.0)],
+        # Первая строка матрицы не должна «заимствовать» данные соседней строки.
+        "empty": [],
+    })
+    rows = _rows(compute_analytics(symbols, dates, prices, window=20, top=5))
+
+    assert rows["gaps"]["weekly_return_pct"] == pytest.approx(10.0)
+    assert rows["exact"]["weekly_return_pct"] == pytest.approx(10.0)
+    assert rows["short"]["weekly_return_pct"] is None
+    assert rows["single"]["weekly_return_pct"] is None
+    assert rows["empty"]["weekly_return_pct"] is None
+    assert rows["gaps"]["daily_return_pct"] == pytest.approx((110.0 / 150.0 - 1) * 100)
+    assert rows["empty"]["observations"] == 0 and rows["empty"]["last_date"] is None
+
+
+def test_missing_prices_do_not_produce_returns():
+    symbols, dates, prices = _matrix({
+        "a": [(0, 100.0), (8, math.nan), (9, 0.0), (10, 5.0)],
+        "b": [(0, math.nan), (8, 5.0)],
+    })
+    rows = _rows(compute_analytics(symbols, dates, prices, window=20, top=5))
+    assert rows["a"]["daily_return_pct"] is None          # к нулевой цене
+    assert rows["a"]["weekly_return_pct"] == pytest.approx(-95.0)
+    assert rows["a"]["min"] == 0.0 and rows["a"]["max"] == 100.0
+    assert rows["a"]["observations"] == 4
+    assert rows["b"]["weekly_return_pct"] is None         # у наблюдения недельной давности нет цены
+
+
+def test_volatility_window_and_movers():
+    symbols, dates, prices = _matrix({
+        "up": [(0, 100.0), (1, 110.0), (2, 121.0)],
+        "down": [(0, 100.0), (1, 90.0), (2, 45.0)],
+        "flat": [(0, 10.0), (1, 10.0), (2, 10.0)],
+    })
+    result = compute_analytics(symbols, dates, prices, window=3, top=1)
+    rows = _rows(result)
+    assert rows["up"]["volatility_pct"] == pytest.approx(0.0, abs=1e-9)
+    assert rows["down"]["volatility_pct"] == pytest.approx(np.std([-10.0, -50.0], ddof=1))
+    assert result["movers"]["daily"] == {
+        "gainers": [{"symbol": "up", "return_pct": pytest.approx(10.0)}],
+        "losers": [{"symbol": "down", "return_pct": pytest.approx(-50.0)}],
+    }
+
+    # Окно из двух наблюдений: одна доходность — волатильность не определена.
+    rows = _rows(compute_analytics(symbols, dates, prices, window=2, top=1))
+    assert rows["down"]["volatility_pct"] is None
+    assert rows["down"]["min"] == 45.0 and rows["down"]["max"] == 90.0
+
+
+def test_results_are_cached_per_history_generation(tmp_path):
+    history = QuoteHistory(tmp_path / "history.bin", capacity=16, max_symbols=4)
+    quote = lambda price: SimpleNamespace(symbol="DXY", old_price=None, new_price=price, pct_change=None)
+    for offset, price in ((0, 100.0), (3, 101.0), (8, 110.0)):
+        history.record(DAY + timedelta(days=offset), [quote(price)])
+
+    first = get_quote_analytics(window=5, top=3, history=history)
+    assert get_quote_analytics(window=5, top=3, history=history) is first
+    assert first["symbols"][0]["weekly_return_pct"] == pytest.approx(10.0)
+
+    history.record(DAY + timedelta(days=9), [quote(121.0)])
+    second = get_quote_analytics(window=5, top=3, history=history)
+    assert second["generation"] == first["generation"] + 1
+    assert second["symbols"][0]["daily_return_pct"] == pytest.approx(10.0)
+    history.close()
+
+
+def test_analytics_endpoint(client):
+    for day, price in (("2026-03-02", 100), ("2026-03-09", 104)):
+        response = client.post("/api/quotes/receive", json={"quotes": [
+            {"symbol": "Brent", "new_price": price, "report_date": day},
+        ]})
+        assert response.status_code == 200
+
+    response = client.get("/api/quotes/analytics", params={"window": 5, "top": 1})
+    assert response.status_code == 200
+    row = _rows(response.json())["brent"]
+    assert row["last_date"] == "2026-03-09"
+    assert row["weekly_return_pct"] == pytest.approx(4.0)
+    assert client.get("/api/quotes/analytics", params={"window": 1}).status_code == 422
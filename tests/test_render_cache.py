@@ -0,0 +1,70 @@
+from app.api.v1.responses import etag_matches
+from app.services.render_cache import RenderCache, RenderedFile, make_etag
+
+
+def _item(size: int, tag: str = "x") -> RenderedFile:
+    return RenderedFile(content=b"0" * size, media_type="application/octet-stream", filename="f", etag=make_etag(tag))
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = RenderCache(max_entries=2, max_bytes=1000)
+    cache.put("a", _item(10))
+    cache.put("b", _item(10))
+    assert cache.get("a") is not None  # "b" становится самым старым
+    cache.put("c", _item(10))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_is_bounded_by_total_size():
+    cache = RenderCache(max_entries=10, max_bytes=100)
+    cache.put("a", _item(60))
+    cache.put("b", _item(60))
+    cache.put("huge", _item(101))  # больше лимита целиком: не кэшируется
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["size_bytes"] == 60
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("huge") is None
+
+
+def test_replacing_a_key_keeps_size_accounting():
+    cache = RenderCache(max_entries=10, max_bytes=100)
+    cache.put("a", _item(60))
+    cache.put("a", _item(30))
+
+    assert cache.stats()["size_bytes"] == 30
+    assert cache.stats()["entries"] == 1
+
+
+def test_etag_matches_weak_and_lists():
+    etag = make_etag(("xlsx", 1))
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_generate_returns_304_for_matching_etag_and_new_etag_after_change(client):
+    events = [{"date": "02.03.2026", "time": "10:00", "country": "US", "event": "CPI"}]
+    assert client.post("/api/calendar/receive", json={"events": events}).status_code == 200
+
+    first = client.get("/api/calendar/generate")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/calendar/generate", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    events.append({"date": "03.03.2026", "time": "11:00", "country": "US", "event": "GDP"})
+    client.post("/api/calendar/receive", json={"events": events})
+    changed = client.get("/api/calendar/generate", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,122 @@
+import pytest
+
+from app.services.state_store import PersistedState, StateStore
+
+
+class _ListState:
+    """Состояние для тестов: список, журнал — добавленные элементы."""
+
+    def __init__(self):
+        self.items: list = []
+        self.applied: list[PersistedState] = []
+
+    def apply(self, persisted: PersistedState) -> None:
+        self.applied.append(persisted)
+        if persisted.snapshot is not None:
+            self.items = list(persisted.snapshot)
+        self.items.extend(persisted.journal)
+
+    def replace(self, store: StateStore, items: list) -> None:
+        with store.mutation("items") as change:
+            self.items = list(items)
+            change.save(list(self.items))
+
+    def append(self, store: StateStore, item) -> None:
+        with store.mutation("items") as change:
+            self.items.append(item)
+            change.save(list(self.items), entry=item)
+
+
+def _open(path, shared=False, compact_every=100) -> tuple[StateStore, _ListState]:
+    store = StateStore(path, compact_every, shared=shared)
+    state = _ListState()
+    store.register("items", state.apply)
+    assert store.open()
+    store.restore()
+    return store, state
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "state.sqlite3"
+
+
+def test_warm_start_restores_snapshot_and_journal(db_path):
+    store, state = _open(db_path)
+    state.replace(store, [1, 2])
+    state.append(store, 3)
+    state.append(store, 4)
+    store.close()
+    assert store.stats()["journal_entries"] == {"items": 2}
+
+    restored, restored_state = _open(db_path)
+    try:
+        assert restored_state.items == [1, 2, 3, 4]
+        assert restored_state.applied == [PersistedState([1, 2], [3, 4])]
+    finally:
+        restored.close()
+
+
+def test_full_replacement_drops_journal(db_path):
+    store, state = _open(db_path)
+    state.append(store, "a")
+    state.replace(store, ["b"])
+    store.close()
+
+    restored, restored_state = _open(db_path)
+    restored.close()
+    assert restored_state.applied == [PersistedState(["b"], [])]
+
+
+def test_journal_is_compacted_into_snapshot(db_path):
+    store, state = _open(db_path, compact_every=3)
+    for item in range(5):
+        state.append(store, item)
+    store.close()
+    assert store.stats()["compactions"] == 1
+
+    restored, restored_state = _open(db_path, compact_every=3)
+    restored.close()
+    assert restored_state.items == [0, 1, 2, 3, 4]
+    assert restored_state.applied[0].snapshot == [0, 1, 2]
+    assert restored_state.applied[0].journal == [3, 4]
+
+
+def test_shared_workers_see_each_others_changes(db_path):
+    first, first_state = _open(db_path, shared=True)
+    second, second_state = _open(db_path, shared=True)
+    try:
+        first_state.replace(first, ["x"])
+        second.sync("items")
+        assert second_state.items == ["x"]
+
+        # Изменение во втором воркере сначала догоняет первое, затем пишется поверх.
+        second_state.append(second, "y")
+        first_state.append(first, "z")
+        assert first_state.items == ["x", "y", "z"]
+
+        second.sync("items")
+        assert second_state.items == ["x", "y", "z"]
+        # Повторная синхронизация без изменений ничего не читает.
+        applied = len(second_state.applied)
+        second.sync("items")
+        assert len(second_state.applied) == applied
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_mutation_is_rolled_back_on_error(db_path):
+    first, first_state = _open(db_path, shared=True)
+    second, second_state = _open(db_path, shared=True)
+    try:
+        first_state.replace(first, [1])
+        with pytest.raises(RuntimeError):
+            with first.mutation("items") as change:
+                change.save([1, 2], entry=2)
+                raise RuntimeError("boom")
+        second.sync("items")
+        assert second_state.items == [1]
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,51 @@
+import shutil
+
+from docx import Document
+
+from app.services.template_cache import TemplateCache
+from tests.conftest import BASE_DIR
+
+
+def _write_template(path, text: str) -> None:
+    doc = Document()
+    doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_lookup_does_not_touch_the_file(tmp_path):
+    path = tmp_path / "Template.docx"
+    shutil.copy(BASE_DIR / "Template.docx", path)
+    cache = TemplateCache(lambda: path)
+    entry = cache.get()
+
+    path.unlink()
+    assert cache.get() is entry
+    assert cache.open_copy()[0] is entry
+
+
+def test_invalidate_reloads_only_another_template(tmp_path):
+    path = tmp_path / "Template.docx"
+    _write_template(path, "first")
+    cache = TemplateCache(lambda: path)
+    first = cache.get()
+
+    cache.invalidate(first.sha256)
+    assert cache.get() is first
+
+    _write_template(path, "second")
+    assert cache.get() is first
+    cache.invalidate("another-worker-hash")
+    second = cache.get()
+    assert second.sha256 != first.sha256
+    assert second.document.paragraphs[0].text == "second"
+
+
+def test_expected_hash_reloads_a_replaced_template(tmp_path):
+    path = tmp_path / "Template.docx"
+    _write_template(path, "first")
+    cache = TemplateCache(lambda: path)
+    cache.get()
+
+    _write_template(path, "second")
+    second = TemplateCache(lambda: path).get()
+    assert cache.get(second.sha256).sha256 == second.sha256
@@ -0,0 +1,64 @@
+from io import BytesIO
+
+from docx import Document
+
+from app.services.template_plan import build_placeholder_index, compile_render_plan
+from app.services.word_service import ContentLine, apply_placeholders, execute_render_plan
+
+
+def _template_bytes() -> bytes:
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Календарь {{CALENDAR_DATE}}"
+    doc.add_paragraph("{{CONTENT_EN}}")
+    table = doc.add_table(rows=1, cols=1)
+    table.cell(0, 0).paragraphs[0].text = "{{CONTENT_RU}}"
+    doc.add_paragraph("{{UNUSED}}")
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _xml_parts(doc) -> dict[str, bytes]:
+    return {str(part.partname): part.blob for part in doc.part.package.iter_parts() if part.partname.endswith(".xml")}
+
+
+def test_plan_locates_placeholders_in_body_tables_and_headers():
+    plan = compile_render_plan(Document(BytesIO(_template_bytes())))
+
+    assert plan.missing == []
+    kinds = {item["placeholder"]: item["kind"] for item in plan.describe()}
+    assert kinds == {
+        "{{CALENDAR_DATE}}": "inline",
+        "{{CONTENT_EN}}": "block",
+        "{{CONTENT_RU}}": "block",
+        "{{UNUSED}}": "unknown",
+    }
+    header_part = plan.sites["{{CALENDAR_DATE}}"][0].partname
+    assert header_part.startswith("/word/header")
+    assert plan.parts == {"/word/document.xml", header_part}
+
+
+def test_plan_reports_missing_block_placeholder():
+    doc = Document()
+    doc.add_paragraph("{{CONTENT_RU}}")
+    assert compile_render_plan(doc).missing == ["{{CONTENT_EN}}"]
+
+
+def test_plan_render_matches_render_by_placeholder_index():
+    data = _template_bytes()
+    plan = compile_render_plan(Document(BytesIO(data)))
+    blocks = {
+        "{{CONTENT_EN}}": [ContentLine("Monday, March 2", True), ContentLine("10:00 – US: GDP", False)],
+        "{{CONTENT_RU}}": [ContentLine("Понедельник, 2 марта", True)],
+    }
+    inline = {"{{CALENDAR_DATE}}": "02.03.26"}
+
+    planned = Document(BytesIO(data))
+    replaced = execute_render_plan(planned, plan, blocks=blocks, inline=inline)
+    indexed = Document(BytesIO(data))
+    apply_placeholders(build_placeholder_index(indexed), blocks=blocks, inline=inline)
+
+    assert replaced == {"{{CALENDAR_DATE}}", "{{CONTENT_EN}}", "{{CONTENT_RU}}"}
+    assert _xml_parts(planned) == _xml_parts(indexed)
+    assert "{{CALENDAR_DATE}}" not in planned.sections[0].header.paragraphs[0].text
+    assert planned.tables[0].cell(0, 0).paragraphs[0].text == "Понедельник, 2 марта"
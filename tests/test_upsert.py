@@ -0,0 +1,108 @@
+from datetime import date
+
+import pytest
+
+from app.services.calendar_index import get_calendar_index
+from app.services.calendar_service import clear_events, upsert_events
+from app.services.data_store import data_store, get_data_version
+from app.services.render_cache import calendar_render_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    clear_events()
+    yield
+    clear_events()
+
+
+def _event(key, text="GDP q/q", day="02.03.2026", source="s1", **extra) -> dict:
+    return {"date": day, "time": "10:00", "country": "US", "event": text, "Key": key, "source_id": source, **extra}
+
+
+def _texts(name: str) -> list[str]:
+    return [record.event for record in data_store[name]]
+
+
+def test_insert_update_unchanged_counts():
+    assert upsert_events([_event(1), _event(2, "CPI")]) == {
+        "inserted": 2, "updated": 0, "unchanged": 0, "removed": 0,
+    }
+    assert upsert_events([_event(1), _event(2, "CPI y/y"), _event(3, "PMI")]) == {
+        "inserted": 1, "updated": 1, "unchanged": 1, "removed": 0,
+    }
+    assert _texts("work_en") == ["GDP q/q", "CPI y/y", "PMI"]
+
+
+def test_language_change_moves_record_to_other_bucket():
+    upsert_events([_event(1), _event(2, "CPI")])
+    counts = upsert_events([_event(1, "ВВП (кв/кв)")])
+
+    assert counts["updated"] == 1
+    assert _texts("work_en") == ["CPI"]
+    assert _texts("work_ru") == ["ВВП (кв/кв)"]
+    index = get_calendar_index()
+    assert [ev.event for ev in index.day("ru", date(2026, 3, 2)).events] == ["ВВП (кв/кв)"]
+    assert [ev.event for ev in index.day("en", date(2026, 3, 2)).events] == ["CPI"]
+
+
+def test_date_change_moves_record_to_other_day():
+    upsert_events([_event(1), _event(2, "CPI")])
+    upsert_events([_event(1, day="04.03.2026")])
+
+    index = get_calendar_index()
+    assert [ev.event for ev in index.day("en", date(2026, 3, 2)).events] == ["CPI"]
+    assert [ev.event for ev in index.day("en", date(2026, 3, 4)).events] == ["GDP q/q"]
+
+
+def test_holiday_flag_moves_record_to_holidays():
+    upsert_events([_event(1)])
+    upsert_events([_event(1, text=None, holiday="Holiday")])
+
+    assert data_store["work_en"] == []
+    assert [record.holiday for record in data_store["holidays_en"]] == ["Holiday"]
+
+
+def test_delete_by_key_and_by_source():
+    upsert_events([_event(1), _event(2, "CPI"), _event(3, "PMI", source="s2")])
+
+    assert upsert_events([], delete=[("s1", 2)])["removed"] == 1
+    assert _texts("work_en") == ["GDP q/q", "PMI"]
+    assert upsert_events([], delete=[("s1", None)])["removed"] == 1
+    assert _texts("work_en") == ["PMI"]
+
+
+def test_deleting_unknown_identity_is_a_noop():
+    upsert_events([_event(1)])
+    version = get_data_version()
+    lists = dict(data_store)
+
+    counts = upsert_events([], delete=[("s1", 99), ("unknown", None), (None, 1)])
+
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    assert get_data_version() == version
+    assert all(data_store[name] is lists[name] for name in lists)
+
+
+def test_unchanged_upsert_keeps_data_version():
+    upsert_events([_event(1)])
+    version = get_data_version()
+    assert upsert_events([_event(1)])["unchanged"] == 1
+    assert get_data_version() == version
+
+
+def test_upsert_changes_version_and_misses_render_cache(client):
+    response = client.post("/api/calendar/upsert", json={"events": [_event(1)]})
+    assert response.json()["inserted"] == 1
+    first = client.get("/api/calendar/generate")
+    etag = first.headers["ETag"]
+    assert client.get("/api/calendar/generate", headers={"If-None-Match": etag}).status_code == 304
+
+    version = get_data_version()
+    client.post("/api/calendar/upsert", json={"events": [_event(1, "GDP y/y")]})
+    assert get_data_version() != version
+
+    misses = calendar_render_cache.stats()["misses"]
+    second = client.get("/api/calendar/generate", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+    assert calendar_render_cache.stats()["misses"] == misses + 1
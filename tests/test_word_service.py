@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+
+from app.services import word_service
+from app.services.calendar_index import build_calendar_index
+from app.services.calendar_service import split_records, to_records
+from app.services.word_service import generate_word
+
+MONDAY = date(2026, 3, 2)
+
+
+def _index(events: list[dict]):
+    work_en, work_ru, holidays_en, holidays_ru = split_records(to_records(events))
+    store = {"work_en": work_en, "work_ru": work_ru, "holidays_en": holidays_en, "holidays_ru": holidays_ru}
+    return build_calendar_index(store, today=MONDAY)
+
+
+def _paragraph_texts(buffer) -> list[str]:
+    return [p.text for p in Document(buffer).paragraphs]
+
+
+def test_generate_word_fills_placeholders():
+    index = _index([{"date": "02.03.2026", "time": "10:00", "country": "US", "event": "GDP q/q"}])
+    texts = _paragraph_texts(generate_word(index, monday=MONDAY))
+    assert not any("{{" in text for text in texts)
+    assert any("GDP q/q" in text for text in texts)
+
+
+def test_placeholder_lost_after_plan_check_raises(monkeypatch):
+    open_copy = word_service.open_template_copy
+
+    def open_copy_without_placeholder(expected_sha256=None):
+        template, doc = open_copy(expected_sha256)
+        for text in doc.element.body.iter(qn("w:t")):
+            if text.text:
+                text.text = text.text.replace("{{CONTENT_EN}}", "")
+        return template, doc
+
+    monkeypatch.setattr(word_service, "open_template_copy", open_copy_without_placeholder)
+    with pytest.raises(ValueError, match=r"\{\{CONTENT_EN\}\}"):
+        generate_word(_index([]), monday=MONDAY)
+
+
+def test_lines_with_weekday_names_are_formatted_as_day_headers():
+    index = _index([
+        {"date": "06.04.2026", "time": "", "country": "DE", "event": None, "holiday": "Easter Monday"},
+        {"date": "07.04.2026", "time": "10:00", "country": "US", "event": "Cyber Monday sales"},
+        {"date": "07.04.2026", "time": "11:00", "country": "US", "event": "GDP q/q"},
+    ])
+    monday = date(2026, 4, 6)
+    lines = word_service.generate_content_lines(index.week_days("en", monday), "en", monday)
+    headers = {line.text for line in lines if line.is_day_header}
+    assert "Easter Monday. Markets in Germany" in headers
+    assert "10:00 – US: Cyber Monday sales" in headers
+    assert "11:00 – US: GDP q/q" not in headers
+    assert "Monday, April 6" in headers